@@ -0,0 +1,133 @@
+# barnes_hut.py
+# Description: Barnes-Hut (quadtree) approximation of the pairwise interaction forces.
+
+import math
+import numpy as np
+from constants import CHUNK_SIZE, GENERAL_ATTRACTION_MAX_CHUNKS, BARNES_HUT_THETA, BARNES_HUT_LEAF_SIZE
+from cell_grid import PAIR_BATCH_SIZE
+from forces import pair_force_scale
+
+class _Level:
+    """ One quadtree level: occupied nodes with per-type particle counts and centroids. """
+    def __init__(self, keys, counts, centroids, total, center_of_mass):
+        self.keys = keys; self.counts = counts; self.centroids = centroids
+        self.total = total; self.center_of_mass = center_of_mass
+
+class BarnesHutForceEngine:
+    """
+    Approximates far-field forces by treating a distant quadtree node as one point per particle type
+    (count-weighted, at that type's centroid). A node is used whole when node_size / distance < theta;
+    otherwise it is opened, down to leaves of BARNES_HUT_LEAF_SIZE where pairs are summed exactly.
+    """
+    def __init__(self, theta=BARNES_HUT_THETA, leaf_size=BARNES_HUT_LEAF_SIZE, cutoff_chunks=GENERAL_ATTRACTION_MAX_CHUNKS):
+        self.theta = theta
+        self.leaf_size = leaf_size
+        self.cutoff = cutoff_chunks * CHUNK_SIZE
+        self.last_pair_count = 0 # Exact pairs + approximated (target, node, type) terms
+
+    def accumulate(self, store, interactions, active=None):
+        """
+        Adds interaction forces into store.acc for every movable particle (interactions: an InteractionMatrix).
+        If `active` (bool per store row) is given, only those particles receive forces; all still act as sources.
+        """
+        type_ids = store.type_ids_array
+        members = np.flatnonzero(interactions.participating[type_ids])
+        if len(members) < 2: self.last_pair_count = 0; return
+        receives = store.movable[members] if active is None else store.movable[members] & active[members]
+        targets = np.flatnonzero(receives)
+        if len(targets) == 0: self.last_pair_count = 0; return
+        store.acc[members[targets]] += self.compute(store.positions[members], type_ids[members], interactions.signed, targets=targets)
+
+    def compute(self, positions, type_ids, interaction_table, targets=None):
+        """ Returns the approximate net interaction force on each target (all points by default). """
+        positions = np.asarray(positions, dtype=np.float64); n = len(positions); self.last_pair_count = 0
+        num_types = len(interaction_table)
+        origin = positions.min(axis=0)
+        extent = max(float((positions.max(axis=0) - origin).max()), self.leaf_size)
+        depth = min(20, max(0, math.ceil(math.log2(extent / self.leaf_size)))) # Root = leaf_size * 2**depth covers every point
+
+        # --- Build every level bottom-up from each point's leaf cell ---
+        leaf_cells = np.minimum(np.floor((positions - origin) / self.leaf_size).astype(np.int64), 2 ** depth - 1)
+        levels = []
+        for level in range(depth + 1):
+            cells = leaf_cells >> (depth - level)
+            keys = (cells[:, 0] << 32) | cells[:, 1]
+            node_keys, node_of_point = np.unique(keys, return_inverse=True)
+            slot = node_of_point * num_types + type_ids
+            counts = np.bincount(slot, minlength=len(node_keys) * num_types).reshape(-1, num_types).astype(np.float64)
+            sums_x = np.bincount(slot, weights=positions[:, 0], minlength=len(node_keys) * num_types).reshape(-1, num_types)
+            sums_y = np.bincount(slot, weights=positions[:, 1], minlength=len(node_keys) * num_types).reshape(-1, num_types)
+            safe = np.maximum(counts, 1.0)
+            centroids = np.stack((sums_x / safe, sums_y / safe), axis=-1)
+            total = counts.sum(axis=1)
+            center_of_mass = np.column_stack((sums_x.sum(axis=1), sums_y.sum(axis=1))) / total[:, None]
+            levels.append(_Level(node_keys, counts, centroids, total, center_of_mass))
+        # Members of each leaf as runs of leaf_order (node_of_point is from the deepest level here)
+        leaf_order = np.argsort(node_of_point, kind="stable")
+        leaf_start = np.searchsorted(node_of_point[leaf_order], np.arange(len(levels[-1].keys)))
+        leaf_count = levels[-1].total.astype(np.int64)
+
+        force_x = np.zeros(n); force_y = np.zeros(n)
+        # --- Walk the tree for all targets at once: frontier of (target, node) pairs per level ---
+        front_t = np.arange(n) if targets is None else np.asarray(targets, dtype=np.int64); front_node = np.zeros(len(front_t), dtype=np.int64)
+        for level in range(depth + 1):
+            if len(front_t) == 0: break
+            lv = levels[level]; node_size = self.leaf_size * (2 ** (depth - level))
+            node_min = origin + np.column_stack((lv.keys[front_node] >> 32, lv.keys[front_node] & 0xFFFFFFFF)) * node_size
+            # Drop nodes entirely beyond the cutoff
+            gap = np.maximum(np.maximum(node_min - positions[front_t], positions[front_t] - (node_min + node_size)), 0.0)
+            keep = np.einsum("ij,ij->i", gap, gap) <= self.cutoff * self.cutoff
+            front_t = front_t[keep]; front_node = front_node[keep]; node_min = node_min[keep]
+            delta = lv.center_of_mass[front_node] - positions[front_t]
+            dist = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+            inside = np.all((positions[front_t] >= node_min) & (positions[front_t] < node_min + node_size), axis=1)
+            far = (node_size < self.theta * dist) & ~inside # Never approximate the node holding the target itself
+
+            # --- Accepted nodes: one term per (target, node, type) ---
+            if np.any(far):
+                fx, fy = self._node_forces(positions, type_ids, interaction_table, lv, front_t[far], front_node[far])
+                force_x += np.bincount(front_t[far], weights=fx, minlength=n); force_y += np.bincount(front_t[far], weights=fy, minlength=n)
+            front_t = front_t[~far]; front_node = front_node[~far]
+
+            if level == depth: # --- Opened leaves: exact pairs with their members ---
+                self._leaf_forces(positions, type_ids, interaction_table, front_t, front_node, leaf_order, leaf_start, leaf_count, force_x, force_y)
+            else: # --- Opened inner nodes: descend into existing children ---
+                child_lv = levels[level + 1]
+                cx = (lv.keys[front_node] >> 32) * 2; cy = (lv.keys[front_node] & 0xFFFFFFFF) * 2
+                next_t = []; next_node = []
+                for ox in (0, 1):
+                    for oy in (0, 1):
+                        child_keys = ((cx + ox) << 32) | (cy + oy)
+                        loc = np.minimum(np.searchsorted(child_lv.keys, child_keys), len(child_lv.keys) - 1)
+                        exists = child_lv.keys[loc] == child_keys
+                        next_t.append(front_t[exists]); next_node.append(loc[exists])
+                front_t = np.concatenate(next_t); front_node = np.concatenate(next_node)
+        forces = np.column_stack((force_x, force_y))
+        return forces if targets is None else forces[targets]
+
+    def _node_forces(self, positions, type_ids, interaction_table, lv, tgt, node):
+        """ Force on each target from each type's aggregate in the node: count * rule * decay(distance to that type's centroid). """
+        delta = lv.centroids[node] - positions[tgt][:, None, :] # (E, types, 2)
+        dist_sq = np.einsum("ijk,ijk->ij", delta, delta)
+        counts = lv.counts[node]
+        scale = pair_force_scale(dist_sq, interaction_table[type_ids[tgt]]) * counts # (E, types)
+        self.last_pair_count += int(np.count_nonzero(counts))
+        return (delta[..., 0] * scale).sum(axis=1), (delta[..., 1] * scale).sum(axis=1)
+
+    def _leaf_forces(self, positions, type_ids, interaction_table, tgt, node, leaf_order, leaf_start, leaf_count, force_x, force_y):
+        """ Exact pairwise forces between each target and every member of its opened leaf, in bounded batches. """
+        if len(tgt) == 0: return
+        counts = leaf_count[node]
+        batch_id = (np.cumsum(counts) - counts) // PAIR_BATCH_SIZE
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(batch_id)) + 1, [len(batch_id)]))
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            c = counts[lo:hi]
+            pair_t = np.repeat(tgt[lo:hi], c)
+            within = np.arange(int(c.sum())) - np.repeat(np.cumsum(c) - c, c)
+            pair_s = leaf_order[np.repeat(leaf_start[node[lo:hi]], c) + within]
+            delta = positions[pair_s] - positions[pair_t]
+            dist_sq = np.einsum("ij,ij->i", delta, delta)
+            scale = pair_force_scale(dist_sq, interaction_table[type_ids[pair_t], type_ids[pair_s]])
+            self.last_pair_count += len(pair_t)
+            force_x += np.bincount(pair_t, weights=delta[:, 0] * scale, minlength=len(force_x))
+            force_y += np.bincount(pair_t, weights=delta[:, 1] * scale, minlength=len(force_y))
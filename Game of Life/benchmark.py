@@ -0,0 +1,110 @@
+# benchmark.py
+# Description: Seeded benchmark scenes that time each pipeline stage, write JSON results and flag regressions against a baseline.
+
+import argparse
+import json
+import platform
+import sys
+import time
+import numpy as np
+import pygame
+from constants import FPS, SCREEN_WIDTH, SCREEN_HEIGHT, BLACK, MIN_ZOOM, MAX_ZOOM, FORCE_MODE, BARNES_HUT_THETA, PARALLEL_WORKERS, INTEGRATOR, WALL_COLOR
+from simulation import Simulation, FORCE_MODES
+from scenarios import build_scenario
+from camera import Camera
+from renderer import ParticleRenderer
+from integrators import INTEGRATORS
+
+# name -> (scenario, particle count)
+SCENES = {
+    "mixed-1k": ("mixed", 1000), "mixed-5k": ("mixed", 5000), "mixed-20k": ("mixed", 20000), "mixed-100k": ("mixed", 100000),
+    "wall-box-5k": ("wall-box", 5000), "anti-storm-5k": ("anti-storm", 5000),
+}
+STAGES = ("forces", "collisions", "integrate", "chunks", "draw")
+RESULT_FORMAT = 1
+
+def _fit_camera(sim, width, height):
+    """ Camera framing every particle of the scene (within the zoom limits). """
+    camera = Camera(width, height)
+    if len(sim.particles) == 0: return camera
+    lo = sim.particles.positions.min(axis=0); hi = sim.particles.positions.max(axis=0); center = (lo + hi) / 2
+    span = np.maximum(hi - lo, 1.0)
+    camera.zoom = min(MAX_ZOOM, max(MIN_ZOOM, min(width / span[0], height / span[1])))
+    camera.camera_offset.x = center[0] - width / 2 / camera.zoom; camera.camera_offset.y = center[1] - height / 2 / camera.zoom
+    return camera
+
+def run_scene(name, steps, warmup, dt, seed, force_mode, theta, workers, integrator=INTEGRATOR):
+    """ Builds one scene and times each stage of `steps` steps (after `warmup` untimed ones). Returns its result dict. """
+    scenario, count = SCENES[name]
+    sim = Simulation(force_mode=force_mode, theta=theta, workers=workers, integrator=integrator); sim.profiler.enabled = True # Stage timings come from the built-in profiler
+    try:
+        build_scenario(sim, scenario, count, seed)
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)); camera = _fit_camera(sim, SCREEN_WIDTH, SCREEN_HEIGHT); renderer = ParticleRenderer()
+        start_count = len(sim.particles)
+        timings = {stage: [] for stage in STAGES}
+        for step in range(warmup + steps):
+            sim.profiler.begin_frame(); sim.step(dt)
+            with sim.profiler.stage("draw"): surface.fill(BLACK); renderer.draw_walls(surface, camera, sim.walls, WALL_COLOR); renderer.draw(surface, camera, sim.particles, [True] * len(sim.particles.type_names))
+            sim.profiler.end_frame()
+            if step >= warmup:
+                for stage in STAGES: timings[stage].append(sim.profiler.last_frame[stage + "_ms"])
+    finally: sim.close()
+    stages = {stage: {"median_ms": float(np.median(ms)), "mean_ms": float(np.mean(ms)), "min_ms": float(np.min(ms))} for stage, ms in timings.items()}
+    step_ms = float(np.median(np.sum([timings[stage] for stage in STAGES if stage != "draw"], axis=0)))
+    return {"scenario": scenario, "particles": start_count, "particles_end": len(sim.particles), "steps": steps,
+            "stages": stages, "step_median_ms": step_ms, "steps_per_sec": 1000.0 / step_ms if step_ms > 0 else float("inf")}
+
+def compare(results, baseline, tolerance):
+    """ Returns (scene, stage, baseline_ms, current_ms) for every stage median more than `tolerance` slower than the baseline. """
+    regressions = []
+    for name, scene in results["scenes"].items():
+        base_scene = baseline.get("scenes", {}).get(name)
+        if base_scene is None: continue
+        for stage, timing in scene["stages"].items():
+            base = base_scene["stages"].get(stage, {}).get("median_ms")
+            if base is not None and timing["median_ms"] > base * (1.0 + tolerance): regressions.append((name, stage, base, timing["median_ms"]))
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Particle Sim benchmark suite")
+    parser.add_argument("--scenes", nargs="+", choices=list(SCENES), default=[name for name in SCENES if name != "mixed-100k"], help="Scenes to run (mixed-100k is opt-in)")
+    parser.add_argument("--steps", type=int, default=10, help="Timed steps per scene")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed steps before timing")
+    parser.add_argument("--dt", type=float, default=1.0 / FPS, help="Fixed timestep per step (seconds)")
+    parser.add_argument("--seed", type=int, default=0, help="Scene random seed")
+    parser.add_argument("--integrator", choices=list(INTEGRATORS), default=INTEGRATOR, help="Time integrator")
+    parser.add_argument("--force-mode", choices=FORCE_MODES, default=FORCE_MODE, help="Pairwise force engine")
+    parser.add_argument("--theta", type=float, default=BARNES_HUT_THETA, help="Barnes-Hut opening angle")
+    parser.add_argument("--workers", type=int, default=PARALLEL_WORKERS, help="Worker processes for --force-mode parallel (0 = one per core)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown per stage before it counts as a regression (0.15 = 15%%)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {"format": RESULT_FORMAT,
+               "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "numpy": np.__version__,
+                        "platform": platform.platform(), "force_mode": args.force_mode, "integrator": args.integrator, "theta": args.theta, "workers": args.workers,
+                        "steps": args.steps, "warmup": args.warmup, "dt": args.dt, "seed": args.seed},
+               "scenes": {}}
+    print(f"{'scene':<16}{'particles':>10}" + "".join(f"{stage + ' ms':>14}" for stage in STAGES) + f"{'steps/sec':>12}")
+    for name in args.scenes:
+        scene = run_scene(name, args.steps, args.warmup, args.dt, args.seed, args.force_mode, args.theta, args.workers, args.integrator)
+        results["scenes"][name] = scene
+        print(f"{name:<16}{scene['particles']:>10}" + "".join(f"{scene['stages'][stage]['median_ms']:>14.2f}" for stage in STAGES) + f"{scene['steps_per_sec']:>12.2f}")
+    if args.output:
+        with open(args.output, "w") as f: json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        try:
+            with open(args.baseline) as f: baseline = json.load(f)
+        except (OSError, ValueError) as e: print(f"Could not read baseline: {e}"); return 2
+        regressions = compare(results, baseline, args.tolerance)
+        for name, stage, base, current in regressions: print(f"REGRESSION {name} {stage}: {base:.2f} ms -> {current:.2f} ms ({current / base - 1:+.0%})")
+        if regressions: return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# cell_grid.py
+# Description: Sorted cell list over a set of 2D points, used for neighbour searches (forces, collisions, queries).
+
+import numpy as np
+
+PAIR_BATCH_SIZE = 1 << 21 # Max candidate pairs materialised at once (bounds memory on dense scenes)
+_KEY_BIAS = 1 << 31
+
+def cell_keys(cell_x, cell_y):
+    """ Packs integer cell coords into sortable int64 keys. """
+    return ((np.asarray(cell_x, dtype=np.int64) + _KEY_BIAS) << 32) | (np.asarray(cell_y, dtype=np.int64) + _KEY_BIAS)
+
+def cell_coords(keys):
+    """ Inverse of cell_keys: (k, 2) integer cell coords (the high half wraps negative in int64, so mask before unbiasing). """
+    keys = np.asarray(keys, dtype=np.int64)
+    return np.column_stack((((keys >> 32) & 0xFFFFFFFF) - _KEY_BIAS, (keys & 0xFFFFFFFF) - _KEY_BIAS))
+
+class CellGrid:
+    """
+    Buckets points into square cells of `cell_size`.
+    Points are sorted by (cell, original index); each occupied cell is a contiguous run [start, start + count) of `order`.
+    """
+    def __init__(self, positions, cell_size):
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        self.cell_size = cell_size
+        cells = np.floor_divide(positions, cell_size).astype(np.int64)
+        keys = cell_keys(cells[:, 0], cells[:, 1])
+        self.order = np.argsort(keys, kind="stable") # Ties keep original index order -> deterministic
+        self.keys, self.start, self.count = np.unique(keys[self.order], return_index=True, return_counts=True)
+        first = self.order[self.start]
+        self.cell_x = cells[first, 0]; self.cell_y = cells[first, 1]
+
+    def __len__(self): return len(self.keys)
+
+    def lookup(self, cell_x, cell_y):
+        """ Returns the occupied-cell index for each (cell_x, cell_y), or -1 where the cell is empty. """
+        wanted = cell_keys(cell_x, cell_y)
+        if len(self.keys) == 0: return np.full(len(wanted), -1, dtype=np.int64)
+        loc = np.minimum(np.searchsorted(self.keys, wanted), len(self.keys) - 1)
+        return np.where(self.keys[loc] == wanted, loc, -1)
+
+    def neighbor_cells(self, other, dx, dy):
+        """
+        Pairs every occupied cell of `self` with the occupied cell of `other` at offset (dx, dy).
+        Returns (cells_in_self, cells_in_other) for the offsets that exist.
+        """
+        match = other.lookup(self.cell_x + dx, self.cell_y + dy)
+        has = np.flatnonzero(match >= 0)
+        return has, match[has]
+
+def iter_block_pairs(grid_a, cells_a, grid_b, cells_b, max_pairs=PAIR_BATCH_SIZE):
+    """
+    Yields (ia, ib) arrays of original point indices for every member of cells_a[k] x every member of cells_b[k].
+    Pairs come out grouped by block, then by `a` member, then by `b` member; large blocks are split by `a` rows
+    so at most ~max_pairs pairs are materialised per batch.
+    """
+    if len(cells_a) == 0: return
+    a_start = grid_a.start[cells_a]; a_count = grid_a.count[cells_a]
+    b_start = grid_b.start[cells_b]; b_count = grid_b.count[cells_b]
+
+    # --- Split oversized blocks into row pieces ---
+    rows = np.maximum(1, max_pairs // np.maximum(b_count, 1))
+    pieces = -(-a_count // rows)
+    block = np.repeat(np.arange(len(a_start)), pieces)
+    piece_no = np.arange(len(block)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    p_a_start = a_start[block] + piece_no * rows[block]
+    p_a_count = np.minimum(rows[block], a_start[block] + a_count[block] - p_a_start)
+    p_b_start = b_start[block]; p_b_count = b_count[block]
+
+    # --- Group pieces into batches of roughly max_pairs ---
+    totals = p_a_count * p_b_count
+    batch_id = (np.cumsum(totals) - totals) // max_pairs
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(batch_id)) + 1, [len(batch_id)]))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        ia, ib = _expand_blocks(p_a_start[lo:hi], p_a_count[lo:hi], p_b_start[lo:hi], p_b_count[lo:hi], totals[lo:hi])
+        yield grid_a.order[ia], grid_b.order[ib]
+
+def iter_gather_pairs(target_grid, source_grid, offsets, max_pairs=PAIR_BATCH_SIZE):
+    """
+    Yields (it, ib) arrays of original point indices: every target paired with every source in the cells at
+    `offsets` from its own cell. All pairs of one target come out in the same batch, ordered by offset then
+    source, so per-target sums do not depend on batching or on which other targets are present.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64).reshape(-1, 2)
+    num_cells = len(target_grid)
+    if num_cells == 0 or len(source_grid) == 0 or len(offsets) == 0: return
+    match = source_grid.lookup((target_grid.cell_x[:, None] + offsets[:, 0]).ravel(),
+                               (target_grid.cell_y[:, None] + offsets[:, 1]).ravel()).reshape(num_cells, len(offsets))
+    block_t, block_k = np.nonzero(match >= 0) # Row-major: grouped by target cell, then offset order
+    block_s = match[block_t, block_k]
+    blocks_per_cell = np.bincount(block_t, minlength=num_cells)
+    first_block = np.cumsum(blocks_per_cell) - blocks_per_cell
+    sources_per_cell = np.bincount(block_t, weights=source_grid.count[block_s], minlength=num_cells).astype(np.int64)
+
+    # --- Split each target cell into row pieces of at most ~max_pairs pairs ---
+    rows = np.maximum(1, max_pairs // np.maximum(sources_per_cell, 1))
+    pieces = np.where(sources_per_cell > 0, -(-target_grid.count // rows), 0)
+    piece_cell = np.repeat(np.arange(num_cells), pieces)
+    piece_no = np.arange(len(piece_cell)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    piece_row = piece_no * rows[piece_cell]
+    piece_rows = np.minimum(rows[piece_cell], target_grid.count[piece_cell] - piece_row)
+    totals = piece_rows * sources_per_cell[piece_cell]
+    batch_id = (np.cumsum(totals) - totals) // max_pairs
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(batch_id)) + 1, [len(batch_id)]))
+
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        cells = piece_cell[lo:hi]; nblocks = blocks_per_cell[cells]
+        piece_of_block = np.repeat(np.arange(hi - lo), nblocks)
+        block = np.repeat(first_block[cells], nblocks) + (np.arange(int(nblocks.sum())) - np.repeat(np.cumsum(nblocks) - nblocks, nblocks))
+        a_start = target_grid.start[cells][piece_of_block] + piece_row[lo:hi][piece_of_block]
+        a_count = piece_rows[lo:hi][piece_of_block]
+        b_start = source_grid.start[block_s[block]]; b_count = source_grid.count[block_s[block]]
+        ia, ib = _expand_blocks(a_start, a_count, b_start, b_count, a_count * b_count)
+        yield target_grid.order[ia], source_grid.order[ib]
+
+def _expand_blocks(a_start, a_count, b_start, b_count, totals):
+    """ Cartesian product of each [a_start, a_start + a_count) x [b_start, b_start + b_count) in sorted positions. """
+    block = np.repeat(np.arange(len(a_start)), totals)
+    within = np.arange(int(totals.sum())) - np.repeat(np.cumsum(totals) - totals, totals)
+    nb = b_count[block]
+    return a_start[block] + within // nb, b_start[block] + within % nb
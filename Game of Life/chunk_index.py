@@ -0,0 +1,194 @@
+# chunk_index.py
+# Description: Incremental spatial index mapping chunk coords to the particle indices inside them.
+
+import numpy as np
+from cell_grid import cell_keys
+
+class ChunkIndex:
+    """
+    chunk coord (cx, cy) -> list of ParticleStore indices, kept in sync incrementally.
+    Each particle remembers the chunk it is filed under and its slot in that chunk's list,
+    so insert, remove and move are O(1); update() only touches particles whose chunk changed.
+    Every occupied chunk also owns a row of per-type particle counts, kept up to date by the same
+    insert/remove/move steps, so aggregate views (density()) cost O(chunks), not O(particles).
+    rebuild() keeps its sorted arrays and only turns a chunk into a Python list (and row entry) the first time that
+    chunk is touched, so reloading a scene spread over many sparse chunks does not pay for chunks nobody looks at.
+    """
+    def __init__(self, store):
+        self.store = store
+        self._chunks = {}
+        self._coord = np.zeros((0, 2), dtype=np.int64) # Chunk each particle is filed under
+        self._slot = np.zeros(0, dtype=np.int64) # Position of each particle in its chunk list
+        self._clear_counts(); self._clear_pending()
+
+    def _clear_counts(self):
+        self._row = {} # chunk coord -> row of _type_counts / _row_coord
+        self._free_rows = []; self._next_row = 0
+        self._row_coord = np.zeros((64, 2), dtype=np.int64)
+        self._row_live = np.zeros(64, dtype=np.bool_)
+        self._type_counts = np.zeros((64, max(1, len(self.store.type_names))), dtype=np.int64)
+
+    def _new_row(self, coord):
+        if self._free_rows: row = self._free_rows.pop()
+        else:
+            row = self._next_row; self._next_row += 1
+            if row >= len(self._row_live): # Grow the row arrays
+                self._row_coord = np.concatenate((self._row_coord, np.zeros_like(self._row_coord)))
+                self._row_live = np.concatenate((self._row_live, np.zeros_like(self._row_live)))
+                self._type_counts = np.concatenate((self._type_counts, np.zeros_like(self._type_counts)))
+        self._row[coord] = row; self._row_coord[row] = coord; self._row_live[row] = True
+        return row
+
+    def _ensure_types(self, max_type_id):
+        if max_type_id >= self._type_counts.shape[1]: # New particle type registered since
+            self._type_counts = np.concatenate((self._type_counts, np.zeros((len(self._type_counts), max_type_id + 1 - self._type_counts.shape[1]), dtype=np.int64)), axis=1)
+
+    def _count(self, coord, index, delta):
+        type_id = int(self.store.type_id[index]); self._ensure_types(type_id)
+        self._type_counts[self._row[coord], type_id] += delta
+
+    def _ensure_capacity(self):
+        capacity = self.store.capacity
+        if len(self._slot) < capacity:
+            coord = np.zeros((capacity, 2), dtype=np.int64); coord[:len(self._coord)] = self._coord; self._coord = coord
+            slot = np.zeros(capacity, dtype=np.int64); slot[:len(self._slot)] = self._slot; self._slot = slot
+
+    # --- Chunks left by rebuild(), materialised on first touch ---
+    def _clear_pending(self):
+        self._pending_keys = np.zeros(0, dtype=np.int64) # Sorted cell keys of the rebuilt chunks (row = position)
+        self._pending_bounds = np.zeros(1, dtype=np.int64) # Chunk i's members are _pending_order[bounds[i]:bounds[i + 1]]
+        self._pending_order = np.zeros(0, dtype=np.int64)
+        self._pending_taken = np.zeros(0, dtype=np.bool_)
+        self._pending_left = 0
+
+    def _take_pending(self, position, coord):
+        members = self._chunks[coord] = self._pending_order[self._pending_bounds[position]:self._pending_bounds[position + 1]].tolist()
+        self._row[coord] = position; self._pending_taken[position] = True; self._pending_left -= 1
+        return members
+
+    def _lookup(self, coord):
+        """ The member list of an occupied chunk (materialising it if rebuild() left it pending), else None. """
+        members = self._chunks.get(coord)
+        if members is None and self._pending_left:
+            key = int(cell_keys(coord[0], coord[1])); position = int(np.searchsorted(self._pending_keys, key))
+            if position < len(self._pending_keys) and self._pending_keys[position] == key and not self._pending_taken[position]: members = self._take_pending(position, coord)
+        return members
+
+    def _materialise_all(self):
+        if not self._pending_left: return
+        positions = np.flatnonzero(~self._pending_taken)
+        for position, (x, y) in zip(positions.tolist(), self._row_coord[positions].tolist()): self._take_pending(position, (x, y))
+
+    # --- Mapping interface ---
+    def __getitem__(self, coord): return self._lookup(coord) or ()
+    def __contains__(self, coord): return self._lookup(coord) is not None
+    def __iter__(self): self._materialise_all(); return iter(self._chunks)
+    def __len__(self): return len(self._chunks) + self._pending_left
+    def items(self): self._materialise_all(); return self._chunks.items()
+    def keys(self): self._materialise_all(); return self._chunks.keys()
+
+    def count(self, coord):
+        """ Number of particles filed under one chunk. """
+        return len(self._lookup(coord) or ())
+
+    def counts(self):
+        """ {chunk coord: particle count} for every occupied chunk. """
+        return {coord: len(members) for coord, members in self.items()}
+
+    # --- Incremental updates ---
+    def _file(self, index, coord):
+        members = self._lookup(coord)
+        if members is None: members = self._chunks[coord] = []; self._new_row(coord)
+        self._slot[index] = len(members); self._coord[index] = coord
+        members.append(index); self._count(coord, index, 1)
+
+    def _unfile(self, index):
+        coord = (int(self._coord[index, 0]), int(self._coord[index, 1]))
+        members = self._lookup(coord); slot = int(self._slot[index])
+        last = members.pop(); self._count(coord, index, -1)
+        if last != index: members[slot] = last; self._slot[last] = slot # Swap-remove within the chunk list
+        if not members: del self._chunks[coord]; row = self._row.pop(coord); self._row_live[row] = False; self._free_rows.append(row)
+
+    def insert(self, index):
+        """ Files a newly added particle under its current chunk. """
+        self._ensure_capacity(); self._file(index, self.store.chunk_coord(index))
+
+    def insert_many(self, indices):
+        """ Files a batch of newly added particles: grouped by chunk, so it costs one list extend per chunk touched, not a step per particle. """
+        self._ensure_capacity(); indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) == 0: return
+        coords = self.store.chunk[indices]; keys = cell_keys(coords[:, 0], coords[:, 1])
+        order = np.argsort(keys, kind="stable"); indices = indices[order]; coords = coords[order]; sorted_keys = keys[order] # Stable: same list order as filing one by one
+        start = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))); bounds = start.tolist() + [len(indices)]
+        self._coord[indices] = coords; ids = indices.tolist(); rows = []
+        for (x, y), lo, hi in zip(coords[start].tolist(), bounds[:-1], bounds[1:]):
+            members = self._lookup((x, y))
+            if members is None: members = self._chunks[(x, y)] = []; self._new_row((x, y))
+            self._slot[indices[lo:hi]] = np.arange(len(members), len(members) + hi - lo)
+            members.extend(ids[lo:hi]); rows.append(self._row[(x, y)])
+        type_ids = self.store.type_id[indices]; self._ensure_types(int(type_ids.max()))
+        np.add.at(self._type_counts, (np.repeat(rows, np.diff(bounds)), type_ids), 1)
+
+    def remove(self, index):
+        """ Unfiles one particle in O(1). """
+        self._unfile(index)
+
+    def remove_many(self, indices):
+        """ Unfiles the given particles, then removes them from the store, following the rows it moves. O(k). Repeated indices count once. """
+        indices = np.unique(np.asarray(indices, dtype=np.int64))
+        for index in indices.tolist(): self._unfile(index)
+        self.store.remove(indices, on_move=self.relabel_many)
+
+    def relabel(self, old_index, new_index):
+        """ Records that the particle at store row old_index now lives at new_index (e.g. after a swap-remove). """
+        coord = (int(self._coord[old_index, 0]), int(self._coord[old_index, 1])); slot = int(self._slot[old_index])
+        self._lookup(coord)[slot] = new_index
+        self._coord[new_index] = self._coord[old_index]; self._slot[new_index] = slot
+
+    def relabel_many(self, old_indices, new_indices):
+        for old_index, new_index in zip(np.asarray(old_indices).tolist(), np.asarray(new_indices).tolist()): self.relabel(old_index, new_index)
+
+    def update(self):
+        """ Moves only the particles whose store chunk differs from the one they are filed under. Returns how many moved. """
+        n = self.store.count
+        moved = np.flatnonzero(np.any(self.store.chunk[:n] != self._coord[:n], axis=1))
+        for index, coord in zip(moved.tolist(), map(tuple, self.store.chunk[moved].tolist())):
+            self._unfile(index); self._file(index, coord)
+        return len(moved)
+
+    def rebuild(self):
+        """
+        Refiles every particle from scratch, fully vectorised: chunk member lists stay slices of one sorted array until
+        first touched, so the cost is O(n log n) in numpy whatever the number of occupied chunks.
+        """
+        self._ensure_capacity(); self._chunks = {}; self._clear_counts(); self._clear_pending()
+        n = self.store.count
+        if n == 0: return
+        coords = self.store.chunk[:n]; keys = cell_keys(coords[:, 0], coords[:, 1])
+        order = np.argsort(keys, kind="stable"); sorted_keys = keys[order]
+        start = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))); count = np.diff(np.append(start, n))
+        self._coord[:n] = coords
+        self._slot[order] = np.arange(n) - np.repeat(start, count)
+        num_chunks = len(start); chunk_coords = coords[order[start]]
+        self._pending_keys = sorted_keys[start]; self._pending_bounds = np.append(start, n); self._pending_order = order
+        self._pending_taken = np.zeros(num_chunks, dtype=np.bool_); self._pending_left = num_chunks
+
+        # --- Per-chunk type counts, one row per chunk in key order (row = pending position) ---
+        num_types = max(1, len(self.store.type_names)); capacity = max(64, num_chunks); self._next_row = num_chunks
+        self._row_coord = np.zeros((capacity, 2), dtype=np.int64); self._row_coord[:num_chunks] = chunk_coords
+        self._row_live = np.zeros(capacity, dtype=np.bool_); self._row_live[:num_chunks] = True
+        self._type_counts = np.zeros((capacity, num_types), dtype=np.int64)
+        self._type_counts[:num_chunks] = np.bincount(np.repeat(np.arange(num_chunks), count) * num_types + self.store.type_id[order],
+                                                     minlength=num_chunks * num_types).reshape(num_chunks, num_types)
+
+    def density(self, x0, y0, x1, y1):
+        """
+        Occupied chunks in the inclusive chunk range: returns (coords (k, 2), per-type counts (k, types)).
+        Reads the incrementally kept counts, so the cost is O(occupied chunks) whatever the particle count.
+        """
+        coords = self._row_coord
+        inside = self._row_live & (coords[:, 0] >= x0) & (coords[:, 0] <= x1) & (coords[:, 1] >= y0) & (coords[:, 1] <= y1)
+        return coords[inside], self._type_counts[inside]
+
+    def clear(self):
+        self._chunks = {}; self._clear_counts(); self._clear_pending()
@@ -0,0 +1,56 @@
+# cli.py
+# Description: Command-line entry point that runs a scenario headless (no window) and reports steps/sec.
+
+import argparse
+import sys
+import time
+from constants import FPS, FORCE_MODE, BARNES_HUT_THETA, PARALLEL_WORKERS, INTEGRATOR
+from simulation import Simulation, FORCE_MODES
+from scenarios import SCENARIOS, build_scenario
+from integrators import INTEGRATORS
+from snapshot import save_snapshot, load_snapshot
+from recorder import Recorder
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Particle Sim (headless)")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS), help="Starting scene (ignored with --load)")
+    parser.add_argument("--count", type=int, default=5000, help="Approximate number of particles in the scene")
+    parser.add_argument("--steps", type=int, default=600, help="Steps to simulate")
+    parser.add_argument("--dt", type=float, default=1.0 / FPS, help="Fixed timestep per step (seconds)")
+    parser.add_argument("--seed", type=int, default=0, help="Scene random seed")
+    parser.add_argument("--report-every", type=int, default=0, help="Print progress every N steps (0 = only the summary)")
+    parser.add_argument("--load", help="Start from this snapshot file instead of building the scenario")
+    parser.add_argument("--save", help="Write a snapshot of the final state to this file")
+    parser.add_argument("--record", help="Stream every step to this recording file (play it back with main.py --replay)")
+    parser.add_argument("--profile-out", help="Stream per-step stage timings to this file (.csv, or .jsonl for JSON lines)")
+    parser.add_argument("--integrator", choices=list(INTEGRATORS), default=INTEGRATOR, help="Time integrator")
+    parser.add_argument("--force-mode", choices=FORCE_MODES, default=FORCE_MODE, help="Pairwise force engine")
+    parser.add_argument("--theta", type=float, default=BARNES_HUT_THETA, help="Barnes-Hut opening angle (higher = faster, less accurate)")
+    parser.add_argument("--workers", type=int, default=PARALLEL_WORKERS, help="Worker processes for --force-mode parallel (0 = one per core)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sim = Simulation(force_mode=args.force_mode, theta=args.theta, workers=args.workers, integrator=args.integrator)
+    try:
+        if args.load: load_snapshot(sim, args.load); scene = args.load
+        else: build_scenario(sim, args.scenario, args.count, args.seed); scene = f"Scenario {args.scenario}"
+        if args.profile_out: sim.profiler.start_export(args.profile_out)
+        print(f"{scene}: {len(sim.particles)} particles, {args.steps} steps at dt={args.dt:.4f}, force mode {args.force_mode}, {args.integrator}")
+        recorder = Recorder(args.record, sim) if args.record else None
+        start = time.perf_counter(); last_report = start
+        for step in range(1, args.steps + 1):
+            sim.profiler.begin_frame(); sim.step(args.dt); sim.profiler.end_frame()
+            if recorder: recorder.capture(sim)
+            if args.report_every and step % args.report_every == 0:
+                now = time.perf_counter()
+                print(f"  step {step}: {args.report_every / (now - last_report):.1f} steps/sec, {len(sim.particles)} particles"); last_report = now
+        elapsed = time.perf_counter() - start
+        if recorder: recorder.close(); print(f"Recorded {recorder.frame_count - recorder.dropped_count} frames to {args.record} ({recorder.dropped_count} dropped, {recorder.written_bytes / 1e6:.1f} MB)")
+        if args.save: save_snapshot(sim, args.save); print(f"Saved snapshot to {args.save}")
+        print(f"Done: {args.steps} steps in {elapsed:.2f}s ({args.steps / elapsed if elapsed > 0 else float('inf'):.1f} steps/sec), {len(sim.particles)} particles left")
+    finally: sim.profiler.stop_export(); sim.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
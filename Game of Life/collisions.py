@@ -0,0 +1,102 @@
+# collisions.py
+# Description: Grid broadphase + batched narrowphase for particle collisions (push apart, bounce, annihilate).
+
+import numpy as np
+from constants import COLLISION_ITERATIONS, COLLISION_PUSH_FACTOR, WALL_BOUNCE_FACTOR, PARTICLE_COLLISION_ELASTICITY
+from cell_grid import CellGrid, iter_block_pairs
+
+# Half of the 3x3 neighbourhood (plus the cell itself), so every neighbouring cell pair is visited once
+_HALF_SHELL = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+
+class CollisionSolver:
+    """
+    Finds candidate pairs once per step on a grid whose cells fit the largest particle (plus a margin for
+    the pushes made during the step), then resolves every touching pair of a pass in one batch.
+    """
+    def __init__(self, iterations=COLLISION_ITERATIONS):
+        self.iterations = iterations
+        self.last_candidate_count = 0; self.last_collision_count = 0
+
+    def broadphase(self, positions, sizes, members):
+        """ Returns (ia, ib) store indices of each unique pair of `members` that could touch this step. """
+        if len(members) < 2: return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        margin = sizes[members].max()
+        grid = CellGrid(positions[members], 3 * margin) # Largest contact distance (2 * size) plus room for this step's pushes
+        pairs_a = []; pairs_b = []
+        for dx, dy in _HALF_SHELL:
+            cells_a, cells_b = grid.neighbor_cells(grid, dx, dy)
+            for ia, ib in iter_block_pairs(grid, cells_a, grid, cells_b):
+                if dx == 0 and dy == 0: keep = ia < ib; ia = ia[keep]; ib = ib[keep] # Same cell: each pair once
+                ia = members[ia]; ib = members[ib]
+                delta = positions[ib] - positions[ia]; reach = sizes[ia] + sizes[ib] + margin
+                near = np.einsum("ij,ij->i", delta, delta) < reach * reach
+                pairs_a.append(ia[near]); pairs_b.append(ib[near])
+        if not pairs_a: return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(pairs_a), np.concatenate(pairs_b)
+
+    def solve(self, store, members, locked_types):
+        """
+        Resolves collisions among `members` (store indices) in place: overlap push, elastic exchange,
+        wall bounce and anti-particle annihilation. Returns the indices of annihilated particles.
+        locked_types[type_id] protects a type from annihilation.
+        """
+        pos = store.pos; vel = store.vel; sizes = store.size; mass = store.mass; movable = store.movable
+        ia, ib = self.broadphase(pos, sizes, members)
+        self.last_candidate_count = len(ia); self.last_collision_count = 0
+        removed = np.zeros(store.count, dtype=np.bool_)
+        both_fixed = ~movable[ia] & ~movable[ib]
+        ia = ia[~both_fixed]; ib = ib[~both_fixed]
+
+        for _ in range(self.iterations):
+            alive = ~removed[ia] & ~removed[ib]
+            a = ia[alive]; b = ib[alive]
+            delta = pos[b] - pos[a]; dist_sq = np.einsum("ij,ij->i", delta, delta)
+            min_dist = sizes[a] + sizes[b]
+            touching = (dist_sq > 0) & (dist_sq < min_dist * min_dist)
+            if not np.any(touching): break
+            a = a[touching]; b = b[touching]; delta = delta[touching]; dist_sq = dist_sq[touching]; min_dist = min_dist[touching]
+            self.last_collision_count += len(a)
+
+            # --- Annihilation (matter meets anti-matter) ---
+            annihilate = store.anti[a] != store.anti[b]
+            if np.any(annihilate):
+                for side in (a[annihilate], b[annihilate]): removed[side[~locked_types[store.type_id[side]]]] = True
+                keep = ~annihilate
+                a = a[keep]; b = b[keep]; delta = delta[keep]; dist_sq = dist_sq[keep]; min_dist = min_dist[keep]
+                if len(a) == 0: break
+
+            dist = np.sqrt(dist_sq); normal = delta / dist[:, None]; overlap = min_dist - dist
+            move_a = movable[a]; move_b = movable[b]
+
+            # --- Overlap Resolution Push ---
+            both = move_a & move_b
+            total_mass = mass[a] + mass[b]
+            push_a = np.where(both, mass[b] / total_mass * COLLISION_PUSH_FACTOR, np.where(move_a, 1.0, 0.0)) * overlap
+            push_b = np.where(both, mass[a] / total_mass * COLLISION_PUSH_FACTOR, np.where(move_b, 1.0, 0.0)) * overlap
+            shift = self._scatter(store.count, a, -normal * push_a[:, None]) + self._scatter(store.count, b, normal * push_b[:, None])
+
+            # --- Collision Response (Velocity), for pairs moving towards each other ---
+            v_rel = vel[a] - vel[b]; closing = np.einsum("ij,ij->i", v_rel, normal) < 0
+            impulse = np.zeros((store.count, 2))
+            elastic = closing & both
+            if np.any(elastic):
+                ea = a[elastic]; eb = b[elastic]; en = normal[elastic]
+                j = -(1 + PARTICLE_COLLISION_ELASTICITY) * np.einsum("ij,ij->i", v_rel[elastic], en) / (1 / mass[ea] + 1 / mass[eb])
+                impulse += self._scatter(store.count, ea, en * (j / mass[ea])[:, None]) - self._scatter(store.count, eb, en * (j / mass[eb])[:, None])
+            bounce = closing & (move_a != move_b)
+            bouncer = np.where(move_a, a, b)[bounce]; bounce_normal = normal[bounce]
+            bouncer, first = np.unique(bouncer, return_index=True) # One wall contact per particle per pass
+            bounce_normal = bounce_normal[first]
+
+            pos[:store.count] += shift
+            vel[:store.count] += impulse
+            if len(bouncer):
+                v = vel[bouncer]; v -= 2 * np.einsum("ij,ij->i", v, bounce_normal)[:, None] * bounce_normal
+                vel[bouncer] = v * WALL_BOUNCE_FACTOR
+        return np.flatnonzero(removed)
+
+    @staticmethod
+    def _scatter(count, indices, values):
+        """ Sums per-pair 2D values into a (count, 2) per-particle array. """
+        return np.column_stack((np.bincount(indices, weights=values[:, 0], minlength=count),
+                                np.bincount(indices, weights=values[:, 1], minlength=count)))
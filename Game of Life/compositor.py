@@ -0,0 +1,61 @@
+# compositor.py
+# Description: Cached off-screen layers plus dirty-rectangle tracking, so only changed parts of the screen are redrawn and pushed to the display.
+
+import pygame
+
+class Compositor:
+    """
+    Keeps named screen-sized layers (off-screen Surfaces) that are only redrawn when their key changes
+    (e.g. the camera for the chunk grid), and collects the screen rectangles changed this frame so present()
+    can push just those with pygame.display.update(rects). A resize, or invalidate_all(), presents a full frame.
+    """
+    def __init__(self):
+        self._layers = {}; self._keys = {}
+        self._size = None; self._dirty = []; self._full = True
+
+    def begin(self, screen):
+        """ Call at the start of a frame; drops every layer if the screen size changed. """
+        if screen.get_size() != self._size: self._size = screen.get_size(); self.invalidate_all()
+
+    def layer(self, name, colorkey=None):
+        """ The screen-sized Surface for a layer (created in the display's pixel format on first use). """
+        surface = self._layers.get(name)
+        if surface is None:
+            surface = pygame.Surface(self._size)
+            if pygame.display.get_surface() is not None: surface = surface.convert()
+            if colorkey is not None: surface.set_colorkey(colorkey)
+            self._layers[name] = surface
+        return surface
+
+    def stale(self, name, key):
+        """ True if the layer has not been drawn with this key yet (then remembers the key: the caller redraws it). """
+        if name in self._keys and self._keys[name] == key: return False
+        self._keys[name] = key; return True
+
+    def key(self, name):
+        """ Key the layer was last drawn with (a layer built from other layers can include these in its own key). """
+        return self._keys.get(name)
+
+    def invalidate(self, name): self._keys.pop(name, None)
+
+    def invalidate_all(self):
+        """ Forgets every layer and presents the next frame in full (e.g. after the display surface was recreated). """
+        self._layers = {}; self._keys = {}; self._full = True
+
+    def mark_dirty(self, rect):
+        if rect is not None and rect.width > 0 and rect.height > 0: self._dirty.append(pygame.Rect(rect))
+
+    def restore(self, screen, name, rect):
+        """ Copies a layer's pixels back onto the screen inside rect (e.g. to erase an overlay) and marks it dirty. """
+        if rect is None: return
+        rect = rect.clip(screen.get_rect())
+        if rect.width > 0 and rect.height > 0: screen.blit(self._layers[name], rect, rect); self._dirty.append(rect)
+
+    def present(self):
+        """ Pushes this frame's changes to the display. Returns how many rectangles were updated (0 = nothing changed). """
+        if self._full: pygame.display.flip(); count = 1
+        else:
+            count = len(self._dirty)
+            if count: pygame.display.update(self._dirty)
+        self._full = False; self._dirty = []
+        return count
@@ -10,7 +10,7 @@ LIGHT_GREY = (100, 100, 100); RED = (255, 0, 0); GREEN = (0, 255, 0)
 BLUE = (0, 0, 255); YELLOW = (255, 255, 0)
 WALL_COLOR = (150, 150, 150); ANTI_PARTICLE_COLOR = (150, 0, 150) # Purple
 ERASER_COLOR = WHITE; COORD_TEXT_COLOR = (200, 200, 200)
-WALL_DRAW_LINE_COLOR = (200, 200, 200, 150)
+WALL_DRAW_LINE_COLOR = (200, 200, 200, 150); BRUSH_COLOR = (120, 200, 255)
 
 # --- Game Mechanics ---
 CHUNK_SIZE = 100; CHUNK_LOAD_BUFFER = 1; DEFAULT_PARTICLE_SIZE = 3
@@ -20,11 +20,23 @@ PARTICLE_COLLISION_ELASTICITY = 0.9
 
 # --- UI Dimensions ---
 LEFT_PANEL_WIDTH = 200; TOP_BAR_HEIGHT = 40; BOTTOM_BAR_HEIGHT = 25
+UI_TEXT_CACHE_SIZE = 256 # Rendered text surfaces kept by the UI (least recently used are dropped)
 
 # --- Tools ---
 ERASER_START_RADIUS = 30; ERASER_RADIUS_STEP = 5; MIN_ERASER_RADIUS = 5; MAX_ERASER_RADIUS = 150
 TOOL_RADIUS = 50; TOOL_STRENGTH_STEP = 5; MIN_TOOL_STRENGTH = 5; MAX_TOOL_STRENGTH = 200
 DEFAULT_TOOL_STRENGTH = 50
+BRUSH_START_RADIUS = 60; BRUSH_RADIUS_STEP = 10; MIN_BRUSH_RADIUS = 10; MAX_BRUSH_RADIUS = 400
+DEFAULT_BRUSH_SHAPE = "disc"; DEFAULT_BRUSH_DISTRIBUTION = "poisson"
+
+# --- Spawner ---
+SPAWN_SPACING_FACTOR = 1.1 # Minimum gap between spawned particle centres, in particle diameters (grid/poisson)
+SPAWN_RING_INNER = 0.6 # Inner radius of the ring shape, as a fraction of its outer radius
+SPAWN_POISSON_ROUNDS = 12 # Dart-throwing rounds before a Poisson-disc spawn settles for fewer particles (shape full)
+SPAWN_FIT_AREA = 2.5 # Area per particle, in spacing^2, when the Place tool sizes its disc to the placement count
+
+# --- Spatial Queries ---
+SPATIAL_SCAN_FRACTION = 0.5 # Queries whose chunks hold more than this share of all particles test every position instead
 
 # --- Zoom ---
 MIN_ZOOM = 0.1; MAX_ZOOM = 5.0; ZOOM_FACTOR = 1.1
@@ -46,6 +58,56 @@ GENERAL_ATTRACTION_MAX_CHUNKS = 8 # Still used for decay function limit
 MAX_INTERACTION_FORCE = 1000 # Limit TOTAL applied force magnitude per particle pair
 MIN_FORCE_THRESHOLD_SQ = 1e-4 # Ignore tiny forces
 
+# --- Force Engine ---
+FORCE_MODE = "exact" # "exact" (cell list, every pair within the cutoff), "parallel" (exact, tiled over a process pool) or "barnes-hut" (quadtree approximation)
+BARNES_HUT_THETA = 0.5 # Opening angle: node_size / distance below this uses the node aggregate. Higher = faster, less accurate
+BARNES_HUT_LEAF_SIZE = CHUNK_SIZE / 4 # Smallest quadtree node (world units); opened leaves are summed exactly
+PARALLEL_WORKERS = 0 # "parallel" mode worker processes (0 = one per CPU core)
+INTEGRATOR = "euler" # "euler" (semi-implicit Euler) or "verlet" (velocity Verlet, kick-drift-kick; more stable at large timesteps)
+PARALLEL_TILE_CHUNKS = 8 # Minimum tile edge in chunks; each tile also reads a halo of GENERAL_ATTRACTION_MAX_CHUNKS
+
+# --- Rendering ---
+RENDER_DOT_RADIUS = 1 # Particles at or below this screen radius are written straight into the pixel buffer as squares (0 = always use circle stamps)
+LOD_ZOOM_THRESHOLD = 0.3 # Below this zoom, particles are drawn as a per-chunk density map instead (L toggles)
+LOD_FULL_DENSITY = 30 # Particles per chunk drawn at full brightness in the density map
+
+# --- Sleep ---
+SLEEP_ENABLED = True # Settled chunks stop integrating/colliding until disturbed
+SLEEP_SPEED = 2.0 # A chunk is calm while all its particles are slower than this (world units / s)...
+SLEEP_FORCE_TOLERANCE = 0.05 # ...and its mean net force changed by at most this fraction since the last step
+SLEEP_STEPS = 90 # Calm steps in a row before the chunk sleeps
+SLEEP_WAKE_SPEED = 5.0 # A particle faster than this wakes its own and the neighbouring chunks
+SLEEP_CHUNK_COLOR = (20, 20, 50) # Chunk grid overlay fill for sleeping chunks
+
+# --- Snapshots ---
+SNAPSHOT_PATH = "quicksave.golsnap" # F5 saves here, F9 loads it
+SNAPSHOT_ALIGNMENT = 64 # Byte alignment of every array in a snapshot file (keeps memory-mapped views aligned)
+
+# --- Recording / Replay ---
+RECORDING_PATH = "recording.golrec" # R starts/stops recording here
+RECORD_POSITION_QUANTUM = 0.01 # Recorded positions are rounded to this (world units)
+RECORD_KEYFRAME_INTERVAL = 120 # Frames between full keyframes (seeking decodes at most this many deltas)
+RECORD_QUEUE_FRAMES = 32 # Frames buffered for the writer thread before new ones are dropped
+RECORD_COMPRESSION_LEVEL = 1 # zlib level (1 = fastest)
+REPLAY_SEEK_SECONDS = 5 # Left/Right arrow jump during replay
+
+# --- Video Export ---
+VIDEO_WIDTH = 1920; VIDEO_HEIGHT = 1080 # Default off-screen frame size
+VIDEO_FPS = 60 # Default output frame rate
+VIDEO_QUEUE_FRAMES = 8 # Frames waiting for the writer thread before the simulation waits
+VIDEO_PNG_COMPRESSION = 1 # zlib level for PNG sequences (1 = fastest)
+VIDEO_FFMPEG = "ffmpeg" # Encoder executable for video files
+
+# --- Simulation Process ---
+SIM_PROCESS = False # Run physics in its own process (main.py --sim-process); the window only draws its published frames
+SIM_FRAME_CAPACITY = 4096 # Particles per shared frame buffer at start (doubled whenever the scene outgrows it)
+SIM_WALL_CAPACITY = 256 # Wall segments per shared frame buffer at start (doubled likewise)
+SIM_COMMAND_RING_BYTES = 1 << 20 # Shared ring carrying tool/placement commands to the simulation process
+SIM_IDLE_SLEEP = 0.002 # Seconds the simulation process sleeps when it had no step to run
+
+# --- Profiler ---
+PROFILER_WINDOW = 60 # Frames averaged in the profiler overlay
+
 # --- UI States ---
 UI_STATE_NORMAL = 0; UI_STATE_EDITING_MULTIPLIER = 1
 UI_STATE_SHOW_TOOL_EDITOR = 2; UI_STATE_DRAWING_WALL = 3
@@ -56,12 +118,24 @@ PARTICLE_TYPES = ["red", "green", "blue", "yellow", "anti"] # Placeable types
 # --- Particle Colors ---
 PARTICLE_COLORS = { "red": RED, "green": GREEN, "blue": BLUE, "yellow": YELLOW, "wall": WALL_COLOR, "anti": ANTI_PARTICLE_COLOR }
 
+# --- Interaction Rules (type -> {other type: force magnitude}) ---
+# A rule listed on either type applies to the pair; repulsion wins over attraction. Compiled by interaction_matrix.py
+PARTICLE_ATTRACTS = {
+    "red": {"blue": RED_BLUE_ATTRACT_FORCE},
+    "green": {"red": GREEN_ATTRACT_FORCE, "green": GREEN_ATTRACT_FORCE, "blue": GREEN_ATTRACT_FORCE}, # Green attracts everything (except Yellow, Anti)
+    "anti": {"red": ANTI_PARTICLE_ATTRACT_FORCE, "green": ANTI_PARTICLE_ATTRACT_FORCE, "blue": ANTI_PARTICLE_ATTRACT_FORCE}, # Anti attracts everything (except Yellow, Anti)
+}
+PARTICLE_REPELS = {
+    "red": {"red": RED_SELF_REPEL}, "blue": {"blue": BLUE_SELF_REPEL},
+    "yellow": {ptype: YELLOW_REPEL_FORCE for ptype in PARTICLE_TYPES}, # Yellow repels everything
+}
+
 # --- Base Particle Definitions ---
 BASE_PARTICLE_DEFINITIONS = {
     ptype: {
         "color": PARTICLE_COLORS.get(ptype, WHITE), "size": DEFAULT_PARTICLE_SIZE,
         "is_movable": True, "is_anti_particle": ptype == "anti",
-        "attracts": {}, "repels": {}
+        "attracts": dict(PARTICLE_ATTRACTS.get(ptype, {})), "repels": dict(PARTICLE_REPELS.get(ptype, {}))
     } for ptype in PARTICLE_TYPES
 }
 
@@ -73,4 +147,7 @@ WALL_PARTICLE_DEFINITION = {
 }
 
 # --- Time Control Constants ---
-MIN_SPEED = 0.1; MAX_SPEED = 8.0; SPEED_INCREMENT = 0.1
\ No newline at end of file
+MIN_SPEED = 0.1; MAX_SPEED = 8.0; SPEED_INCREMENT = 0.1
+PHYSICS_STEP_DT = 1.0 / FPS # Fixed physics step (simulated seconds); game speed changes how many run per frame, not their size
+PHYSICS_SUBSTEPS = 2 # Simulation steps per fixed step (each of PHYSICS_STEP_DT / PHYSICS_SUBSTEPS)
+PHYSICS_MAX_STEPS_PER_FRAME = 10 # Fixed steps allowed per rendered frame; extra time is dropped instead of spiralling
\ No newline at end of file
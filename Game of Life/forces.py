@@ -0,0 +1,77 @@
+# forces.py
+# Description: Pairwise interaction forces computed over a cell list instead of every particle pair.
+
+import math
+import numpy as np
+from constants import CHUNK_SIZE, GENERAL_ATTRACTION_MAX_CHUNKS, MAX_INTERACTION_FORCE, MIN_FORCE_THRESHOLD_SQ
+from cell_grid import CellGrid, iter_gather_pairs
+
+def decayed_force(base_force, dist_chunks):
+    """ Full strength within 1 chunk, halving per chunk after that, 0 past GENERAL_ATTRACTION_MAX_CHUNKS. """
+    dist_chunks = np.asarray(dist_chunks, dtype=np.float64)
+    decay = np.where(dist_chunks <= 1.0, 1.0, 0.5 ** (dist_chunks - 1.0))
+    return np.where(dist_chunks <= GENERAL_ATTRACTION_MAX_CHUNKS, base_force * decay, 0.0)
+
+def pair_force_scale(dist_sq, signed):
+    """
+    Per-pair factor s such that the force on a target is (source - target) * s.
+    signed is the pair rule's signed magnitude; overlapping pairs, pairs without a rule and tiny forces give 0.
+    """
+    valid = (dist_sq >= 1e-9) & (signed != 0.0) # Skip overlapping / no rule
+    dist = np.sqrt(np.where(valid, dist_sq, 1.0))
+    magnitude = np.minimum(decayed_force(np.abs(signed), dist / CHUNK_SIZE), MAX_INTERACTION_FORCE)
+    return np.where(valid & (magnitude * magnitude > MIN_FORCE_THRESHOLD_SQ), magnitude * np.sign(signed), 0.0) / dist
+
+class CellListForceEngine:
+    """
+    Exact pairwise forces, visiting only pairs within the decay cutoff (GENERAL_ATTRACTION_MAX_CHUNKS chunks).
+    Particles are bucketed on the CHUNK_SIZE grid; each target sums the forces from the cells around it.
+    """
+    def __init__(self, cell_size=CHUNK_SIZE, cutoff_chunks=GENERAL_ATTRACTION_MAX_CHUNKS):
+        self.cell_size = cell_size
+        self.cutoff = cutoff_chunks * CHUNK_SIZE
+        reach = math.ceil(self.cutoff / cell_size)
+        # Keep only cell offsets whose closest points can be within the cutoff
+        self.offsets = [(dx, dy) for dx in range(-reach, reach + 1) for dy in range(-reach, reach + 1)
+                        if math.hypot(max(abs(dx) - 1, 0), max(abs(dy) - 1, 0)) * cell_size <= self.cutoff]
+        self.last_pair_count = 0
+
+    def accumulate(self, store, interactions, active=None):
+        """
+        Adds interaction forces into store.acc for every movable particle (interactions: an InteractionMatrix).
+        If `active` (bool per store row) is given, only those particles receive forces; all still act as sources.
+        """
+        type_ids = store.type_ids_array
+        members = np.flatnonzero(interactions.participating[type_ids])
+        if len(members) < 2: self.last_pair_count = 0; return
+        receives = store.movable[members] if active is None else store.movable[members] & active[members]
+        targets = np.flatnonzero(receives)
+        if len(targets) == 0: self.last_pair_count = 0; return
+        store.acc[members[targets]] += self.compute(store.positions[members], type_ids[members], interactions.signed, targets=targets)
+
+    def compute(self, positions, type_ids, interaction_table, targets=None):
+        """
+        Returns the net interaction force on each target (all points by default) from every point within the cutoff.
+        interaction_table[type_a, type_b] is the signed magnitude (+ attract / - repel) of the pair rule.
+        Each target's contributions are summed in a fixed (offset, source) order within one batch, so results do
+        not depend on which other targets are computed alongside it.
+        """
+        positions = np.asarray(positions, dtype=np.float64); self.last_pair_count = 0
+        sources = CellGrid(positions, self.cell_size)
+        if targets is None: targets = np.arange(len(positions)); target_grid = sources
+        else: targets = np.asarray(targets, dtype=np.int64); target_grid = CellGrid(positions[targets], self.cell_size)
+        force_x = np.zeros(len(targets)); force_y = np.zeros(len(targets))
+
+        for local_t, src in iter_gather_pairs(target_grid, sources, self.offsets):
+            fx, fy = self._pair_forces(positions, type_ids, interaction_table, targets[local_t], src)
+            self.last_pair_count += len(local_t)
+            force_x += np.bincount(local_t, weights=fx, minlength=len(targets))
+            force_y += np.bincount(local_t, weights=fy, minlength=len(targets))
+        return np.column_stack((force_x, force_y))
+
+    def _pair_forces(self, positions, type_ids, interaction_table, tgt, src):
+        """ Force on each tgt from its src partner (zero for pairs outside the rules or cutoff). """
+        delta = positions[src] - positions[tgt]
+        dist_sq = np.einsum("ij,ij->i", delta, delta)
+        scale = pair_force_scale(dist_sq, interaction_table[type_ids[tgt], type_ids[src]])
+        return delta[:, 0] * scale, delta[:, 1] * scale
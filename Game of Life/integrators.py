@@ -0,0 +1,54 @@
+# integrators.py
+# Description: Pluggable time integrators that drive one simulation step (forces, collisions, motion) in place on the ParticleStore.
+
+class SemiImplicitEuler:
+    """
+    vel += acc * dt, then pos += vel * dt (the new velocity moves the particle).
+    One force evaluation per step; accelerations are cleared afterwards.
+    """
+    name = "euler"
+
+    def step(self, sim, dt):
+        """ Advances sim by dt. Returns how many particles were annihilated. """
+        store = sim.particles; profiler = sim.profiler; store.begin_step()
+        with profiler.stage("forces"): sim.compute_forces() # Apply forces to acc
+        with profiler.stage("collisions"): removed = sim.resolve_collisions() # Resolve positions/velocities, remove annihilated particles
+        with profiler.stage("integrate"): store.kick(dt); store.limit_speed(); store.drift(dt); store.clear_accelerations()
+        with profiler.stage("collisions"): removed += sim.resolve_wall_collisions() # Swept over everything that moved the particles this step
+        with profiler.stage("integrate"): moved = store.refresh_chunks()
+        if moved:
+            with profiler.stage("chunks"): sim.chunks.update()
+        return removed
+
+class VelocityVerlet:
+    """
+    Kick-drift-kick velocity Verlet: half kick with the accelerations from the end of the previous step,
+    full drift, forces at the new positions, second half kick. Still one force evaluation per step,
+    but second-order accurate and time-reversible, so it stays stable at larger timesteps.
+    Accelerations are kept between steps (forces added by tools in between go into the first half kick).
+    """
+    name = "verlet"
+
+    def __init__(self):
+        self.primed = False # Whether store.acc holds the forces at the current positions
+
+    def step(self, sim, dt):
+        """ Advances sim by dt. Returns how many particles were annihilated. """
+        store = sim.particles; profiler = sim.profiler; half_dt = dt * 0.5; store.begin_step()
+        if not self.primed: # The first half kick needs real accelerations, or the whole run is only first-order accurate
+            with profiler.stage("forces"): store.clear_accelerations(); sim.compute_forces()
+            self.primed = True
+        with profiler.stage("integrate"): store.kick(half_dt); store.limit_speed(); store.drift(dt); store.clear_accelerations()
+        with profiler.stage("forces"): sim.compute_forces() # Accelerations at the new positions
+        with profiler.stage("integrate"): store.kick(half_dt); store.limit_speed()
+        with profiler.stage("collisions"): removed = sim.resolve_collisions() + sim.resolve_wall_collisions()
+        with profiler.stage("integrate"): moved = store.refresh_chunks()
+        if moved:
+            with profiler.stage("chunks"): sim.chunks.update()
+        return removed
+
+INTEGRATORS = {"euler": SemiImplicitEuler, "verlet": VelocityVerlet}
+
+def make_integrator(name):
+    if name not in INTEGRATORS: raise ValueError(f"Unknown integrator: {name} (choose from {', '.join(INTEGRATORS)})")
+    return INTEGRATORS[name]()
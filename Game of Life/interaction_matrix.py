@@ -0,0 +1,53 @@
+# interaction_matrix.py
+# Description: Compiles the per-type "attracts"/"repels" rules into a dense type-id x type-id lookup table.
+
+import numpy as np
+
+class InteractionMatrix:
+    """
+    Dense (sign, magnitude) table indexed by ParticleStore type ids.
+    Rebuilt lazily when the registered types or enable states change, or after invalidate() (definition edits).
+    """
+    def __init__(self):
+        self.sign = np.zeros((0, 0), dtype=np.int8)
+        self.magnitude = np.zeros((0, 0), dtype=np.float64)
+        self.signed = np.zeros((0, 0), dtype=np.float64) # sign * magnitude, what the force engines read
+        self.participating = np.zeros(0, dtype=np.bool_) # Types with at least one active rule
+        self._key = None
+        self.version = 0 # Bumped on every rebuild, so callers can notice rule changes
+
+    def invalidate(self):
+        """ Forces a rebuild on the next get() (call after editing particle definitions in place). """
+        self._key = None
+
+    def get(self, type_names, particle_definitions, particle_enable_states):
+        """ Returns self, rebuilding the tables first if anything they depend on changed. """
+        key = (tuple(type_names), tuple(particle_enable_states.get(name, True) for name in type_names))
+        if key != self._key: self._build(type_names, particle_definitions, particle_enable_states); self._key = key
+        return self
+
+    def _build(self, type_names, particle_definitions, particle_enable_states):
+        n = len(type_names)
+        self.sign = np.zeros((n, n), dtype=np.int8); self.magnitude = np.zeros((n, n), dtype=np.float64)
+        enabled = [particle_enable_states.get(name, True) for name in type_names]
+        for a, name_a in enumerate(type_names):
+            if not enabled[a]: continue
+            def_a = particle_definitions.get(name_a, {})
+            for b in range(a, n):
+                if not enabled[b]: continue
+                name_b = type_names[b]; def_b = particle_definitions.get(name_b, {})
+                sign, magnitude = self._pair_rule(def_a, name_a, def_b, name_b)
+                self.sign[a, b] = self.sign[b, a] = sign
+                self.magnitude[a, b] = self.magnitude[b, a] = magnitude
+        self.signed = self.sign * self.magnitude
+        self.participating = np.any(self.signed != 0.0, axis=1)
+        self.version += 1
+
+    @staticmethod
+    def _pair_rule(def_a, name_a, def_b, name_b):
+        """ Symmetric rule for a pair: a rule on either side applies, repulsion wins over attraction. """
+        repel = max(def_a.get("repels", {}).get(name_b, 0.0), def_b.get("repels", {}).get(name_a, 0.0))
+        if repel > 0: return -1, repel
+        attract = max(def_a.get("attracts", {}).get(name_b, 0.0), def_b.get("attracts", {}).get(name_a, 0.0))
+        if attract > 0: return 1, attract
+        return 0, 0.0
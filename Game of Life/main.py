@@ -1,37 +1,50 @@
 # main.py
 import pygame
 import sys
-import random
 import math
 import time
-from collections import defaultdict
+import numpy as np
 
 # Import constants AFTER they are correctly defined
 from constants import *
-from particle import Particle
+from simulation import Simulation, FORCE_MODES
+from renderer import ParticleRenderer
+from timestep import FixedTimestep
+from integrators import INTEGRATORS
 from camera import Camera
 from ui import UI
+from snapshot import save_snapshot, load_snapshot, read_header
+from recorder import Recorder, ReplayPlayer
+from compositor import Compositor
+from sim_process import SimulationClient
+from spawner import SPAWN_SHAPES, SPAWN_DISTRIBUTIONS
 
 class Game:
-    def __init__(self):
+    def __init__(self, force_mode=FORCE_MODE, theta=BARNES_HUT_THETA, workers=PARALLEL_WORKERS, integrator=INTEGRATOR, sim_process=SIM_PROCESS):
         pygame.init()
         self.screen_flags = pygame.RESIZABLE
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), self.screen_flags)
         pygame.display.set_caption("Particle Sim")
         self.clock = pygame.time.Clock()
         self.running = True; self.fullscreen = False; self.is_paused = False
-        self.particles = []; self.chunks = defaultdict(list)
-        self.particle_definitions = BASE_PARTICLE_DEFINITIONS.copy()
-        self.particle_definitions["wall"] = WALL_PARTICLE_DEFINITION
-        self.particle_enable_states = {ptype: True for ptype in self.particle_definitions}
-        self.particle_lock_states = {ptype: (ptype == "wall") for ptype in self.particle_definitions}
+        self.sim_process = sim_process # Physics in its own process: self.sim is then a SimulationClient viewing its published frames
+        self.sim = (SimulationClient if sim_process else Simulation)(force_mode=force_mode, theta=theta, workers=workers, integrator=integrator) # All physics state lives here; Game only views and edits it
+        self.particles = self.sim.particles; self.chunks = self.sim.chunks
+        self.particle_definitions = self.sim.particle_definitions
+        self.particle_enable_states = self.sim.particle_enable_states; self.particle_lock_states = self.sim.particle_lock_states
+        self.renderer = ParticleRenderer(); self.compositor = Compositor(); self.profiler = self.sim.profiler
+        self.timestep = FixedTimestep(); self.render_alpha = 1.0 # Fixed physics steps; drawing interpolates between the last two
+        self.lod_enabled = True # Density map instead of particles below LOD_ZOOM_THRESHOLD
+        self.recorder = None; self.replay = None; self.replay_time = 0.0 # Recording in progress / recording being played back (and its simulated time)
+        print(f"Force mode: {force_mode}" + (f" (theta {theta})" if force_mode == "barnes-hut" else "") + (f" ({self.sim.force_engine.workers} workers)" if force_mode == "parallel" and not sim_process else "") + (" in a separate simulation process" if sim_process else ""))
         current_w, current_h = self.screen.get_size()
         self.camera = Camera(current_w, current_h)
         self.ui = UI(current_w, current_h)
         self.is_panning = False; self.pan_start_pos = None
         self.is_applying_tool_continuously = False
         self.eraser_radius = ERASER_START_RADIUS; self.tool_strength = DEFAULT_TOOL_STRENGTH
-        self.cursor_chunk_coord = None; self.wall_draw_start_pos = None
+        self.brush_shape = DEFAULT_BRUSH_SHAPE; self.brush_distribution = DEFAULT_BRUSH_DISTRIBUTION; self.brush_radius = BRUSH_START_RADIUS; self.brush_start = None # Spawn brush (world press point while dragging)
+        self.cursor_chunk_coord = None; self.wall_draw_start_pos = None; self._overlay_rect = None
         self.game_speed_multiplier = 1.0; self.min_speed = MIN_SPEED
         self.max_speed = MAX_SPEED; self.speed_increment = SPEED_INCREMENT
         if hasattr(self, 'ui') and self.ui: self.ui.update_dimensions(current_w, current_h)
@@ -39,18 +52,27 @@ class Game:
 
     def run(self):
         while self.running:
-            dt_real = self.clock.tick(FPS) / 1000.0; dt_real = min(dt_real, 0.1)
-            effective_dt = dt_real * self.game_speed_multiplier if not self.is_paused else 0.0
+            dt_real = self.clock.tick(FPS) / 1000.0; dt_real = min(dt_real, 0.1); self.profiler.begin_frame()
+            frame_dt = dt_real * self.game_speed_multiplier if not self.is_paused else 0.0
             mouse_pos = pygame.mouse.get_pos()
             if hasattr(self.ui, 'play_area_rect') and self.ui.play_area_rect and self.ui.play_area_rect.collidepoint(mouse_pos):
                  if hasattr(self, 'camera') and self.camera:
                       world_pos = self.camera.screen_to_world(mouse_pos); self.cursor_chunk_coord = (int(world_pos.x // CHUNK_SIZE), int(world_pos.y // CHUNK_SIZE))
                  else: self.cursor_chunk_coord = None
             else: self.cursor_chunk_coord = None
-            self.handle_events(mouse_pos)
-            self.update(effective_dt)
+            with self.profiler.stage("events"): self.handle_events(mouse_pos)
+            if self.sim_process: self.sim.set_speed(0.0 if self.is_paused or self.replay else self.game_speed_multiplier); self.sim.acquire() # Steps run in the simulation process; just take its newest frame
+            if self.replay: self._advance_replay(frame_dt)
+            elif not self.sim_process:
+                steps = self.timestep.advance(frame_dt); self.profiler.count("steps", steps * self.timestep.substeps)
+                for _ in range(steps):
+                     self.particles.save_previous()
+                     for _ in range(self.timestep.substeps): self.update(self.timestep.substep_dt)
+                if self.recorder and steps: self.recorder.capture(self.sim) # Copies and queues only; the writer thread does the rest
+                self.render_alpha = self.timestep.alpha
             self.draw()
-        pygame.quit(); sys.exit()
+            self.profiler.end_frame()
+        self.shutdown(); pygame.quit(); sys.exit()
 
     def handle_events(self, mouse_pos):
         if not hasattr(self, 'ui') or not self.ui: return
@@ -65,9 +87,10 @@ class Game:
                       action_type, action_payload = ui_action
                       if action_type == 'toggle_lock':
                            ptype = action_payload
-                           if ptype in self.particle_lock_states: self.particle_lock_states[ptype] = not self.particle_lock_states[ptype]; print(f"{ptype} lock: {self.particle_lock_states[ptype]}")
+                           if ptype in self.particle_lock_states: self.sim.set_locked(ptype, not self.particle_lock_states[ptype]); print(f"{ptype} lock: {self.particle_lock_states[ptype]}")
                  elif isinstance(ui_action, str):
                       if ui_action == 'reset_simulation': self.reset_simulation(); return
+                      elif ui_action == 'cycle_brush_shape': self._cycle_brush(shape=True)
                       elif ui_action == 'cancel_wall_draw' or ui_action == 'start_wall_draw':
                            self.wall_draw_start_pos = None
                            if ui_action == 'start_wall_draw': print("Wall drawing mode ON.")
@@ -86,16 +109,19 @@ class Game:
                         elif button == 3 and self.ui.state != UI_STATE_DRAWING_WALL: self.is_panning = True; self.pan_start_pos = mouse_pos
                         elif button == 1 and self.ui.state == UI_STATE_NORMAL:
                              if self.ui.selected_tool == "place": self._place_particles(mouse_pos)
+                             elif self.ui.selected_tool == "brush": world_pos = self.camera.screen_to_world(mouse_pos); self.brush_start = (world_pos.x, world_pos.y) # Spawns on release (a line runs press -> release)
                              else: self.is_applying_tool_continuously = True; self._apply_tool(mouse_pos)
                 if event.type == pygame.MOUSEBUTTONUP:
                     button = event.button
                     if button == 3: self.is_panning = False
-                    if button == 1: self.is_applying_tool_continuously = False
+                    if button == 1:
+                         self.is_applying_tool_continuously = False
+                         if self.brush_start is not None: self._spawn_brush(mouse_pos)
         if self.is_panning and mouse_buttons[2]:
             if self.pan_start_pos: dx = self.pan_start_pos[0] - mouse_pos[0]; dy = self.pan_start_pos[1] - mouse_pos[1]; self.camera.apply_pan(dx, dy); self.pan_start_pos = mouse_pos
         if self.is_applying_tool_continuously and mouse_buttons[0] and self.ui.state == UI_STATE_NORMAL:
              if self.ui.play_area_rect and self.ui.play_area_rect.collidepoint(mouse_pos):
-                  if self.ui.selected_tool != "place": self._apply_tool(mouse_pos)
+                  if self.ui.selected_tool not in ("place", "brush"): self._apply_tool(mouse_pos)
 
     def _handle_keydown(self, key):
         if not hasattr(self, 'ui') or not self.ui: return
@@ -110,6 +136,19 @@ class Game:
                 try: info = pygame.display.Info(); self.screen_flags = pygame.FULLSCREEN | pygame.SCALED; self._resize_screen(info.current_w, info.current_h)
                 except pygame.error as e: print(f"FS Error: {e}"); self.fullscreen = False; self.screen_flags = pygame.RESIZABLE
             else: self.screen_flags = pygame.RESIZABLE; self._resize_screen(SCREEN_WIDTH, SCREEN_HEIGHT)
+        elif key == pygame.K_F5: self.save_snapshot(SNAPSHOT_PATH)
+        elif key == pygame.K_F9: self.load_snapshot(SNAPSHOT_PATH)
+        elif key == pygame.K_r:
+            if self.replay: self.stop_replay()
+            else: self.toggle_recording(RECORDING_PATH)
+        elif self.replay and key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_HOME):
+            if key == pygame.K_HOME: self.replay_time = float(self.replay.times[0])
+            else: self.replay_time += REPLAY_SEEK_SECONDS if key == pygame.K_RIGHT else -REPLAY_SEEK_SECONDS
+            self._advance_replay(0.0)
+        elif key == pygame.K_b: self._cycle_brush(shape=True)
+        elif key == pygame.K_n: self._cycle_brush(shape=False)
+        elif key == pygame.K_l: self.lod_enabled = not self.lod_enabled; print(f"Zoomed-out density view {'ON' if self.lod_enabled else 'OFF'}")
+        elif key == pygame.K_F3: self.profiler.enabled = not self.profiler.enabled; print(f"Profiler overlay {'ON' if self.profiler.enabled else 'OFF'}")
         elif key == pygame.K_p: self.is_paused = not self.is_paused; print(f"Game {'Paused' if self.is_paused else 'Resumed'}")
         elif key == pygame.K_EQUALS or key == pygame.K_PLUS or key == pygame.K_KP_PLUS: self.game_speed_multiplier = min(self.max_speed, round(self.game_speed_multiplier + self.speed_increment, 2)); print(f"Speed: {self.game_speed_multiplier:.2f}x")
         elif key == pygame.K_MINUS or key == pygame.K_KP_MINUS: self.game_speed_multiplier = max(self.min_speed, round(self.game_speed_multiplier - self.speed_increment, 2)); print(f"Speed: {self.game_speed_multiplier:.2f}x")
@@ -120,300 +159,209 @@ class Game:
              if key == pygame.K_LEFTBRACKET:
                   if adjust_strength and self.ui.selected_tool in ['attract', 'repel']: new_strength = max(MIN_TOOL_STRENGTH, self.tool_strength - TOOL_STRENGTH_STEP); self.tool_strength = new_strength; print(f"Strength: {self.tool_strength}")
                   elif not adjust_strength and self.ui.selected_tool == 'erase': new_radius = max(MIN_ERASER_RADIUS, self.eraser_radius - ERASER_RADIUS_STEP); self.eraser_radius = new_radius; print(f"Radius: {self.eraser_radius}")
+                  elif not adjust_strength and self.ui.selected_tool == 'brush': self.brush_radius = max(MIN_BRUSH_RADIUS, self.brush_radius - BRUSH_RADIUS_STEP); print(f"Brush radius: {self.brush_radius}")
              elif key == pygame.K_RIGHTBRACKET:
                   if adjust_strength and self.ui.selected_tool in ['attract', 'repel']: new_strength = min(MAX_TOOL_STRENGTH, self.tool_strength + TOOL_STRENGTH_STEP); self.tool_strength = new_strength; print(f"Strength: {self.tool_strength}")
                   elif not adjust_strength and self.ui.selected_tool == 'erase': new_radius = min(MAX_ERASER_RADIUS, self.eraser_radius + ERASER_RADIUS_STEP); self.eraser_radius = new_radius; print(f"Radius: {self.eraser_radius}")
+                  elif not adjust_strength and self.ui.selected_tool == 'brush': self.brush_radius = min(MAX_BRUSH_RADIUS, self.brush_radius + BRUSH_RADIUS_STEP); print(f"Brush radius: {self.brush_radius}")
+
+    def _spawn_type(self):
+        """ The selected particle type if it can be placed now, else None. """
+        if not hasattr(self, 'ui') or not self.ui: return None
+        ptype = self.ui.selected_particle_type
+        if ptype == "wall" or ptype not in self.particle_definitions or not self.particle_enable_states.get(ptype, True): return None
+        return ptype
 
     def _place_particles(self, screen_pos):
-        if not hasattr(self, 'ui') or not self.ui: return
-        world_pos = self.camera.screen_to_world(screen_pos); ptype = self.ui.selected_particle_type
-        if ptype == "wall" or ptype not in self.particle_definitions or not self.particle_enable_states.get(ptype, True): return
-        pdef = self.particle_definitions[ptype]
-        for _ in range(self.ui.cell_multiplier):
-            offset = pygame.math.Vector2(random.uniform(-2, 2), random.uniform(-2, 2)) * (self.ui.cell_multiplier > 1)
-            new_particle = Particle(world_pos.x + offset.x, world_pos.y + offset.y, pdef, name=ptype)
-            self.particles.append(new_particle); new_particle.chunk_coord = new_particle.get_chunk_coord(); self.chunks[new_particle.chunk_coord].append(new_particle)
+        """ Place tool: the multiplier's worth of particles as a Poisson-disc cluster sized to fit them, so they start apart. """
+        ptype = self._spawn_type()
+        if ptype is None: return
+        world_pos = self.camera.screen_to_world(screen_pos)
+        self.sim.spawn(ptype, self.ui.cell_multiplier, center=(world_pos.x, world_pos.y))
+
+    def _spawn_brush(self, screen_pos):
+        """ Brush tool (on release): the multiplier's worth of particles in the brush shape/distribution where the outline was (a line: press -> release). """
+        start = self.brush_start; self.brush_start = None; ptype = self._spawn_type()
+        if ptype is None or self.ui.state != UI_STATE_NORMAL: return
+        world_pos = self.camera.screen_to_world(screen_pos); count = self.ui.cell_multiplier
+        end = (world_pos.x, world_pos.y)
+        if self.brush_shape == "line": spawned = self.sim.spawn(ptype, count, "line", self.brush_distribution, start, self.brush_radius, end=end)
+        else: spawned = self.sim.spawn(ptype, count, self.brush_shape, self.brush_distribution, end, self.brush_radius)
+        if spawned is not None and len(spawned) < count: print(f"Brush full: spawned {len(spawned)} of {count} {ptype}")
+
+    def _cycle_brush(self, shape):
+        """ Steps the brush to its next shape (or distribution). """
+        if shape: self.brush_shape = SPAWN_SHAPES[(SPAWN_SHAPES.index(self.brush_shape) + 1) % len(SPAWN_SHAPES)]; print(f"Brush shape: {self.brush_shape}")
+        else: self.brush_distribution = SPAWN_DISTRIBUTIONS[(SPAWN_DISTRIBUTIONS.index(self.brush_distribution) + 1) % len(SPAWN_DISTRIBUTIONS)]; print(f"Brush distribution: {self.brush_distribution}")
 
     def _place_wall_segment(self, world_start, world_end):
         if "wall" not in self.particle_definitions: print("Error: Wall definition missing."); return
-        pdef = self.particle_definitions["wall"]; wall_size = pdef.get("size", DEFAULT_PARTICLE_SIZE); spacing = wall_size * 1.2
-        try:
-            distance = world_start.distance_to(world_end)
-            if distance < 1.0 : return
-            direction = (world_end - world_start).normalize()
-            num_steps = int(distance / spacing) if spacing > 1e-6 else 0
-            for i in range(num_steps + 1):
-                current_pos = world_start + direction * i * spacing
-                new_particle = Particle(current_pos.x, current_pos.y, pdef, name="wall")
-                self.particles.append(new_particle); new_particle.chunk_coord = new_particle.get_chunk_coord(); self.chunks[new_particle.chunk_coord].append(new_particle)
+        try: self.sim.add_wall_segment(world_start, world_end)
         except (ValueError, ZeroDivisionError) as e: print(f"Wall placement error: {e}")
 
     def _apply_tool(self, screen_pos):
         if not hasattr(self, 'ui') or not self.ui: return
-        world_pos_vec = self.camera.screen_to_world(screen_pos); active_tool = self.ui.selected_tool
+        world_pos_vec = self.camera.screen_to_world(screen_pos); point = (world_pos_vec.x, world_pos_vec.y); active_tool = self.ui.selected_tool
         if active_tool == "erase":
-            tool_radius = self.eraser_radius; tool_radius_sq = tool_radius * tool_radius; particles_to_remove = set()
-            chunk_search_radius = math.ceil(tool_radius / CHUNK_SIZE); center_chunk_x = int(world_pos_vec.x // CHUNK_SIZE); center_chunk_y = int(world_pos_vec.y // CHUNK_SIZE)
-            for dx in range(-chunk_search_radius, chunk_search_radius + 1):
-                for dy in range(-chunk_search_radius, chunk_search_radius + 1):
-                    check_coord = (center_chunk_x + dx, center_chunk_y + dy)
-                    if check_coord in self.chunks:
-                        indices_to_remove_from_chunk = []
-                        for idx, p in enumerate(self.chunks[check_coord]):
-                            if not self.particle_lock_states.get(p.type, False) and p not in particles_to_remove and p.pos.distance_squared_to(world_pos_vec) < tool_radius_sq:
-                                particles_to_remove.add(p); indices_to_remove_from_chunk.append(idx)
-                        if indices_to_remove_from_chunk:
-                            for idx in sorted(indices_to_remove_from_chunk, reverse=True): del self.chunks[check_coord][idx]
-            if particles_to_remove: self.particles = [p for p in self.particles if p not in particles_to_remove]; print(f"Erased {len(particles_to_remove)} particles.") if len(particles_to_remove) > 0 else None
-        elif active_tool in ["attract", "repel"]:
-            tool_radius = TOOL_RADIUS; tool_radius_sq = tool_radius * tool_radius; strength = self.tool_strength if active_tool == "attract" else -self.tool_strength
-            chunk_search_radius = math.ceil(tool_radius / CHUNK_SIZE); center_chunk_x = int(world_pos_vec.x // CHUNK_SIZE); center_chunk_y = int(world_pos_vec.y // CHUNK_SIZE)
-            for dx in range(-chunk_search_radius, chunk_search_radius + 1):
-                 for dy in range(-chunk_search_radius, chunk_search_radius + 1):
-                      check_coord = (center_chunk_x + dx, center_chunk_y + dy)
-                      if check_coord in self.chunks:
-                           for p in self.chunks[check_coord]:
-                                if self.particle_enable_states.get(p.type, True) and p.is_movable:
-                                     dist_sq = p.pos.distance_squared_to(world_pos_vec)
-                                     if 0 < dist_sq < tool_radius_sq:
-                                          direction = world_pos_vec - p.pos; dist = direction.length()
-                                          if dist > 1e-6: direction.normalize_ip(); falloff = ((tool_radius - dist) / tool_radius)**2; force = direction * strength * falloff; p.apply_force(force)
-
-    def _get_active_chunks_coords(self):
-        visible_rect = self.camera.get_visible_world_rect(); buffer = CHUNK_LOAD_BUFFER * CHUNK_SIZE; start_chunk_x = int((visible_rect.left - buffer) // CHUNK_SIZE); end_chunk_x = int((visible_rect.right + buffer) // CHUNK_SIZE); start_chunk_y = int((visible_rect.top - buffer) // CHUNK_SIZE); end_chunk_y = int((visible_rect.bottom + buffer) // CHUNK_SIZE); active_coords = set((cx, cy) for cx in range(start_chunk_x, end_chunk_x + 1) for cy in range(start_chunk_y, end_chunk_y + 1)); return active_coords
-
-    def _update_chunk_assignments(self):
-        self.chunks.clear(); [self.chunks[p.get_chunk_coord()].append(p) for p in self.particles]
-
-    def _calculate_decayed_force(self, base_force, dist_chunks):
-        if dist_chunks <= 1.0: return base_force
-        elif dist_chunks <= GENERAL_ATTRACTION_MAX_CHUNKS: return base_force * (0.5 ** (dist_chunks - 1.0))
-        else: return 0.0
-
-    # REPLACEMENT for _calculate_interactions (Additive, Symmetric, Rule-Based)
-    def _calculate_interactions(self, dt):
-        """ Calculates forces based on additive pairwise rules with symmetry. """
-        num_particles = len(self.particles)
-        origin = pygame.math.Vector2(0, 0)
-
-        # --- Apply Green Center Attraction First ---
-        for p_a in self.particles: # Iterate through all particles for this effect
-            if p_a.type == "green" and p_a.is_movable and self.particle_enable_states.get(p_a.type, True):
-                 dist_vec_origin = origin - p_a.pos; dist_sq_origin = dist_vec_origin.length_squared()
-                 if dist_sq_origin > 1e-6:
-                      dist_origin = math.sqrt(dist_sq_origin); dist_chunks_origin = dist_origin / CHUNK_SIZE
-                      force_mag = self._calculate_decayed_force(GREEN_CENTER_ATTRACT_FORCE, dist_chunks_origin)
-                      if force_mag > 0:
-                           center_force = dist_vec_origin.normalize() * force_mag
-                           if center_force.length_squared() > MIN_FORCE_THRESHOLD_SQ: p_a.apply_force(center_force)
-
-        # --- Pairwise Interactions ---
-        for i in range(num_particles):
-            p_a = self.particles[i]
-            # Skip walls, disabled for force calculation origin
-            if not self.particle_enable_states.get(p_a.type, True) or p_a.type == "wall": continue
-
-            for j in range(i + 1, num_particles):
-                p_b = self.particles[j]
-                # Skip walls, disabled for force calculation target
-                if not self.particle_enable_states.get(p_b.type, True) or p_b.type == "wall": continue
-
-                dist_vec = p_b.pos - p_a.pos; dist_sq = dist_vec.length_squared()
-                if dist_sq < 1e-9: continue # Skip overlapping
-
-                dist = math.sqrt(dist_sq); direction_a_to_b = dist_vec / dist; dist_chunks = dist / CHUNK_SIZE
-
-                # Calculate net force contributions for this pair
-                net_force_a = pygame.math.Vector2(0,0)
-                net_force_b = pygame.math.Vector2(0,0)
-                type_a = p_a.type; type_b = p_b.type;
-                types = {type_a, type_b}
-
-                # --- Determine Force Magnitude & Type (+1 Attract / -1 Repel) ---
-                force_magnitude = 0
-                force_type = 0 # 0 = No base interaction from rules below
-
-                # Rule 1: Yellow repels everything
-                if "yellow" in types:
-                    force_type = -1
-                    force_magnitude = YELLOW_REPEL_FORCE
-                # Rule 2: Anti attracts everything (except Yellow, Anti)
-                elif "anti" in types:
-                    if type_a != type_b: # Exclude Anti-Anti
-                         force_type = 1
-                         force_magnitude = ANTI_UNIVERSAL_ATTRACT
-                # Rule 3: Green attracts everything (except Yellow, Anti)
-                elif "green" in types:
-                     # This now covers G-G, G-R, G-B
-                     force_type = 1
-                     force_magnitude = GREEN_UNIVERSAL_ATTRACT
-                # Rule 4: Red/Blue specifics
-                elif types == {"red", "blue"}:
-                     force_type = 1
-                     force_magnitude = RED_BLUE_ATTRACT
-                elif type_a == "red" and type_b == "red":
-                     force_type = -1
-                     force_magnitude = RED_SELF_REPEL
-                elif type_a == "blue" and type_b == "blue":
-                     force_type = -1
-                     force_magnitude = BLUE_SELF_REPEL
-
-                # --- Calculate Final Pair Force Vector ---
-                if force_magnitude > 0 and force_type != 0:
-                    decayed_magnitude = self._calculate_decayed_force(force_magnitude, dist_chunks)
-                    if decayed_magnitude > 0:
-                        base_force_vector = direction_a_to_b * decayed_magnitude
-                        # Apply symmetrically based on force type
-                        net_force_a = base_force_vector * force_type
-                        net_force_b = -base_force_vector * force_type
-
-                        # --- Apply Pair Forces (Threshold and Limit) ---
-                        if p_a.is_movable:
-                            if net_force_a.length_squared() > MIN_FORCE_THRESHOLD_SQ:
-                                if net_force_a.length_squared() > MAX_INTERACTION_FORCE**2: net_force_a.scale_to_length(MAX_INTERACTION_FORCE)
-                                p_a.apply_force(net_force_a) # Add this pair's force to A's total acc
-
-                        if p_b.is_movable:
-                            if net_force_b.length_squared() > MIN_FORCE_THRESHOLD_SQ:
-                                if net_force_b.length_squared() > MAX_INTERACTION_FORCE**2: net_force_b.scale_to_length(MAX_INTERACTION_FORCE)
-                                p_b.apply_force(net_force_b) # Add this pair's force to B's total acc
-
-
-    # REPLACEMENT for _handle_collisions
-    def _handle_collisions(self):
-        """ Detects and resolves collisions: overlap push, elastic exchange, wall bounce, annihilation. """
-        particles_to_remove = set(); active_chunk_coords = self._get_active_chunks_coords()
-        needs_rebuild = False
-
-        for _ in range(COLLISION_ITERATIONS):
-             processed_pairs = set(); needs_another_pass = False
-             for chunk_coord in active_chunk_coords:
-                 if chunk_coord not in self.chunks or not self.chunks[chunk_coord]: continue
-                 particles_in_chunk = self.chunks[chunk_coord]
-                 neighbor_coords_to_check = set(); cx, cy = chunk_coord
-                 for dx in range(-1, 2):
-                      for dy in range(-1, 2):
-                           check_coord = (cx + dx, cy + dy)
-                           if check_coord in active_chunk_coords: neighbor_coords_to_check.add(check_coord)
-                 potential_partners = []
-                 for neighbor_coord in neighbor_coords_to_check:
-                      if neighbor_coord in self.chunks and neighbor_coord != chunk_coord: potential_partners.extend(self.chunks[neighbor_coord])
-                 all_potential_partners = particles_in_chunk + potential_partners
-
-                 for i, p_a in enumerate(particles_in_chunk):
-                      if p_a in particles_to_remove: continue
-                      for j in range(i + 1, len(all_potential_partners)):
-                           p_b = all_potential_partners[j]
-                           pair = tuple(sorted((id(p_a), id(p_b))))
-                           if pair in processed_pairs or p_b in particles_to_remove: continue
-
-                           dist_vec = p_b.pos - p_a.pos; dist_sq = dist_vec.length_squared()
-                           min_dist = p_a.size + p_b.size; min_dist_sq = min_dist * min_dist
-                           if 0 < dist_sq < min_dist_sq:
-                                processed_pairs.add(pair)
-                                is_a_anti = p_a.is_anti_particle; is_b_anti = p_b.is_anti_particle
-                                if is_a_anti != is_b_anti:
-                                     if not self.particle_lock_states.get(p_a.type, False): particles_to_remove.add(p_a)
-                                     if not self.particle_lock_states.get(p_b.type, False): particles_to_remove.add(p_b)
-                                     needs_rebuild = True; continue
-
-                                needs_another_pass = True; dist = math.sqrt(dist_sq); overlap = min_dist - dist
-                                try: normal = dist_vec.normalize()
-                                except ValueError: normal = pygame.math.Vector2(random.uniform(-1,1), random.uniform(-1,1)).normalize()
-                                is_a_wall = not p_a.is_movable; is_b_wall = not p_b.is_movable
-                                mass_a = p_a.mass if p_a.is_movable else float('inf'); mass_b = p_b.mass if p_b.is_movable else float('inf')
-                                total_mass = mass_a + mass_b
-
-                                # Overlap Resolution Push
-                                if total_mass > 1e-9 and total_mass != float('inf'): push_a = mass_b / total_mass; push_b = mass_a / total_mass; p_a.pos -= normal * overlap * push_a * COLLISION_PUSH_FACTOR; p_b.pos += normal * overlap * push_b * COLLISION_PUSH_FACTOR
-                                elif mass_a != float('inf'): p_a.pos -= normal * overlap
-                                elif mass_b != float('inf'): p_b.pos += normal * overlap
-
-                                # Collision Response (Velocity)
-                                v_rel = p_a.vel - p_b.vel; vel_along_normal = v_rel.dot(normal)
-                                if vel_along_normal < 0: # Moving towards each other
-                                    if is_a_wall and not is_b_wall: p_b.vel.reflect_ip(normal); p_b.vel *= WALL_BOUNCE_FACTOR
-                                    elif is_b_wall and not is_a_wall: p_a.vel.reflect_ip(normal); p_a.vel *= WALL_BOUNCE_FACTOR # Use same normal for reflect_ip
-                                    elif p_a.is_movable and p_b.is_movable and total_mass > 1e-9:
-                                        e = PARTICLE_COLLISION_ELASTICITY; j = -(1 + e) * vel_along_normal; j /= (1 / mass_a) + (1 / mass_b)
-                                        impulse_vec = normal * j; p_a.vel += impulse_vec / mass_a; p_b.vel -= impulse_vec / mass_b
-
-             if not needs_another_pass: break
-
-        if particles_to_remove:
-             self.particles = [p for p in self.particles if p not in particles_to_remove]
-             print(f"Annihilated {len(particles_to_remove)} particles.")
-
-        return needs_rebuild
-
+            erased, walls_removed = self.sim.erase_within(point, self.eraser_radius)
+            if erased: print(f"Erased {erased} particles.")
+            if walls_removed: print(f"Erased {walls_removed} walls.")
+        elif active_tool in ["attract", "repel"]: self.sim.apply_radial_force(point, TOOL_RADIUS, self.tool_strength if active_tool == "attract" else -self.tool_strength)
 
     def update(self, effective_dt):
         if effective_dt <= 0: return
-        self._calculate_interactions(effective_dt) # Apply forces to acc
-        needs_rebuild_collision = self._handle_collisions() # Resolve positions/velocities, get removal flag
-        needs_rebuild_movement = False
-        for p in list(self.particles):
-            if p in self.particles:
-                 if p.update(effective_dt): # Update using acc, move, check chunk change
-                    needs_rebuild_movement = True
-        if needs_rebuild_collision or needs_rebuild_movement: self._update_chunk_assignments()
+        self.sim.step(effective_dt)
+        if self.sim.last_removed_count: print(f"Annihilated {self.sim.last_removed_count} particles.")
 
 
     def draw(self):
-        self.screen.fill(BLACK); self._draw_chunk_grid()
-        active_chunk_coords = self._get_active_chunks_coords()
-        for chunk_coord in active_chunk_coords:
-             if chunk_coord in self.chunks:
-                  for p in self.chunks[chunk_coord]:
-                       if self.particle_enable_states.get(p.type, True): p.draw(self.screen, self.camera)
-        self._draw_tool_visuals()
-        game_state_for_ui = { 'camera_zoom': self.camera.zoom, 'eraser_radius': self.eraser_radius, 'tool_strength': self.tool_strength, 'cursor_chunk_coord': self.cursor_chunk_coord, 'particle_definitions': self.particle_definitions, 'particle_enable_states': self.particle_enable_states, 'particle_lock_states': self.particle_lock_states, 'is_paused': self.is_paused, 'game_speed': self.game_speed_multiplier, }
-        if hasattr(self, 'ui') and self.ui: self.ui.draw(self.screen, game_state_for_ui)
-        pygame.display.flip()
-
+        """
+        Composites cached layers: chunk grid (re-baked on pan/zoom/resize or sleep changes), walls (on wall edits),
+        the particle scene (when anything it shows changed), then the tool overlay and the UI. Only changed screen
+        regions are pushed to the display, so a paused, still scene costs almost nothing to present.
+        """
+        if not hasattr(self, 'ui') or not self.ui: return
+        comp = self.compositor; comp.begin(self.screen); view = self.ui.view_rect()
+        store, walls = (self.replay.store, self.replay.walls) if self.replay else (self.particles, self.sim.walls)
+        visible_types = [self.particle_enable_states.get(name, True) for name in store.type_names]
+        view_key = (self.camera.camera_offset.x, self.camera.camera_offset.y, self.camera.zoom, self.screen.get_size(), tuple(self.ui.play_area_rect))
+        with self.profiler.stage("draw"):
+             # --- Static layers: chunk grid and walls ---
+             if comp.stale("grid", view_key + (self.sim.sleep.version if self.sim.sleep is not None else None,)): grid = comp.layer("grid"); grid.fill(BLACK); self._draw_chunk_grid(grid)
+             wall_color = self.particle_definitions["wall"].get("color", WALL_COLOR); show_walls = self.particle_enable_states.get("wall", True)
+             if comp.stale("walls", view_key + (id(walls), walls.version, tuple(wall_color), show_walls)):
+                  wall_layer = comp.layer("walls", colorkey=BLACK); wall_layer.fill(BLACK)
+                  if show_walls: self.renderer.draw_walls(wall_layer, self.camera, walls, wall_color)
+             # --- Particle scene = grid + walls + particles, redrawn only when something it shows changed ---
+             lod = self.lod_enabled and not self.replay and not self.sim_process and self.camera.zoom < LOD_ZOOM_THRESHOLD # The chunk index lives in the simulation process
+             scene_key = (comp.key("grid"), comp.key("walls"), self.sim.step_count, store.revision, self.replay.position if self.replay else None,
+                          self.render_alpha, tuple(visible_types), tuple(tuple(store.type_color(i)) for i in range(len(store.type_names))), lod)
+             scene_changed = comp.stale("scene", scene_key)
+             if scene_changed:
+                  scene = comp.layer("scene"); scene.blit(comp.layer("grid"), (0, 0)); scene.blit(comp.layer("walls", colorkey=BLACK), (0, 0))
+                  if lod: self.renderer.draw_density(scene, self.camera, self.chunks, store, visible_types)
+                  else: self.renderer.draw(scene, self.camera, store, visible_types, self.render_alpha) # Batched: one transform/cull pass, stamps + pixel writes
+        # --- Tool overlay: drawn straight onto the screen, erased by restoring the scene underneath it ---
+        popup = self.ui.state == UI_STATE_SHOW_TOOL_EDITOR
+        popup_changed = comp.stale("popup", popup) # The translucent editor popup needs a fresh scene under it every frame, and once after it closes
+        overlay_changed = comp.stale("overlay", (pygame.mouse.get_pos(), self.ui.state, self.ui.selected_tool, self.eraser_radius, self.camera.zoom, self.wall_draw_start_pos,
+                                               self.brush_shape, self.brush_radius, self.brush_start))
+        if scene_changed or popup or popup_changed: comp.restore(self.screen, "scene", view)
+        elif overlay_changed: comp.restore(self.screen, "scene", self._overlay_rect)
+        if scene_changed or popup or popup_changed or overlay_changed: self._overlay_rect = self._draw_tool_visuals(); comp.mark_dirty(self._overlay_rect)
+        game_state_for_ui = { 'camera_zoom': self.camera.zoom, 'eraser_radius': self.eraser_radius, 'tool_strength': self.tool_strength, 'brush': (self.brush_shape, self.brush_distribution, self.brush_radius), 'cursor_chunk_coord': self.cursor_chunk_coord, 'cursor_chunk_count': self.sim.query.chunk_count(self.cursor_chunk_coord) if self.cursor_chunk_coord else 0, 'particle_definitions': self.particle_definitions, 'particle_enable_states': self.particle_enable_states, 'particle_lock_states': self.particle_lock_states, 'is_paused': self.is_paused, 'game_speed': self.game_speed_multiplier, }
+        if self.profiler.enabled: game_state_for_ui['profiler_text'] = self.profiler.summary_text()
+        with self.profiler.stage("ui"):
+             for rect in self.ui.draw(self.screen, game_state_for_ui): comp.mark_dirty(rect)
+        comp.present()
 
     def _draw_tool_visuals(self):
-         if not hasattr(self, 'ui') or not self.ui: return
-         original_clip = self.screen.get_clip()
-         if self.ui.play_area_rect: self.screen.set_clip(self.ui.play_area_rect)
-         else: return
-         mouse_pos = pygame.mouse.get_pos()
-         if self.ui.play_area_rect.collidepoint(mouse_pos):
-             if self.ui.state == UI_STATE_DRAWING_WALL and self.wall_draw_start_pos:
-                  start_screen_pos = self.camera.world_to_screen(self.wall_draw_start_pos); end_screen_pos = mouse_pos
-                  try: pygame.draw.line(self.screen, WALL_DRAW_LINE_COLOR, start_screen_pos, end_screen_pos, 3)
-                  except TypeError as e: print(f"Warn: Wall line draw error: {e}")
-             elif self.ui.selected_tool == 'erase': screen_radius = int(self.eraser_radius * self.camera.zoom); pygame.draw.circle(self.screen, ERASER_COLOR, mouse_pos, screen_radius, 1) if screen_radius >= 1 else None
-             elif self.ui.selected_tool in ['attract', 'repel']: screen_radius = int(TOOL_RADIUS * self.camera.zoom); color = BLUE if self.ui.selected_tool == 'attract' else RED; pygame.draw.circle(self.screen, color, mouse_pos, screen_radius, 1) if screen_radius >= 1 else None
+         """ Draws the wall-line / tool-radius preview at the cursor and returns the screen rect it covered (None if nothing). """
+         view = self.ui.view_rect(); mouse_pos = pygame.mouse.get_pos()
+         if not view or not view.collidepoint(mouse_pos): return None
+         original_clip = self.screen.get_clip(); self.screen.set_clip(view); drawn = None
+         if self.ui.state == UI_STATE_DRAWING_WALL and self.wall_draw_start_pos:
+              start_screen_pos = self.camera.world_to_screen(self.wall_draw_start_pos); end_screen_pos = mouse_pos
+              try: drawn = pygame.draw.line(self.screen, WALL_DRAW_LINE_COLOR, start_screen_pos, end_screen_pos, 3)
+              except TypeError as e: print(f"Warn: Wall line draw error: {e}")
+         elif self.ui.selected_tool == 'erase': screen_radius = int(self.eraser_radius * self.camera.zoom); drawn = pygame.draw.circle(self.screen, ERASER_COLOR, mouse_pos, screen_radius, 1) if screen_radius >= 1 else None
+         elif self.ui.selected_tool in ['attract', 'repel']: screen_radius = int(TOOL_RADIUS * self.camera.zoom); color = BLUE if self.ui.selected_tool == 'attract' else RED; drawn = pygame.draw.circle(self.screen, color, mouse_pos, screen_radius, 1) if screen_radius >= 1 else None
+         elif self.ui.selected_tool == 'brush': drawn = self._draw_brush_outline(mouse_pos)
          self.screen.set_clip(original_clip)
+         return drawn.inflate(2, 2).clip(view) if drawn else None # Thick lines can spill a pixel past the returned rect
 
 
-    def _draw_chunk_grid(self):
+    def _draw_brush_outline(self, mouse_pos):
+         """ Brush preview: the shape at the cursor (a line runs from the press point while dragging). Returns the rect drawn. """
+         screen_radius = max(1, int(self.brush_radius * self.camera.zoom)); x, y = mouse_pos
+         if self.brush_shape == "line":
+              start = self.camera.world_to_screen(self.brush_start) if self.brush_start is not None else None
+              return pygame.draw.line(self.screen, BRUSH_COLOR, start, mouse_pos, 1) if start is not None and tuple(start) != tuple(mouse_pos) else pygame.draw.line(self.screen, BRUSH_COLOR, (x - screen_radius, y), (x + screen_radius, y), 1)
+         if self.brush_shape == "rect": return pygame.draw.rect(self.screen, BRUSH_COLOR, pygame.Rect(x - screen_radius, y - screen_radius, 2 * screen_radius + 1, 2 * screen_radius + 1), 1)
+         drawn = pygame.draw.circle(self.screen, BRUSH_COLOR, mouse_pos, screen_radius, 1)
+         if self.brush_shape == "ring": pygame.draw.circle(self.screen, BRUSH_COLOR, mouse_pos, max(1, int(screen_radius * SPAWN_RING_INNER)), 1)
+         return drawn
+
+    def _draw_chunk_grid(self, surface):
         if not hasattr(self, 'ui') or not self.ui.play_area_rect: return
-        grid_color = DARK_GREY; visible_world_rect = self.camera.get_visible_world_rect(); start_x = math.floor(visible_world_rect.left / CHUNK_SIZE) * CHUNK_SIZE; end_x = math.ceil(visible_world_rect.right / CHUNK_SIZE) * CHUNK_SIZE; start_y = math.floor(visible_world_rect.top / CHUNK_SIZE) * CHUNK_SIZE; end_y = math.ceil(visible_world_rect.bottom / CHUNK_SIZE) * CHUNK_SIZE; original_clip = self.screen.get_clip(); self.screen.set_clip(self.ui.play_area_rect); step = CHUNK_SIZE
+        grid_color = DARK_GREY; visible_world_rect = self.camera.get_visible_world_rect(); start_x = math.floor(visible_world_rect.left / CHUNK_SIZE) * CHUNK_SIZE; end_x = math.ceil(visible_world_rect.right / CHUNK_SIZE) * CHUNK_SIZE; start_y = math.floor(visible_world_rect.top / CHUNK_SIZE) * CHUNK_SIZE; end_y = math.ceil(visible_world_rect.bottom / CHUNK_SIZE) * CHUNK_SIZE; original_clip = surface.get_clip(); surface.set_clip(self.ui.play_area_rect); step = CHUNK_SIZE
+        for cx, cy in (self.sim.sleep.sleeping_coords().tolist() if self.sim.sleep else ()): # Sleeping chunks, shaded under the grid lines
+            if start_x <= cx * CHUNK_SIZE < end_x and start_y <= cy * CHUNK_SIZE < end_y:
+                top_left = self.camera.world_to_screen((cx * CHUNK_SIZE, cy * CHUNK_SIZE)); bottom_right = self.camera.world_to_screen(((cx + 1) * CHUNK_SIZE, (cy + 1) * CHUNK_SIZE))
+                surface.fill(SLEEP_CHUNK_COLOR, pygame.Rect(top_left[0], top_left[1], bottom_right[0] - top_left[0] + 1, bottom_right[1] - top_left[1] + 1))
         world_coord = start_x;
-        while world_coord < end_x: p1 = self.camera.world_to_screen((world_coord, visible_world_rect.top)); p2 = self.camera.world_to_screen((world_coord, visible_world_rect.bottom)); pygame.draw.line(self.screen, grid_color, p1, p2, 1); world_coord += step
+        while world_coord < end_x: p1 = self.camera.world_to_screen((world_coord, visible_world_rect.top)); p2 = self.camera.world_to_screen((world_coord, visible_world_rect.bottom)); pygame.draw.line(surface, grid_color, p1, p2, 1); world_coord += step
         world_coord = start_y;
-        while world_coord < end_y: p1 = self.camera.world_to_screen((visible_world_rect.left, world_coord)); p2 = self.camera.world_to_screen((visible_world_rect.right, world_coord)); pygame.draw.line(self.screen, grid_color, p1, p2, 1); world_coord += step
-        self.screen.set_clip(original_clip)
+        while world_coord < end_y: p1 = self.camera.world_to_screen((visible_world_rect.left, world_coord)); p2 = self.camera.world_to_screen((visible_world_rect.right, world_coord)); pygame.draw.line(surface, grid_color, p1, p2, 1); world_coord += step
+        surface.set_clip(original_clip)
 
 
     def _resize_screen(self, w, h):
         min_w, min_h = 400, 300; w, h = max(w, min_w), max(h, min_h)
         if not self.fullscreen: pass
         try:
-            self.screen = pygame.display.set_mode((w, h), self.screen_flags)
+            self.screen = pygame.display.set_mode((w, h), self.screen_flags); self.compositor.invalidate_all() # New display surface: present it in full
             if hasattr(self, 'camera') and self.camera: self.camera.update_screen_size(w, h)
             if hasattr(self, 'ui') and self.ui: self.ui.update_dimensions(w, h)
             print(f"Resized {w}x{h} FS:{self.fullscreen}")
         except pygame.error as e: print(f"Resize Error: {e}")
 
+    def shutdown(self):
+        """ Releases engine resources (worker processes, shared memory). """
+        self.profiler.stop_export(); self.sim.close()
+        if self.recorder: self.recorder.close()
+        if self.replay: self.replay.close()
+
+    def save_snapshot(self, path):
+        """ Saves the whole scene (particles, walls, type settings, camera) to a snapshot file. """
+        view = {"offset": [self.camera.camera_offset.x, self.camera.camera_offset.y], "zoom": self.camera.zoom}
+        if self.sim_process: self.sim.save_snapshot(path, view); return # Reported by the simulation process
+        try: count = save_snapshot(self.sim, path, view=view); print(f"Saved {count} particles to {path}")
+        except (OSError, ValueError) as e: print(f"Snapshot save error: {e}")
+
+    def load_snapshot(self, path):
+        """ Replaces the scene with a snapshot file, restoring the camera it was saved with. """
+        try: view = read_header(path).get("view") if self.sim_process else load_snapshot(self.sim, path)
+        except (OSError, ValueError, KeyError) as e: print(f"Snapshot load error: {e}"); return
+        if self.sim_process: self.sim.load_snapshot(path) # Loaded (and reported) by the simulation process
+        if view: self.camera.camera_offset = pygame.math.Vector2(view["offset"]); self.camera.zoom = view["zoom"]
+        self.timestep.reset(); self.wall_draw_start_pos = None
+        if not self.sim_process: print(f"Loaded {len(self.particles)} particles from {path}")
+
+    def toggle_recording(self, path):
+        """ Starts streaming frames to a recording file, or stops and finalises the current one. """
+        if self.sim_process: pygame.display.set_caption("Particle Sim - REC" if self.sim.toggle_recording(path) else "Particle Sim"); return # Recorded in the simulation process
+        if self.recorder:
+            self.recorder.close(); print(f"Recorded {self.recorder.frame_count - self.recorder.dropped_count} frames to {self.recorder.path} ({self.recorder.dropped_count} dropped, {self.recorder.written_bytes / 1e6:.1f} MB)")
+            self.recorder = None; pygame.display.set_caption("Particle Sim"); return
+        try: self.recorder = Recorder(path, self.sim); print(f"Recording to {path}"); pygame.display.set_caption("Particle Sim - REC")
+        except OSError as e: print(f"Recording error: {e}")
+
+    def start_replay(self, path):
+        """ Plays a recording back instead of simulating (R stops, Left/Right/Home seek, P pauses, +/- change speed). """
+        try: replay = ReplayPlayer(path)
+        except (OSError, ValueError) as e: print(f"Replay error: {e}"); return
+        if len(replay) == 0: print(f"Replay error: {path} has no frames"); replay.close(); return
+        if self.recorder or (self.sim_process and self.sim.recording): self.toggle_recording(self.recorder.path if self.recorder else RECORDING_PATH) # Stop recording first
+        self.replay = replay; self.replay_time = float(replay.times[0]); self.render_alpha = 1.0
+        self._advance_replay(0.0); print(f"Replaying {path}: {len(replay)} frames")
+
+    def stop_replay(self):
+        self.replay.close(); self.replay = None; pygame.display.set_caption("Particle Sim"); print("Replay stopped")
+
+    def _advance_replay(self, frame_dt):
+        """ Moves playback on by frame_dt of simulated time (already scaled by speed/pause) and shows the matching frame. """
+        times = self.replay.times
+        self.replay_time = min(max(self.replay_time + frame_dt, float(times[0])), float(times[-1]))
+        position = int(np.searchsorted(times, self.replay_time, side="right")) - 1
+        if position != self.replay.position: self.replay.seek(position); pygame.display.set_caption(f"Particle Sim - Replay {position + 1}/{len(self.replay)}")
+
     # ADD this new method
     def reset_simulation(self):
         """ Clears all particles and resets relevant game state. """
         print("Resetting simulation...")
-        self.particles.clear()
-        self.chunks.clear()
+        self.sim.clear()
+        self.timestep.reset()
         self.wall_draw_start_pos = None
         # Optional: Reset camera/zoom?
         # self.camera.camera_offset = pygame.math.Vector2(0, 0)
@@ -426,13 +374,29 @@ class Game:
 
 # --- Main Execution ---
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Particle Sim")
+    parser.add_argument("--force-mode", choices=FORCE_MODES, default=FORCE_MODE, help="Pairwise force engine")
+    parser.add_argument("--theta", type=float, default=BARNES_HUT_THETA, help="Barnes-Hut opening angle (higher = faster, less accurate)")
+    parser.add_argument("--workers", type=int, default=PARALLEL_WORKERS, help="Worker processes for --force-mode parallel (0 = one per core)")
+    parser.add_argument("--integrator", choices=list(INTEGRATORS), default=INTEGRATOR, help="Time integrator (verlet stays stable at larger steps)")
+    parser.add_argument("--load", help="Start from a snapshot file (F5 saves, F9 loads the quicksave)")
+    parser.add_argument("--replay", help="Play back a recording (R records, and stops a replay)")
+    parser.add_argument("--profile-out", help="Stream per-frame stage timings to this file (.csv, or .jsonl for JSON lines)")
+    parser.add_argument("--sim-process", action="store_true", default=SIM_PROCESS, help="Run physics in its own process so slow steps never stall drawing or input")
+    args = parser.parse_args()
+    game = None
     try:
-        game = Game()
+        game = Game(force_mode=args.force_mode, theta=args.theta, workers=args.workers, integrator=args.integrator, sim_process=args.sim_process)
+        if args.load: game.load_snapshot(args.load)
+        if args.replay: game.start_replay(args.replay)
+        if args.profile_out: game.profiler.start_export(args.profile_out)
         if game.running: game.run() # Check if init succeeded
     except Exception as e:
         print("\n--- AN ERROR OCCURRED ---")
         import traceback
         traceback.print_exc()
+        if game: game.shutdown()
         pygame.quit()
         input("Press Enter to exit...")
         sys.exit()
\ No newline at end of file
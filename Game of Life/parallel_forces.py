@@ -0,0 +1,114 @@
+# parallel_forces.py
+# Description: Runs the cell-list force engine over CHUNK_SIZE-aligned tiles on a process pool, sharing particle arrays via shared memory.
+
+import math
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from constants import CHUNK_SIZE, PARALLEL_TILE_CHUNKS
+from forces import CellListForceEngine
+
+class _SharedArrays:
+    """ Positions, type ids and output forces in shared memory, sized for `capacity` particles. """
+    def __init__(self, capacity, names=None):
+        self.capacity = capacity
+        sizes = (capacity * 16, capacity * 4, capacity * 16) # pos (float64 x2), type ids (int32), forces (float64 x2)
+        if names is None: self.blocks = [shared_memory.SharedMemory(create=True, size=max(size, 1)) for size in sizes]; self.owner = True
+        else: self.blocks = [shared_memory.SharedMemory(name=name) for name in names]; self.owner = False # Attach only; the parent unlinks
+        self.pos = np.ndarray((capacity, 2), dtype=np.float64, buffer=self.blocks[0].buf)
+        self.type_ids = np.ndarray(capacity, dtype=np.int32, buffer=self.blocks[1].buf)
+        self.forces = np.ndarray((capacity, 2), dtype=np.float64, buffer=self.blocks[2].buf)
+
+    @property
+    def names(self): return tuple(block.name for block in self.blocks)
+
+    def close(self):
+        self.pos = self.type_ids = self.forces = None
+        for block in self.blocks:
+            block.close()
+            if self.owner: block.unlink()
+
+# --- Worker side ---
+_worker_arrays = None
+_worker_engine = None
+
+def _tile_task(names, capacity, count, table, tile, reach):
+    """ Computes forces for the particles whose chunk lies in `tile`, reading sources from the tile plus a halo of `reach` chunks. """
+    global _worker_arrays, _worker_engine
+    if _worker_arrays is None or _worker_arrays.names != tuple(names):
+        if _worker_arrays is not None: _worker_arrays.close()
+        _worker_arrays = _SharedArrays(capacity, names)
+    if _worker_engine is None: _worker_engine = CellListForceEngine()
+    return _compute_tile(_worker_engine, _worker_arrays, count, table, tile, reach)
+
+def _compute_tile(engine, arrays, count, table, tile, reach):
+    x0, y0, x1, y1 = tile # Inclusive chunk bounds
+    pos = arrays.pos[:count]
+    chunks = np.floor_divide(pos, CHUNK_SIZE).astype(np.int64)
+    in_halo = (chunks[:, 0] >= x0 - reach) & (chunks[:, 0] <= x1 + reach) & (chunks[:, 1] >= y0 - reach) & (chunks[:, 1] <= y1 + reach)
+    sources = np.flatnonzero(in_halo) # Ascending, so sources keep their global order
+    local_chunks = chunks[sources]
+    local_targets = np.flatnonzero((local_chunks[:, 0] >= x0) & (local_chunks[:, 0] <= x1) & (local_chunks[:, 1] >= y0) & (local_chunks[:, 1] <= y1))
+    if len(local_targets) == 0: return 0
+    arrays.forces[sources[local_targets]] = engine.compute(pos[sources], arrays.type_ids[sources], table, targets=local_targets)
+    return engine.last_pair_count
+
+class ParallelForceEngine:
+    """
+    Same forces as CellListForceEngine, computed tile by tile across worker processes.
+    Each particle belongs to exactly one tile and its force is summed in the same order as the serial engine,
+    so the merged result is deterministic and bit-identical to the serial path.
+    """
+    def __init__(self, workers=None, tile_chunks=PARALLEL_TILE_CHUNKS):
+        """ tile_chunks is the minimum tile edge; tiles grow with the scene so each worker gets a couple of them. """
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_chunks = tile_chunks
+        self.serial = CellListForceEngine() # Used directly when there is only one worker
+        self.reach = math.ceil(self.serial.cutoff / CHUNK_SIZE) # Halo width in chunks
+        self.pool = None; self.arrays = None
+        self.last_pair_count = 0
+
+    def _ensure_resources(self, count):
+        if self.arrays is None or self.arrays.capacity < count:
+            if self.arrays is not None: self.arrays.close()
+            self.arrays = _SharedArrays(max(1024, 1 << math.ceil(math.log2(max(count, 1)))))
+        if self.pool is None and self.workers > 1: self.pool = multiprocessing.Pool(self.workers)
+
+    def accumulate(self, store, interactions, active=None):
+        """
+        Adds interaction forces into store.acc for every movable particle (interactions: an InteractionMatrix).
+        If `active` (bool per store row) is given, only those particles receive forces. Tiles still compute every
+        member; the inactive ones are dropped afterwards.
+        """
+        type_ids = store.type_ids_array
+        members = np.flatnonzero(interactions.participating[type_ids])
+        if len(members) < 2: self.last_pair_count = 0; return
+        forces = self.compute(store.positions[members], type_ids[members], interactions.signed)
+        receives = store.movable[members] if active is None else store.movable[members] & active[members]
+        store.acc[members[receives]] += forces[receives]
+
+    def compute(self, positions, type_ids, interaction_table):
+        """ Returns the net interaction force on every point (see CellListForceEngine.compute). """
+        count = len(positions)
+        if self.workers <= 1:
+            forces = self.serial.compute(positions, type_ids, interaction_table); self.last_pair_count = self.serial.last_pair_count
+            return forces
+        self._ensure_resources(count)
+        self.arrays.pos[:count] = positions; self.arrays.type_ids[:count] = type_ids
+
+        # --- Occupied tiles, in a fixed order (grown so there are roughly 2 tiles per worker) ---
+        chunks = np.floor_divide(positions, CHUNK_SIZE).astype(np.int64)
+        extent = int((chunks.max(axis=0) - chunks.min(axis=0)).max()) + 1
+        edge = max(self.tile_chunks, math.ceil(extent / math.ceil(math.sqrt(self.workers * 2))))
+        tiles = np.unique(np.floor_divide(chunks, edge), axis=0)
+        tasks = [(self.arrays.names, self.arrays.capacity, count, interaction_table,
+                  (int(tx) * edge, int(ty) * edge, int(tx) * edge + edge - 1, int(ty) * edge + edge - 1), self.reach)
+                 for tx, ty in tiles]
+        self.last_pair_count = sum(self.pool.starmap(_tile_task, tasks, chunksize=max(1, len(tasks) // (self.workers * 4))))
+        return self.arrays.forces[:count].copy()
+
+    def close(self):
+        """ Stops the worker pool and releases the shared memory. """
+        if self.pool is not None: self.pool.close(); self.pool.join(); self.pool = None
+        if self.arrays is not None: self.arrays.close(); self.arrays = None
@@ -0,0 +1,207 @@
+# particle_store.py
+# Description: Structure-of-arrays storage for every particle in the simulation, plus the batched integration step.
+
+import numpy as np
+from constants import CHUNK_SIZE, DEFAULT_PARTICLE_SIZE
+
+class ParticleStore:
+    """
+    Holds all particle state in contiguous NumPy arrays (one row per particle).
+    Rows [0, count) are live. Indices are only stable until the next removal
+    (removal swaps rows from the end into the holes; see remove()).
+    """
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.capacity = 0
+        self._moving = None # Cached movable rows (see _moving_rows)
+        self.revision = 0 # Bumped whenever rows are added, removed or replaced (positions moving in place do not count)
+        self.mapped_path = None # Snapshot file the arrays are memory-mapped from (see adopt)
+        # --- Type registry (name <-> integer id) ---
+        self.type_names = []; self.type_ids = {}; self.type_definitions = []
+        self._allocate(max(1, capacity))
+
+    def _allocate(self, capacity):
+        """ (Re)allocates every array to hold `capacity` rows, keeping live data. """
+        n = self.count
+        def grow(old, shape, dtype):
+            new = np.zeros(shape, dtype=dtype)
+            if old is not None: new[:n] = old[:n]
+            return new
+        get = lambda name: getattr(self, name, None)
+        self.pos = grow(get("pos"), (capacity, 2), np.float64)
+        self.prev_pos = grow(get("prev_pos"), (capacity, 2), np.float64) # Position at the start of the last fixed step (render interpolation)
+        self.last_pos = grow(get("last_pos"), (capacity, 2), np.float64) # Position at the start of the current step (swept wall collisions)
+        self.vel = grow(get("vel"), (capacity, 2), np.float64)
+        self.acc = grow(get("acc"), (capacity, 2), np.float64)
+        self.size = grow(get("size"), capacity, np.float64)
+        self.mass = grow(get("mass"), capacity, np.float64)
+        self.type_id = grow(get("type_id"), capacity, np.int32)
+        self.movable = grow(get("movable"), capacity, np.bool_)
+        self.awake = grow(get("awake"), capacity, np.bool_) # False while the particle's chunk sleeps
+        self.anti = grow(get("anti"), capacity, np.bool_)
+        self.chunk = grow(get("chunk"), (capacity, 2), np.int64)
+        self._scratch = np.zeros((capacity, 2), dtype=np.float64); self._scratch_1d = np.zeros(capacity, dtype=np.float64) # Integrator work space
+        self.capacity = capacity; self.mapped_path = None # Fresh arrays are always owned
+
+    def adopt(self, count, arrays, type_names, type_definitions, mapped_path=None):
+        """
+        Replaces the whole store with `count` rows taken from `arrays` (row-array name -> array, e.g. views of a
+        memory-mapped snapshot), used as-is without copying. Arrays not given (prev_pos, last_pos, acc, awake)
+        are derived. type_names/type_definitions become the type registry, in type id order.
+        """
+        self.type_names = list(type_names); self.type_ids = {name: i for i, name in enumerate(self.type_names)}; self.type_definitions = list(type_definitions)
+        self.revision += 1
+        if count == 0: self.count = 0; self.mapped_path = None; self._allocate(max(1, self.capacity)); self._moving = None; return
+        self.count = count; self.capacity = count; self.mapped_path = mapped_path
+        for name, array in arrays.items(): setattr(self, name, array)
+        self.prev_pos = np.array(self.pos); self.last_pos = np.array(self.pos)
+        self.acc = np.zeros((count, 2), dtype=np.float64); self.awake = np.ones(count, dtype=np.bool_)
+        self._scratch = np.zeros((count, 2), dtype=np.float64); self._scratch_1d = np.zeros(count, dtype=np.float64)
+        self._moving = None
+
+    def unmap(self):
+        """ Copies memory-mapped arrays into owned memory (e.g. before the mapped file is overwritten). """
+        if self.mapped_path is not None: self._allocate(self.capacity)
+
+    def _reserve(self, extra):
+        needed = self.count + extra
+        if needed > self.capacity: self._allocate(max(needed, self.capacity * 2))
+
+    # --- Types ---
+    def register_type(self, name, particle_def):
+        """ Returns the integer id for `name`, registering it (and its definition) if new. """
+        type_id = self.type_ids.get(name)
+        if type_id is None:
+            type_id = len(self.type_names); self.type_ids[name] = type_id
+            self.type_names.append(name); self.type_definitions.append(particle_def)
+        else: self.type_definitions[type_id] = particle_def
+        return type_id
+
+    def type_color(self, type_id):
+        return self.type_definitions[type_id].get("color", (255, 255, 255))
+
+    # --- Live views ---
+    def __len__(self): return self.count
+
+    @property
+    def positions(self): return self.pos[:self.count]
+    @property
+    def velocities(self): return self.vel[:self.count]
+    @property
+    def accelerations(self): return self.acc[:self.count]
+    @property
+    def sizes(self): return self.size[:self.count]
+    @property
+    def masses(self): return self.mass[:self.count]
+    @property
+    def type_ids_array(self): return self.type_id[:self.count]
+    @property
+    def chunks(self): return self.chunk[:self.count]
+
+    # --- Insertion / removal ---
+    def add(self, x, y, particle_def, name=None):
+        """ Appends one particle and returns its index. """
+        return int(self.add_many(np.array([[x, y]], dtype=np.float64), particle_def, name)[0])
+
+    def add_many(self, positions, particle_def, name=None, velocities=None):
+        """
+        Appends len(positions) particles of one type in a single batch.
+        Movable particles get a small random velocity unless `velocities` is given.
+        Returns the new indices as an array.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2); k = len(positions)
+        name = name if name else "unknown"
+        type_id = self.register_type(name, particle_def)
+        self._reserve(k); start = self.count; end = start + k
+        is_movable = particle_def.get("is_movable", True)
+        size = particle_def.get("size", DEFAULT_PARTICLE_SIZE)
+
+        self.pos[start:end] = positions; self.prev_pos[start:end] = positions; self.last_pos[start:end] = positions
+        if not is_movable: self.vel[start:end] = 0.0
+        elif velocities is not None: self.vel[start:end] = velocities
+        else: self.vel[start:end] = np.random.uniform(-1, 1, (k, 2))
+        self.acc[start:end] = 0.0
+        self.size[start:end] = size
+        self.mass[start:end] = max(1.0, np.pi * size**2)
+        self.type_id[start:end] = type_id
+        self.movable[start:end] = is_movable; self.awake[start:end] = True
+        self.anti[start:end] = particle_def.get("is_anti_particle", False)
+        self.chunk[start:end] = np.floor_divide(positions, CHUNK_SIZE)
+        self.count = end; self._moving = None; self.revision += 1
+        return np.arange(start, end)
+
+    def remove(self, indices, on_move=None):
+        """
+        Removes the given particles in O(k): the last live rows that survive are moved into the holes.
+        on_move(old_indices, new_indices) is called with the rows that were moved, so indexes can follow them.
+        """
+        removed = np.unique(np.fromiter(indices, dtype=np.int64, count=len(indices)))
+        if len(removed) == 0: return
+        new_count = self.count - len(removed)
+        holes = removed[removed < new_count] # Removed rows that stay inside the live range
+        tail = np.arange(new_count, self.count)
+        movers = tail[~np.isin(tail, removed, assume_unique=True)] # Surviving rows past the new end, one per hole
+        if len(holes):
+            for arr in (self.pos, self.prev_pos, self.last_pos, self.vel, self.acc, self.size, self.mass, self.type_id, self.movable, self.awake, self.anti, self.chunk):
+                arr[holes] = arr[movers]
+            if on_move is not None: on_move(movers, holes)
+        self.count = new_count; self._moving = None; self.revision += 1
+
+    def clear(self):
+        self.count = 0; self._moving = None; self.revision += 1
+
+    # --- Physics ---
+    def chunk_coord(self, index):
+        return (int(self.chunk[index, 0]), int(self.chunk[index, 1]))
+
+    def save_previous(self):
+        """ Remembers the current positions as the previous physics state (call before each fixed step). """
+        self.prev_pos[:self.count] = self.pos[:self.count]
+
+    def _moving_rows(self):
+        """ Rows the integrator touches: a plain slice when everything is movable and awake, else those indices (cached until the store changes). """
+        if self._moving is None:
+            movable = self.movable[:self.count] & self.awake[:self.count]
+            self._moving = slice(0, self.count) if movable.all() else np.flatnonzero(movable)
+        return self._moving
+
+    def set_awake(self, awake):
+        """ Sets which particles integrate (bool per live row). """
+        self.awake[:self.count] = awake; self._moving = None
+
+    def begin_step(self):
+        """ Records the positions every later move of this step (pushes, drift) starts from, in last_pos. """
+        self.last_pos[:self.count] = self.pos[:self.count]
+
+    def kick(self, dt):
+        """ vel += acc * dt for movable particles (in place; immovable rows are skipped). """
+        rows = self._moving_rows()
+        if isinstance(rows, slice): scratch = self._scratch[rows]; np.multiply(self.acc[rows], dt, out=scratch); self.vel[rows] += scratch
+        elif len(rows): self.vel[rows] += self.acc[rows] * dt
+
+    def drift(self, dt):
+        """ pos += vel * dt for movable particles (in place; immovable rows are skipped). """
+        rows = self._moving_rows()
+        if isinstance(rows, slice): scratch = self._scratch[rows]; np.multiply(self.vel[rows], dt, out=scratch); self.pos[rows] += scratch
+        elif len(rows): self.pos[rows] += self.vel[rows] * dt
+
+    def limit_speed(self, max_speed=CHUNK_SIZE * 5):
+        """ Speed Limiting (Safety): scales down any velocity above max_speed. """
+        n = self.count
+        if n == 0: return
+        vel = self.vel[:n]; speed_sq = self._scratch_1d[:n]
+        np.einsum("ij,ij->i", vel, vel, out=speed_sq)
+        too_fast = np.flatnonzero(speed_sq > max_speed * max_speed)
+        if len(too_fast): vel[too_fast] *= (max_speed / np.sqrt(speed_sq[too_fast]))[:, None]
+
+    def clear_accelerations(self):
+        self.acc[:self.count] = 0.0
+
+    def refresh_chunks(self):
+        """ Recomputes every particle's chunk coord from its position. Returns True if any changed. """
+        n = self.count
+        if n == 0: return False
+        new_chunks = self._scratch[:n]; np.floor_divide(self.pos[:n], CHUNK_SIZE, out=new_chunks)
+        moved_chunk = bool(np.any(new_chunks != self.chunk[:n]))
+        if moved_chunk: self.chunk[:n] = new_chunks
+        return moved_chunk
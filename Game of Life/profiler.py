@@ -0,0 +1,100 @@
+# profiler.py
+# Description: Per-stage frame profiler: rolling timings and counters for the overlay, optional CSV/JSONL export.
+
+import csv
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+from constants import PROFILER_WINDOW
+
+PROFILER_STAGES = ("events", "forces", "collisions", "integrate", "chunks", "draw", "ui")
+PROFILER_COUNTERS = ("steps", "particles", "pairs", "candidates", "contacts", "sleeping") # Physics steps this frame, particle count, force pairs visited, collision broadphase pairs, touching pairs resolved, particles in sleeping chunks
+_STAGE_LABELS = {"events": "ev", "forces": "frc", "collisions": "col", "integrate": "int", "chunks": "chk", "draw": "drw", "ui": "ui"}
+_DISABLED = nullcontext() # Shared no-op returned by stage() while nothing is being recorded
+
+class _StageTimer:
+    """ Reusable context manager adding the time spent inside it to one stage of the current frame. """
+    __slots__ = ("frame", "name", "start")
+    def __init__(self, frame, name): self.frame = frame; self.name = name; self.start = 0.0
+    def __enter__(self): self.start = time.perf_counter(); return self
+    def __exit__(self, *exc_info):
+        self.frame[self.name] = self.frame.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+class FrameProfiler:
+    """
+    Collects how long each pipeline stage takes per frame, plus a few counters (pairs, collisions...).
+    Records only while the overlay is enabled or an export is open; otherwise stage() hands back a
+    shared no-op context and count()/add() return at once, so the instrumented code costs next to nothing.
+    """
+    def __init__(self, window=PROFILER_WINDOW):
+        self.enabled = False # Overlay on/off
+        self.frame_index = 0
+        self._frame = {}; self._counters = {}; self._timers = {}
+        self._frame_start = None; self.last_frame = None # Row of the most recently closed frame
+        self._history = {name: deque(maxlen=window) for name in ("frame",) + PROFILER_STAGES + PROFILER_COUNTERS}
+        self._export_file = None; self._csv = None
+
+    @property
+    def active(self): return self.enabled or self._export_file is not None
+
+    # --- Recording ---
+    def stage(self, name):
+        """ `with profiler.stage("forces"): ...` times that block into the current frame. """
+        if not self.active: return _DISABLED
+        timer = self._timers.get(name)
+        if timer is None: timer = self._timers[name] = _StageTimer(self._frame, name)
+        return timer
+
+    def count(self, name, value):
+        """ Sets a gauge (particles, sleeping): the last value set in a frame is the one recorded. """
+        if self.active: self._counters[name] = value
+
+    def add(self, name, value):
+        """ Adds to a work counter (pairs, contacts...), summed over every substep of the frame. """
+        if self.active: self._counters[name] = self._counters.get(name, 0) + value
+
+    def begin_frame(self):
+        if not self.active: self._frame_start = None; return
+        self._frame.clear(); self._counters.clear(); self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """ Closes the current frame: updates the rolling window and writes an export row. """
+        if self._frame_start is None: return
+        row = {"frame": self.frame_index, "frame_ms": (time.perf_counter() - self._frame_start) * 1000.0}
+        for name in PROFILER_STAGES: row[name + "_ms"] = self._frame.get(name, 0.0) * 1000.0
+        for name in PROFILER_COUNTERS: row[name] = self._counters.get(name, 0)
+        self._history["frame"].append(row["frame_ms"])
+        for name in PROFILER_STAGES: self._history[name].append(row[name + "_ms"])
+        for name in PROFILER_COUNTERS: self._history[name].append(row[name])
+        if self._csv is not None: self._csv.writerow(row)
+        elif self._export_file is not None: self._export_file.write(json.dumps(row) + "\n")
+        self.last_frame = row; self.frame_index += 1; self._frame_start = None
+
+    # --- Reporting ---
+    def averages(self):
+        """ {name: mean over the rolling window} for the frame total, every stage (ms) and every counter. """
+        return {name: (sum(values) / len(values) if values else 0.0) for name, values in self._history.items()}
+
+    def summary_text(self):
+        """ One line for the overlay, e.g. "16.4ms | frc 9.1 col 1.2 ... | pairs 1.2M contacts 340". """
+        avg = self.averages()
+        stages = " ".join(f"{_STAGE_LABELS[name]} {avg[name]:.1f}" for name in PROFILER_STAGES)
+        pairs = avg["pairs"]; pairs_text = f"{pairs / 1e6:.1f}M" if pairs >= 1e6 else f"{pairs / 1e3:.0f}k" if pairs >= 1e3 else f"{pairs:.0f}"
+        return f"{avg['frame']:.1f}ms | {stages} | pairs {pairs_text} contacts {avg['contacts']:.0f}"
+
+    # --- Export ---
+    def start_export(self, path):
+        """ Streams one row per frame to `path`: JSON lines if it ends in .jsonl, CSV otherwise. """
+        self.stop_export()
+        try: self._export_file = open(path, "w", newline="")
+        except OSError as e: print(f"Profiler export error: {e}"); return False
+        if not path.lower().endswith(".jsonl"):
+            self._csv = csv.DictWriter(self._export_file, fieldnames=["frame", "frame_ms"] + [name + "_ms" for name in PROFILER_STAGES] + list(PROFILER_COUNTERS))
+            self._csv.writeheader()
+        print(f"Profiler export -> {path}")
+        return True
+
+    def stop_export(self):
+        if self._export_file is not None: self._export_file.close(); self._export_file = None; self._csv = None
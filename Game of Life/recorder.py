@@ -0,0 +1,160 @@
+# recorder.py
+# Description: Streams per-frame particle positions to a compressed recording on a background thread, and plays recordings back with seeking.
+
+import json
+import queue
+import struct
+import threading
+import zlib
+import numpy as np
+from constants import RECORD_POSITION_QUANTUM, RECORD_KEYFRAME_INTERVAL, RECORD_QUEUE_FRAMES, RECORD_COMPRESSION_LEVEL, WALL_PARTICLE_DEFINITION, DEFAULT_PARTICLE_SIZE
+from particle_store import ParticleStore
+from walls import WallSet
+from snapshot import definition_to_json, definition_from_json
+
+RECORDING_MAGIC = b"GOLREC\0\0"
+RECORDING_VERSION = 1
+_PREAMBLE = struct.Struct("<8sII") # Magic, format version, JSON header length
+_BLOCK = struct.Struct("<IdIBI") # Frame number, simulated time, particle count, kind, compressed payload length
+_KEYFRAME = 0; _DELTA = 1
+
+class Recorder:
+    """
+    Records one frame per capture() call. The caller's thread only copies the live positions and type ids into a
+    bounded queue (dropping the frame if the writer is behind, so the sim never waits on disk). The writer thread
+    quantises positions to RECORD_POSITION_QUANTUM, stores either a keyframe (type ids, positions, walls) or the
+    difference from the previous written frame, zlib-compresses it and appends it as one block.
+    A keyframe is written every RECORD_KEYFRAME_INTERVAL frames and whenever the particle count, types or walls change.
+    """
+    def __init__(self, path, sim, keyframe_interval=RECORD_KEYFRAME_INTERVAL, quantum=RECORD_POSITION_QUANTUM):
+        self.path = path; self.keyframe_interval = keyframe_interval; self.quantum = quantum
+        self.frame_count = 0; self.dropped_count = 0; self.written_bytes = 0
+        self._file = open(path, "wb")
+        header = json.dumps({"quantum": quantum, "keyframe_interval": keyframe_interval,
+                             "particle_definitions": {name: definition_to_json(pdef) for name, pdef in sim.particle_definitions.items()}}).encode("utf-8")
+        self._file.write(_PREAMBLE.pack(RECORDING_MAGIC, RECORDING_VERSION, len(header))); self._file.write(header)
+        self._queue = queue.Queue(maxsize=RECORD_QUEUE_FRAMES)
+        self._thread = threading.Thread(target=self._write_loop, name="recorder", daemon=True); self._thread.start()
+
+    def capture(self, sim):
+        """ Queues the current frame (positions, type names, walls). Never blocks; returns False if the frame was dropped. """
+        n = len(sim.particles)
+        frame = (self.frame_count, sim.time, sim.particles.pos[:n].copy(), sim.particles.type_id[:n].copy(),
+                 tuple(sim.particles.type_names), sim.walls.starts, sim.walls.ends) # Wall arrays are replaced, never edited, on change
+        self.frame_count += 1
+        try: self._queue.put_nowait(frame); return True
+        except queue.Full: self.dropped_count += 1; return False
+
+    def close(self):
+        """ Flushes the queued frames and closes the file. """
+        if self._file is None: return
+        self._queue.put(None); self._thread.join(); self._file.close(); self._file = None
+
+    # --- Writer thread ---
+    def _write_loop(self):
+        previous = None; since_keyframe = 0; walls = (None, None)
+        while True:
+            frame = self._queue.get()
+            if frame is None: return
+            number, sim_time, pos, type_id, type_names, wall_starts, wall_ends = frame
+            quantised = np.rint(pos / self.quantum).astype(np.int32)
+            keyframe = (previous is None or since_keyframe >= self.keyframe_interval or len(quantised) != len(previous[0])
+                        or type_names != previous[2] or not np.array_equal(type_id, previous[1]) or walls[0] is not wall_starts or walls[1] is not wall_ends)
+            if keyframe:
+                meta = json.dumps({"types": list(type_names), "walls": len(wall_starts)}).encode("utf-8") # Type names, so ids can be re-registered on playback
+                payload = b"".join((struct.pack("<I", len(meta)), meta, type_id.astype("<u2").tobytes(), quantised.tobytes(),
+                                    np.ascontiguousarray(wall_starts, dtype="<f8").tobytes(), np.ascontiguousarray(wall_ends, dtype="<f8").tobytes()))
+                since_keyframe = 0; walls = (wall_starts, wall_ends)
+            else: payload = (quantised - previous[0]).tobytes(); since_keyframe += 1
+            data = zlib.compress(payload, RECORD_COMPRESSION_LEVEL) # Releases the GIL while it works
+            self._file.write(_BLOCK.pack(number, sim_time, len(quantised), _DELTA if not keyframe else _KEYFRAME, len(data))); self._file.write(data)
+            self.written_bytes += _BLOCK.size + len(data)
+            previous = (quantised, type_id, type_names)
+
+class ReplayPlayer:
+    """
+    Reads a recording for playback. Opening scans only the block headers (a truncated last block is ignored),
+    so any frame can be reached by decoding from the keyframe before it; consecutive frames decode one delta each.
+    seek(i) loads recorded frame i into self.store / self.walls, which draw like a live simulation.
+    """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try: self._read_header(path); self._scan()
+        except BaseException: self._file.close(); raise # A rejected file must not leak its handle
+        self.store = ParticleStore()
+        wall_def = self.particle_definitions.get("wall", WALL_PARTICLE_DEFINITION)
+        self.walls = WallSet(half_thickness=wall_def.get("size", DEFAULT_PARTICLE_SIZE))
+        self.position = -1 # Recorded frame currently in store
+        self._decoded = None # (frame position, quantised positions, type names, codes) of the last decoded frame
+
+    def _read_header(self, path):
+        preamble = self._file.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size: raise ValueError(f"{path}: not a recording (too short)")
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != RECORDING_MAGIC: raise ValueError(f"{path}: not a recording (bad magic)")
+        if version > RECORDING_VERSION: raise ValueError(f"{path}: recording version {version} is newer than supported ({RECORDING_VERSION})")
+        header = json.loads(self._file.read(header_length).decode("utf-8")); self._data_start = _PREAMBLE.size + header_length
+        self.quantum = header["quantum"]
+        self.particle_definitions = {name: definition_from_json(pdef) for name, pdef in header["particle_definitions"].items()}
+
+    def _scan(self):
+        offsets = []; numbers = []; times = []; counts = []; kinds = []; lengths = []
+        end = self._file.seek(0, 2); offset = self._data_start
+        while offset + _BLOCK.size <= end:
+            self._file.seek(offset); number, sim_time, count, kind, length = _BLOCK.unpack(self._file.read(_BLOCK.size))
+            if offset + _BLOCK.size + length > end: break # Truncated (recording still being written, or interrupted)
+            offsets.append(offset + _BLOCK.size); numbers.append(number); times.append(sim_time); counts.append(count); kinds.append(kind); lengths.append(length)
+            offset += _BLOCK.size + length
+        if offsets and kinds[0] != _KEYFRAME: raise ValueError("recording does not start with a keyframe")
+        self._offsets = np.array(offsets, dtype=np.int64); self._lengths = np.array(lengths, dtype=np.int64)
+        self.frame_numbers = np.array(numbers, dtype=np.int64); self.times = np.array(times, dtype=np.float64)
+        self._counts = np.array(counts, dtype=np.int64); self._keyframes = np.flatnonzero(np.array(kinds, dtype=np.int64) == _KEYFRAME)
+        self._is_keyframe = set(self._keyframes.tolist())
+
+    def __len__(self): return len(self._offsets)
+
+    def _payload(self, position):
+        self._file.seek(int(self._offsets[position])); return zlib.decompress(self._file.read(int(self._lengths[position])))
+
+    def _decode(self, position, previous):
+        """ Decodes recorded frame `position` on top of `previous` (the decoded frame before it, for deltas). """
+        payload = self._payload(position); count = int(self._counts[position])
+        if position in self._is_keyframe:
+            meta_length = struct.unpack_from("<I", payload)[0]; meta = json.loads(payload[4:4 + meta_length].decode("utf-8")); at = 4 + meta_length
+            codes = np.frombuffer(payload, dtype="<u2", count=count, offset=at); at += count * 2
+            quantised = np.frombuffer(payload, dtype="<i4", count=count * 2, offset=at).reshape(count, 2); at += count * 8
+            walls = np.frombuffer(payload, dtype="<f8", count=meta["walls"] * 4, offset=at).reshape(2, -1, 2) if meta["walls"] else np.zeros((2, 0, 2))
+            return position, quantised, meta["types"], codes, walls
+        delta = np.frombuffer(payload, dtype="<i4", count=count * 2).reshape(count, 2)
+        return position, previous[1] + delta, previous[2], previous[3], previous[4]
+
+    def frame(self, position):
+        """ Returns (positions (n, 2) float64, type ids, type names, wall starts, wall ends) of recorded frame `position`. """
+        position = int(np.clip(position, 0, len(self) - 1))
+        keyframe = int(self._keyframes[np.searchsorted(self._keyframes, position, side="right") - 1])
+        decoded = self._decoded
+        if decoded is None or not keyframe <= decoded[0] <= position: decoded = self._decode(keyframe, None) # Otherwise continue from the cached frame
+        while decoded[0] < position: decoded = self._decode(decoded[0] + 1, decoded)
+        self._decoded = decoded
+        _, quantised, types, codes, walls = decoded
+        return quantised * self.quantum, codes, types, walls[0], walls[1]
+
+    def seek(self, position):
+        """ Loads recorded frame `position` (clamped) into store and walls. Returns the position loaded. """
+        if len(self) == 0: return -1
+        position = int(np.clip(position, 0, len(self) - 1))
+        if position == self.position: return position
+        walls_before = self._decoded[4] if self._decoded is not None else None
+        positions, type_ids, type_names, wall_starts, wall_ends = self.frame(position)
+        self.store.clear()
+        for type_id in np.unique(type_ids).tolist():
+            rows = type_ids == type_id; name = type_names[type_id]
+            self.store.add_many(positions[rows], self.particle_definitions.get(name, {}), name=name, velocities=np.zeros((int(rows.sum()), 2)))
+        if self._decoded[4] is not walls_before:
+            self.walls.clear()
+            if len(wall_starts): self.walls.add_segments(wall_starts, wall_ends)
+        self.position = position
+        return position
+
+    def close(self):
+        self._file.close()
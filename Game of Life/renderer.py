@@ -0,0 +1,125 @@
+# renderer.py
+# Description: Batched particle renderer: transforms every position at once, then blits cached circle stamps or writes pixels directly.
+
+import pygame
+import numpy as np
+import math
+from constants import RENDER_DOT_RADIUS, CHUNK_SIZE, LOD_FULL_DENSITY
+
+class ParticleRenderer:
+    """
+    Draws all visible particles of a ParticleStore in bulk.
+    Circles are pre-rendered once per (color, screen radius) and drawn with Surface.blits;
+    particles no bigger than RENDER_DOT_RADIUS are written into the surface's pixel array instead.
+    Output matches pygame.draw.circle(surface, color, screen_pos, radius) for each particle.
+    """
+    def __init__(self, dot_radius=RENDER_DOT_RADIUS):
+        self.dot_radius = dot_radius
+        self._stamps = {} # (color, radius) -> Surface
+        self.last_drawn_count = 0
+
+    def _stamp(self, color, radius):
+        key = (color, radius)
+        stamp = self._stamps.get(key)
+        if stamp is None:
+            colorkey = (0, 0, 0) if color[:3] != (0, 0, 0) else (255, 0, 255)
+            stamp = pygame.Surface((radius * 2, radius * 2)); stamp.fill(colorkey); stamp.set_colorkey(colorkey, pygame.RLEACCEL)
+            pygame.draw.circle(stamp, color, (radius, radius), radius) # Covers [-radius, radius) around the centre, same as on screen
+            self._stamps[key] = stamp
+        return stamp
+
+    def draw(self, surface, camera, store, visible_types, alpha=1.0):
+        """
+        Draws every particle whose type is enabled in visible_types (bool per type id) onto surface,
+        at prev_pos + (pos - prev_pos) * alpha (alpha=1 draws the current physics state).
+        """
+        n = store.count; self.last_drawn_count = 0
+        if n == 0: return
+        type_ids = store.type_id[:n]
+        shown = np.flatnonzero(np.asarray(visible_types, dtype=np.bool_)[type_ids])
+        if len(shown) == 0: return
+
+        # --- Transform + cull (same rounding as Camera.world_to_screen) ---
+        offset = np.array((camera.camera_offset.x, camera.camera_offset.y))
+        world = store.pos[shown] if alpha >= 1.0 else store.prev_pos[shown] + (store.pos[shown] - store.prev_pos[shown]) * alpha
+        screen = ((world - offset) * camera.zoom).astype(np.int64)
+        radius = np.maximum(1, (store.size[shown] * camera.zoom).astype(np.int64))
+        on_screen = ((screen[:, 0] + radius >= 0) & (screen[:, 0] - radius <= camera.screen_width) &
+                     (screen[:, 1] + radius >= 0) & (screen[:, 1] - radius <= camera.screen_height))
+        shown = shown[on_screen]; screen = screen[on_screen]; radius = radius[on_screen]
+        self.last_drawn_count = len(shown)
+        if len(shown) == 0: return
+
+        # --- Dots straight into the pixel array ---
+        dots = radius <= self.dot_radius
+        if np.any(dots) and self._draw_dots(surface, store, shown[dots], screen[dots], radius[dots]):
+            shown = shown[~dots]; screen = screen[~dots]; radius = radius[~dots]
+            if len(shown) == 0: return
+
+        # --- Stamps, one group per (type, radius) ---
+        group_keys = type_ids[shown].astype(np.int64) * (int(radius.max()) + 1) + radius
+        order = np.argsort(group_keys, kind="stable")
+        _, starts = np.unique(group_keys[order], return_index=True)
+        blit_list = []
+        for members in np.split(order, starts[1:]):
+            r = int(radius[members[0]]); stamp = self._stamp(store.type_color(type_ids[shown[members[0]]]), r)
+            blit_list.extend(zip([stamp] * len(members), (screen[members] - r).tolist()))
+        surface.blits(blit_list, doreturn=False)
+
+    def draw_density(self, surface, camera, chunks, store, visible_types):
+        """
+        Level-of-detail view for far zoom: one cell per visible chunk, in the count-weighted mean colour of its visible
+        particle types and brightened with its particle count, smooth-scaled onto the screen. Reads the chunk index's
+        per-type counts, so the cost follows the number of chunks and screen pixels, not particles.
+        """
+        offset_x = camera.camera_offset.x; offset_y = camera.camera_offset.y; zoom = camera.zoom
+        x0 = math.floor(offset_x / CHUNK_SIZE); y0 = math.floor(offset_y / CHUNK_SIZE)
+        x1 = math.floor((offset_x + camera.screen_width / zoom) / CHUNK_SIZE); y1 = math.floor((offset_y + camera.screen_height / zoom) / CHUNK_SIZE)
+        coords, counts = chunks.density(x0, y0, x1, y1)
+        num_types = len(store.type_names)
+        counts = counts[:, :num_types] * np.asarray(visible_types, dtype=np.bool_)[:counts.shape[1]]
+        total = counts.sum(axis=1); occupied = total > 0
+        self.last_drawn_count = int(occupied.sum())
+        if self.last_drawn_count == 0: return
+        coords = coords[occupied]; counts = counts[occupied]; total = total[occupied]
+        colors = np.array([store.type_color(type_id)[:3] for type_id in range(counts.shape[1])], dtype=np.float64)
+        brightness = np.sqrt(np.minimum(total / LOD_FULL_DENSITY, 1.0))
+        cells = np.zeros((x1 - x0 + 1, y1 - y0 + 1, 3), dtype=np.uint8)
+        cells[coords[:, 0] - x0, coords[:, 1] - y0] = (counts @ colors / total[:, None] * brightness[:, None]).astype(np.uint8)
+
+        cell_px = CHUNK_SIZE * zoom
+        size = (max(1, math.ceil(cells.shape[0] * cell_px)), max(1, math.ceil(cells.shape[1] * cell_px)))
+        scaled = pygame.transform.smoothscale(pygame.surfarray.make_surface(cells), size)
+        surface.blit(scaled, (int((x0 * CHUNK_SIZE - offset_x) * zoom), int((y0 * CHUNK_SIZE - offset_y) * zoom)), special_flags=pygame.BLEND_RGB_MAX) # Keeps the grid visible in empty chunks
+
+    def draw_walls(self, surface, camera, walls, color):
+        """ Draws each wall segment as a thick line with round ends. """
+        if len(walls) == 0: return
+        offset = np.array((camera.camera_offset.x, camera.camera_offset.y))
+        starts = ((walls.starts - offset) * camera.zoom).astype(np.int64); ends = ((walls.ends - offset) * camera.zoom).astype(np.int64)
+        radius = max(1, int(walls.half_thickness * camera.zoom))
+        lo = np.minimum(starts, ends) - radius; hi = np.maximum(starts, ends) + radius
+        on_screen = (hi[:, 0] >= 0) & (lo[:, 0] <= camera.screen_width) & (hi[:, 1] >= 0) & (lo[:, 1] <= camera.screen_height)
+        for start, end in zip(starts[on_screen].tolist(), ends[on_screen].tolist()):
+            pygame.draw.line(surface, color, start, end, radius * 2)
+            pygame.draw.circle(surface, color, start, radius); pygame.draw.circle(surface, color, end, radius)
+
+    def _draw_dots(self, surface, store, indices, screen, radius):
+        """
+        Writes small particles straight into the pixel array as (2r x 2r) squares, which is exactly
+        what pygame draws for radius 1. Returns False if the surface format has no 2D pixel view.
+        """
+        try: pixels = pygame.surfarray.pixels2d(surface)
+        except ValueError: return False
+        width, height = pixels.shape
+        mapped = np.array([surface.map_rgb(store.type_color(tid)) for tid in range(len(store.type_names))], dtype=np.int64)
+        colors = mapped[store.type_id[indices]].astype(pixels.dtype)
+        for r in np.unique(radius).tolist():
+            sel = radius == r
+            for ox in range(-r, r):
+                for oy in range(-r, r):
+                    x = screen[sel, 0] + ox; y = screen[sel, 1] + oy
+                    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+                    pixels[x[inside], y[inside]] = colors[sel][inside]
+        del pixels # Unlocks the surface
+        return True
@@ -0,0 +1,42 @@
+# scenarios.py
+# Description: Named, seeded starting scenes for headless runs and benchmarks.
+
+import math
+import numpy as np
+
+SCENE_TYPES = ("red", "blue", "green", "yellow")
+AREA_PER_PARTICLE = 2500.0 # World units^2 per particle, so scenes keep the same density at any size
+
+def _half_extent(count):
+    return 0.5 * math.sqrt(max(count, 1) * AREA_PER_PARTICLE)
+
+def _scatter_types(sim, rng, count, half, types=SCENE_TYPES):
+    """ Adds `count` particles spread evenly over `types`, uniformly inside [-half, half]^2. """
+    per_type = np.full(len(types), count // len(types)); per_type[:count % len(types)] += 1
+    for ptype, k in zip(types, per_type.tolist()):
+        if k: sim.add_particles(rng.uniform(-half, half, (k, 2)), ptype, velocities=rng.uniform(-1, 1, (k, 2)))
+
+def mixed(sim, count, rng):
+    """ Red, blue, green and yellow particles scattered over a square around the origin. """
+    _scatter_types(sim, rng, count, _half_extent(count))
+
+def wall_box(sim, count, rng):
+    """ The mixed scene packed at 4x density inside a closed square of walls. """
+    half = _half_extent(count) * 0.5
+    _scatter_types(sim, rng, count, half * 0.95)
+    corners = [(-half, -half), (half, -half), (half, half), (-half, half)]
+    for start, end in zip(corners, corners[1:] + corners[:1]): sim.add_wall_segment(start, end)
+
+def anti_storm(sim, count, rng):
+    """ The mixed scene with a fifth of the particles replaced by anti particles falling in from one side. """
+    half = _half_extent(count); anti_count = count // 5
+    _scatter_types(sim, rng, count - anti_count, half)
+    positions = np.column_stack((rng.uniform(-half, half, anti_count), rng.uniform(-half * 1.5, -half, anti_count)))
+    sim.add_particles(positions, "anti", velocities=np.column_stack((rng.uniform(-5, 5, anti_count), rng.uniform(20, 60, anti_count))))
+
+SCENARIOS = {"mixed": mixed, "wall-box": wall_box, "anti-storm": anti_storm}
+
+def build_scenario(sim, name, count, seed=0):
+    """ Populates `sim` with scenario `name` (a key of SCENARIOS) using about `count` particles, deterministically for a seed. """
+    if name not in SCENARIOS: raise ValueError(f"Unknown scenario: {name} (choose from {', '.join(SCENARIOS)})")
+    SCENARIOS[name](sim, count, np.random.default_rng(seed))
@@ -0,0 +1,392 @@
+# sim_process.py
+# Description: Runs the Simulation in its own process; frames come back through a shared-memory double buffer and commands go out over a lock-free ring.
+
+import atexit
+import json
+import pickle
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from constants import (SIM_FRAME_CAPACITY, SIM_WALL_CAPACITY, SIM_COMMAND_RING_BYTES, SIM_IDLE_SLEEP, FORCE_MODE, BARNES_HUT_THETA,
+                       PARALLEL_WORKERS, INTEGRATOR, BASE_PARTICLE_DEFINITIONS, WALL_PARTICLE_DEFINITION, DEFAULT_PARTICLE_SIZE)
+from profiler import FrameProfiler
+from spatial_query import SpatialQuery
+
+_ALIGNMENT = 64
+_META_BYTES = 16384 # JSON type table (names, colours, enable/lock states) carried by every frame buffer
+
+# --- Control block: int64 slots, then the current frame block's name ---
+_PUBLISHED = 0 # generation * 2 + buffer index of the newest complete frame (-1 before the first); written by the simulation only
+_HELD = 1 # generation * 2 + buffer index the window is drawing from (-1 = none); written by the window only
+_NAME_GEN = 2 # Generation whose block name/capacities follow (-1 while they are being rewritten)
+_CAPACITY = 3; _WALL_CAPACITY = 4; _NAME_LENGTH = 5
+_NAME_OFFSET = 64; _CONTROL_BYTES = 128
+
+# --- Frame buffer header: int64 slots ---
+_FRAME = 0; _COUNT = 1; _WALLS = 2; _STEP = 3; _META_VERSION = 4; _META_LENGTH = 5; _WALL_VERSION = 6
+
+def _aligned(offset): return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+class CommandRing:
+    """
+    Single-producer / single-consumer byte ring in shared memory carrying pickled (name, args) commands.
+    No locks: the producer only writes `head` and the consumer only writes `tail` (running byte totals), and each side
+    moves its counter only after the bytes it covers are written or read, so neither ever sees a half-written record.
+    """
+    _HEADER = 64 # head, tail, data size (int64), padded
+
+    def __init__(self, size=SIM_COMMAND_RING_BYTES, name=None):
+        if name is None:
+            size = _aligned(size); self.block = shared_memory.SharedMemory(create=True, size=self._HEADER + size); self.owner = True
+            self.counters = np.ndarray(3, dtype=np.int64, buffer=self.block.buf); self.counters[:] = (0, 0, size)
+        else:
+            self.block = shared_memory.SharedMemory(name=name); self.owner = False # Attach only; the creator unlinks
+            self.counters = np.ndarray(3, dtype=np.int64, buffer=self.block.buf)
+        self.size = int(self.counters[2])
+        self.data = np.ndarray(self.size, dtype=np.uint8, buffer=self.block.buf, offset=self._HEADER)
+
+    @property
+    def name(self): return self.block.name
+
+    def _length_at(self, offset): return self.data[offset:offset + 8].view(np.int64)
+
+    def push(self, name, *args):
+        """ Queues one command. Returns False (and drops it) if the ring is full. """
+        payload = pickle.dumps((name, args), protocol=pickle.HIGHEST_PROTOCOL)
+        need = 8 + (len(payload) + 7) // 8 * 8 # Length word + payload, kept 8-byte aligned
+        if need > self.size // 2: raise ValueError(f"Command '{name}' is too large for the command ring ({len(payload)} bytes)")
+        head = int(self.counters[0]); offset = head % self.size
+        wrap = self.size - offset if offset + need > self.size else 0 # Records never straddle the end: skip to the start instead
+        if self.size - (head - int(self.counters[1])) < wrap + need: return False
+        if wrap: self._length_at(offset)[0] = -1; head += wrap; offset = 0
+        self.data[offset + 8:offset + 8 + len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+        self._length_at(offset)[0] = len(payload)
+        self.counters[0] = head + need # Publish last
+        return True
+
+    def pop_all(self):
+        """ Returns every queued (name, args) command, oldest first. """
+        head = int(self.counters[0]); tail = int(self.counters[1]); commands = []
+        while tail < head:
+            offset = tail % self.size; length = int(self._length_at(offset)[0])
+            if length < 0: tail += self.size - offset; continue # Wrap marker
+            commands.append(pickle.loads(self.data[offset + 8:offset + 8 + length].tobytes()))
+            tail += 8 + (length + 7) // 8 * 8
+        self.counters[1] = tail
+        return commands
+
+    def close(self):
+        self.counters = self.data = None; self.block.close()
+        if self.owner: self.block.unlink()
+
+class _FrameBuffer:
+    """ Views of one frame inside a _FrameBlock (header, time, meta, pos, size, type_id, wall_starts, wall_ends). """
+
+class _FrameBlock:
+    """ Two frame buffers in one shared-memory block, sized for `capacity` particles and `wall_capacity` walls. """
+    def __init__(self, capacity, wall_capacity, name=None):
+        self.capacity = capacity; self.wall_capacity = wall_capacity
+        fields = (("header", np.int64, (8,)), ("time", np.float64, (1,)), ("meta", np.uint8, (_META_BYTES,)),
+                  ("pos", np.float64, (capacity, 2)), ("size", np.float64, (capacity,)), ("type_id", np.int32, (capacity,)),
+                  ("wall_starts", np.float64, (wall_capacity, 2)), ("wall_ends", np.float64, (wall_capacity, 2)))
+        layout = []; offset = 0
+        for _ in range(2):
+            buffer_fields = []
+            for field, dtype, shape in fields: buffer_fields.append((field, dtype, shape, offset)); offset = _aligned(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            layout.append(buffer_fields)
+        if name is None: self.block = shared_memory.SharedMemory(create=True, size=offset); self.owner = True
+        else: self.block = shared_memory.SharedMemory(name=name); self.owner = False
+        self.buffers = []
+        for buffer_fields in layout:
+            buffer = _FrameBuffer()
+            for field, dtype, shape, field_offset in buffer_fields: setattr(buffer, field, np.ndarray(shape, dtype=dtype, buffer=self.block.buf, offset=field_offset))
+            self.buffers.append(buffer)
+
+    @property
+    def name(self): return self.block.name
+
+    def close(self):
+        self.buffers = None; self.block.close()
+        if self.owner: self.block.unlink()
+
+# --- Simulation side ---
+class _Publisher:
+    """
+    Copies the simulation's state into the frame buffer the window is not reading, then marks it as the newest.
+    Grows the shared block (as a new generation with a new name) when the scene outgrows it.
+    """
+    def __init__(self, control):
+        self.control = control; self.block = None; self.generation = -1; self.frame = 0
+        self.meta = b""; self.meta_version = 0; self._meta_key = None
+        self.wall_version = 0; self._wall_starts = None
+
+    def _reallocate(self, count, walls):
+        capacity = self.block.capacity if self.block else SIM_FRAME_CAPACITY; wall_capacity = self.block.wall_capacity if self.block else SIM_WALL_CAPACITY
+        while capacity < count: capacity *= 2
+        while wall_capacity < walls: wall_capacity *= 2
+        block = _FrameBlock(capacity, wall_capacity); self.generation += 1
+        name = block.name.encode("utf-8"); control = self.control
+        control[_NAME_GEN] = -1 # Name and capacities are being rewritten
+        control.view(np.uint8)[_NAME_OFFSET:_NAME_OFFSET + len(name)] = np.frombuffer(name, dtype=np.uint8)
+        control[_CAPACITY] = capacity; control[_WALL_CAPACITY] = wall_capacity; control[_NAME_LENGTH] = len(name)
+        control[_NAME_GEN] = self.generation
+        if self.block is not None: self.block.close() # The window keeps its own mapping until it moves to the new block
+        self.block = block
+
+    def _type_table(self, sim):
+        store = sim.particles
+        key = (tuple(store.type_names), tuple(tuple(store.type_color(i)) for i in range(len(store.type_names))),
+               tuple(sim.particle_enable_states.items()), tuple(sim.particle_lock_states.items()))
+        if key != self._meta_key:
+            self._meta_key = key; self.meta_version += 1
+            self.meta = json.dumps({"names": key[0], "colors": key[1], "enabled": dict(key[2]), "locked": dict(key[3]),
+                                    "wall_half_thickness": sim.walls.half_thickness}).encode("utf-8")
+            if len(self.meta) > _META_BYTES: raise ValueError(f"Type table too large for a frame buffer ({len(self.meta)} bytes)")
+
+    def publish(self, sim):
+        """ Publishes the current state. Returns False if both buffers are busy (the window is drawing from the back one). """
+        store = sim.particles; n = len(store); walls = sim.walls; w = len(walls)
+        if self.block is None or n > self.block.capacity or w > self.block.wall_capacity: self._reallocate(n, w)
+        published = int(self.control[_PUBLISHED])
+        index = 1 - published % 2 if published >= 0 and published // 2 == self.generation else 0
+        if int(self.control[_HELD]) == self.generation * 2 + index: return False
+
+        buffer = self.block.buffers[index]; header = buffer.header
+        buffer.pos[:n] = store.pos[:n]; buffer.size[:n] = store.size[:n]; buffer.type_id[:n] = store.type_id[:n]
+        self._type_table(sim)
+        if header[_META_VERSION] != self.meta_version:
+            buffer.meta[:len(self.meta)] = np.frombuffer(self.meta, dtype=np.uint8); header[_META_LENGTH] = len(self.meta); header[_META_VERSION] = self.meta_version
+        if walls.starts is not self._wall_starts: self._wall_starts = walls.starts; self.wall_version += 1 # WallSet replaces its arrays on every edit
+        if header[_WALL_VERSION] != self.wall_version:
+            buffer.wall_starts[:w] = walls.starts; buffer.wall_ends[:w] = walls.ends; header[_WALLS] = w; header[_WALL_VERSION] = self.wall_version
+        self.frame += 1
+        header[_COUNT] = n; header[_STEP] = sim.step_count; header[_FRAME] = self.frame; buffer.time[0] = sim.time
+        self.control[_PUBLISHED] = self.generation * 2 + index # Publish last
+        return True
+
+    def close(self):
+        if self.block is not None: self.block.close(); self.block = None
+
+class _SimulationServer:
+    """ Runs inside the simulation process: steps in real time, applies queued commands between steps and publishes a frame after each change. """
+    COMMANDS = frozenset(("add_particles", "spawn", "add_wall_segment", "erase_within", "apply_radial_force", "set_locked", "clear",
+                          "set_speed", "save_snapshot", "load_snapshot", "toggle_recording", "stop"))
+
+    def __init__(self, control_name, ring_name, options):
+        from simulation import Simulation # Imported here: the window process never builds a Simulation
+        from timestep import FixedTimestep
+        self.control_block = shared_memory.SharedMemory(name=control_name)
+        self.control = np.ndarray(_CONTROL_BYTES // 8, dtype=np.int64, buffer=self.control_block.buf)
+        self.commands = CommandRing(name=ring_name)
+        self.sim = Simulation(**options); self.timestep = FixedTimestep()
+        self.publisher = _Publisher(self.control)
+        self.speed = 1.0; self.recorder = None; self.running = True
+
+    def _apply_commands(self):
+        """ Runs every queued command. Returns True if there were any. """
+        commands = self.commands.pop_all()
+        for name, args in commands:
+            if name not in self.COMMANDS: print(f"Unknown simulation command: {name}"); continue
+            try: getattr(self, name)(*args)
+            except (ValueError, KeyError, ZeroDivisionError, OSError) as e: print(f"Simulation command error ({name}): {e}")
+        return bool(commands)
+
+    def run(self):
+        sim = self.sim; last = time.perf_counter(); pending = True
+        try:
+            while self.running:
+                pending = self._apply_commands() or pending
+                now = time.perf_counter(); frame_dt = min(now - last, 0.1); last = now
+                steps = self.timestep.advance(frame_dt * self.speed)
+                for _ in range(steps):
+                    sim.particles.save_previous()
+                    for _ in range(self.timestep.substeps):
+                        sim.step(self.timestep.substep_dt)
+                        if sim.last_removed_count: print(f"Annihilated {sim.last_removed_count} particles.")
+                    if self.recorder: self.recorder.capture(sim)
+                    pending = not self.publisher.publish(sim) # Every finished step is offered to the window
+                    if self._apply_commands(): pending = True # Edits land between steps, not after the whole batch
+                    if not self.running: break
+                if pending: pending = not self.publisher.publish(sim) # Retried next loop while the window still holds the back buffer
+                if not steps: time.sleep(SIM_IDLE_SLEEP)
+        finally:
+            if self.recorder: self.recorder.close()
+            self.publisher.close(); sim.close(); self.commands.close()
+            self.control = None; self.control_block.close()
+
+    # --- Commands (same names and arguments as SimulationClient's methods) ---
+    def add_particles(self, positions, ptype, velocities=None): self.sim.add_particles(positions, ptype, velocities)
+    def spawn(self, ptype, count, shape, distribution, center, radius, end): self.sim.spawn(ptype, count, shape, distribution, center, radius, end)
+    def add_wall_segment(self, world_start, world_end): self.sim.add_wall_segment(world_start, world_end)
+    def set_locked(self, ptype, locked): self.sim.set_locked(ptype, locked)
+    def apply_radial_force(self, point, radius, strength): self.sim.apply_radial_force(point, radius, strength)
+    def clear(self): self.sim.clear(); self.timestep.reset()
+    def set_speed(self, speed): self.speed = speed
+    def stop(self): self.running = False
+
+    def erase_within(self, point, radius):
+        erased, walls_removed = self.sim.erase_within(point, radius)
+        if erased: print(f"Erased {erased} particles.")
+        if walls_removed: print(f"Erased {walls_removed} walls.")
+
+    def save_snapshot(self, path, view=None):
+        from snapshot import save_snapshot
+        count = save_snapshot(self.sim, path, view=view); print(f"Saved {count} particles to {path}")
+
+    def load_snapshot(self, path):
+        from snapshot import load_snapshot
+        load_snapshot(self.sim, path); self.timestep.reset(); print(f"Loaded {len(self.sim.particles)} particles from {path}")
+
+    def toggle_recording(self, path):
+        from recorder import Recorder
+        if self.recorder:
+            self.recorder.close(); print(f"Recorded {self.recorder.frame_count - self.recorder.dropped_count} frames to {self.recorder.path} ({self.recorder.dropped_count} dropped, {self.recorder.written_bytes / 1e6:.1f} MB)")
+            self.recorder = None
+        else: self.recorder = Recorder(path, self.sim); print(f"Recording to {path}")
+
+def _serve(control_name, ring_name, options):
+    """ Entry point of the simulation process. """
+    _SimulationServer(control_name, ring_name, options).run()
+
+# --- Window side ---
+class FrameView:
+    """
+    Read-only stand-in for a ParticleStore over the frame buffer the window currently holds (what ParticleRenderer and Game.draw read).
+    The arrays are views into shared memory, valid until the next SimulationClient.acquire().
+    """
+    def __init__(self, type_names, colors):
+        self.count = 0; self.revision = 0 # Published frame number
+        self.pos = self.prev_pos = np.zeros((0, 2)); self.size = np.zeros(0); self.type_id = np.zeros(0, dtype=np.int32)
+        self.type_names = list(type_names); self._colors = list(colors)
+
+    def __len__(self): return self.count
+
+    @property
+    def positions(self): return self.pos[:self.count]
+
+    def type_color(self, type_id): return self._colors[type_id]
+
+class WallView:
+    """ The published wall segments (copied out of the frame buffer when they change, so the arrays stay stable between edits). """
+    def __init__(self, half_thickness):
+        self.half_thickness = half_thickness
+        self.starts = np.zeros((0, 2), dtype=np.float64); self.ends = np.zeros((0, 2), dtype=np.float64)
+        self.version = 0 # The published wall version these arrays were copied from
+
+    def __len__(self): return len(self.starts)
+
+class SimulationClient:
+    """
+    Window-side stand-in for Simulation when physics runs in its own process (main.py --sim-process).
+    The simulation process steps in real time and publishes each result into one of two shared frame buffers; acquire()
+    picks up the newest complete one without copying, and the process never writes the buffer the window holds, so a
+    slow physics step never stalls drawing or input. Edits (placement, tools, walls, locks) are queued as commands on a
+    lock-free ring and applied between steps. Sleeping chunks and the chunk index stay in the simulation process.
+    """
+    def __init__(self, force_mode=FORCE_MODE, theta=BARNES_HUT_THETA, workers=PARALLEL_WORKERS, integrator=INTEGRATOR):
+        self.particle_definitions = BASE_PARTICLE_DEFINITIONS.copy() # Same registration order as Simulation
+        self.particle_definitions["wall"] = WALL_PARTICLE_DEFINITION
+        self.particle_enable_states = {ptype: True for ptype in self.particle_definitions}
+        self.particle_lock_states = {ptype: (ptype == "wall") for ptype in self.particle_definitions}
+        self.particles = FrameView(self.particle_definitions, [pdef.get("color", (255, 255, 255)) for pdef in self.particle_definitions.values()])
+        self.walls = WallView(WALL_PARTICLE_DEFINITION.get("size", DEFAULT_PARTICLE_SIZE)); self.chunks = None # The chunk index stays in the simulation process
+        self.query = SpatialQuery(self.particles) # Scans the published positions (no chunk index on this side)
+        self.sleep = None # Sleep state is not published
+        self.step_count = 0; self.time = 0.0; self.recording = False
+        self.profiler = FrameProfiler() # Window-side stages only
+        self._block = None; self._generation = -1; self._meta_version = 0; self._wall_version = 0; self._speed = None
+        self._control_block = shared_memory.SharedMemory(create=True, size=_CONTROL_BYTES)
+        self._control = np.ndarray(_CONTROL_BYTES // 8, dtype=np.int64, buffer=self._control_block.buf)
+        self._control[:] = 0; self._control[[_PUBLISHED, _HELD, _NAME_GEN]] = -1
+        self.commands = CommandRing()
+        options = {"force_mode": force_mode, "theta": theta, "workers": workers, "integrator": integrator}
+        self.process = multiprocessing.get_context("spawn").Process(target=_serve, args=(self._control_block.name, self.commands.name, options), name="simulation")
+        self.process.start() # Not a daemon: the parallel force engine starts worker processes of its own
+        atexit.register(self.close) # Runs before multiprocessing joins its children at exit, so an unclosed client cannot hang shutdown
+
+    def _send(self, name, *args):
+        if not self.process.is_alive(): print(f"Simulation process is not running; dropped '{name}'"); return False
+        if not self.commands.push(name, *args): print(f"Simulation command queue full; dropped '{name}'"); return False
+        return True
+
+    # --- Edits (applied by the simulation process between steps) ---
+    def add_particles(self, positions, ptype, velocities=None): self._send("add_particles", np.asarray(positions, dtype=np.float64), ptype, velocities)
+    def spawn(self, ptype, count, shape="disc", distribution="poisson", center=(0.0, 0.0), radius=None, end=None, rng=None):
+        """ Queues a brush spawn (generated in the simulation process, where the particles it must avoid are). Returns None: indices are not known here. """
+        self._send("spawn", ptype, count, shape, distribution, (center[0], center[1]), radius, None if end is None else (end[0], end[1]))
+    def add_wall_segment(self, world_start, world_end): self._send("add_wall_segment", (world_start[0], world_start[1]), (world_end[0], world_end[1]))
+    def apply_radial_force(self, point, radius, strength): self._send("apply_radial_force", point, radius, strength)
+    def clear(self): self._send("clear")
+    def save_snapshot(self, path, view=None): self._send("save_snapshot", path, view)
+    def load_snapshot(self, path): self._send("load_snapshot", path)
+
+    def erase_within(self, point, radius):
+        """ Queues the erase; the simulation process reports what it removed. Returns (0, 0) as the counts are not known here. """
+        self._send("erase_within", point, radius); return 0, 0
+
+    def set_locked(self, ptype, locked):
+        self.particle_lock_states[ptype] = locked; self._send("set_locked", ptype, locked)
+
+    def set_speed(self, speed):
+        """ Simulated seconds per real second (0 pauses). Sent only when it changes. """
+        if speed != self._speed and self._send("set_speed", speed): self._speed = speed
+
+    def toggle_recording(self, path):
+        """ Starts or stops recording inside the simulation process. Returns whether it is now recording. """
+        if self._send("toggle_recording", path): self.recording = not self.recording
+        return self.recording
+
+    # --- Frames ---
+    def _attach(self, generation):
+        """ Maps the frame block of `generation`. Returns False if its name is being replaced by a newer one. """
+        control = self._control
+        if int(control[_NAME_GEN]) != generation: return False
+        name = control.view(np.uint8)[_NAME_OFFSET:_NAME_OFFSET + int(control[_NAME_LENGTH])].tobytes().decode("utf-8")
+        capacity = int(control[_CAPACITY]); wall_capacity = int(control[_WALL_CAPACITY])
+        if int(control[_NAME_GEN]) != generation: return False # Rewritten while reading
+        try: block = _FrameBlock(capacity, wall_capacity, name=name)
+        except FileNotFoundError: return False # Already replaced and unlinked
+        old = self._block; self._block = block; self._generation = generation
+        if old is not None: self._release_views(); old.close()
+        return True
+
+    def _release_views(self):
+        frames = self.particles; frames.pos = frames.prev_pos = np.zeros((0, 2)); frames.size = np.zeros(0); frames.type_id = np.zeros(0, dtype=np.int32); frames.count = 0
+
+    def acquire(self):
+        """ Switches the views to the newest frame the simulation process has published. Returns False if there is none yet. """
+        control = self._control
+        while True:
+            published = int(control[_PUBLISHED])
+            if published < 0: return False
+            control[_HELD] = published # Claim it, then check it is still the newest (else the writer may already be refilling it)
+            if int(control[_PUBLISHED]) == published: break
+        generation, index = divmod(published, 2)
+        if generation != self._generation and not self._attach(generation): return False
+        buffer = self._block.buffers[index]; header = buffer.header; frames = self.particles
+        if header[_META_VERSION] != self._meta_version:
+            table = json.loads(buffer.meta[:int(header[_META_LENGTH])].tobytes().decode("utf-8"))
+            frames.type_names = table["names"]; frames._colors = [tuple(color) for color in table["colors"]]
+            self.particle_enable_states.update(table["enabled"]); self.particle_lock_states.update(table["locked"]) # In place: Game and UI hold these dicts
+            self.walls.half_thickness = table["wall_half_thickness"]; self._meta_version = int(header[_META_VERSION])
+        if header[_WALL_VERSION] != self._wall_version:
+            w = int(header[_WALLS]); self.walls.starts = buffer.wall_starts[:w].copy(); self.walls.ends = buffer.wall_ends[:w].copy()
+            self._wall_version = self.walls.version = int(header[_WALL_VERSION])
+        n = int(header[_COUNT])
+        frames.pos = frames.prev_pos = buffer.pos[:n]; frames.size = buffer.size[:n]; frames.type_id = buffer.type_id[:n]
+        frames.count = n; frames.revision = int(header[_FRAME])
+        self.step_count = int(header[_STEP]); self.time = float(buffer.time[0])
+        return True
+
+    def close(self):
+        """ Stops the simulation process and releases the shared memory. """
+        if self._control is None: return # Already closed
+        if self.process.is_alive() and self.commands.push("stop"): self.process.join(5.0)
+        if self.process.is_alive():
+            self.process.terminate(); self.process.join()
+            if int(self._control[_NAME_GEN]) >= 0 and self._attach(int(self._control[_NAME_GEN])): self._block.owner = True # It could not unlink its frame block: do it here
+        self._release_views()
+        if self._block is not None: self._block.close(); self._block = None
+        self.commands.close(); self._control = None; self._control_block.close(); self._control_block.unlink()
+        atexit.unregister(self.close)
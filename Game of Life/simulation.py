@@ -0,0 +1,165 @@
+# simulation.py
+# Description: Headless simulation core (particles, chunk index, forces, collisions, integration) with no pygame display.
+
+import math
+import numpy as np
+from constants import (CHUNK_SIZE, DEFAULT_PARTICLE_SIZE, GREEN_CENTER_ATTRACT_FORCE, MIN_FORCE_THRESHOLD_SQ, FORCE_MODE, BARNES_HUT_THETA,
+                       PARALLEL_WORKERS, INTEGRATOR, SLEEP_ENABLED, BASE_PARTICLE_DEFINITIONS, WALL_PARTICLE_DEFINITION, SPAWN_SPACING_FACTOR)
+from particle_store import ParticleStore
+from chunk_index import ChunkIndex
+from forces import CellListForceEngine, decayed_force
+from interaction_matrix import InteractionMatrix
+from barnes_hut import BarnesHutForceEngine
+from parallel_forces import ParallelForceEngine
+from collisions import CollisionSolver
+from profiler import FrameProfiler
+from integrators import make_integrator
+from walls import WallSet
+from sleep import SleepManager
+from spawner import spawn_positions, fit_radius
+from spatial_query import SpatialQuery
+
+FORCE_MODES = ("exact", "parallel", "barnes-hut")
+
+def make_force_engine(force_mode=FORCE_MODE, theta=BARNES_HUT_THETA, workers=PARALLEL_WORKERS):
+    """ Builds the pairwise force engine for a --force-mode name. """
+    if force_mode == "barnes-hut": return BarnesHutForceEngine(theta=theta)
+    if force_mode == "parallel": return ParallelForceEngine(workers=workers)
+    if force_mode == "exact": return CellListForceEngine()
+    raise ValueError(f"Unknown force mode: {force_mode}")
+
+class Simulation:
+    """
+    The physics pipeline on its own: forces, collisions, integration and the chunk index update, in the order the integrator runs them.
+    Game drives one of these per frame; scripts and the CLI can drive it directly without a display.
+    """
+    def __init__(self, force_mode=FORCE_MODE, theta=BARNES_HUT_THETA, workers=PARALLEL_WORKERS, integrator=INTEGRATOR):
+        self.particles = ParticleStore(); self.chunks = ChunkIndex(self.particles) # chunk coord -> list of particle indices
+        self.query = SpatialQuery(self.particles, self.chunks) # Radius / rect / k-nearest lookups for tools and selections
+        self.particle_definitions = BASE_PARTICLE_DEFINITIONS.copy()
+        self.particle_definitions["wall"] = WALL_PARTICLE_DEFINITION
+        for ptype, pdef in self.particle_definitions.items(): self.particles.register_type(ptype, pdef)
+        self.particle_enable_states = {ptype: True for ptype in self.particle_definitions}
+        self.particle_lock_states = {ptype: (ptype == "wall") for ptype in self.particle_definitions}
+        self.interactions = InteractionMatrix(); self.collision_solver = CollisionSolver()
+        self.force_mode = force_mode; self.force_engine = make_force_engine(force_mode, theta, workers)
+        self.integrator = make_integrator(integrator)
+        self.walls = WallSet(half_thickness=WALL_PARTICLE_DEFINITION.get("size", DEFAULT_PARTICLE_SIZE)) # Static; not in the particle store
+        self.sleep = SleepManager(self.particles, enabled=SLEEP_ENABLED) # Settled chunks skip integration and collisions
+        self.step_count = 0; self.time = 0.0; self.last_removed_count = 0 # Steps taken / simulated seconds
+        self.profiler = FrameProfiler() # Idle (near-zero cost) until its overlay or an export is switched on
+
+    # --- Population ---
+    def add_particles(self, positions, ptype, velocities=None):
+        """ Adds particles of one type at world positions and files them in the chunk index. Returns their indices. """
+        new_indices = self.particles.add_many(positions, self.particle_definitions[ptype], name=ptype, velocities=velocities)
+        self.chunks.insert_many(new_indices)
+        self.sleep.wake_chunks(self.particles.chunk[new_indices]) # Placement disturbs the chunks it lands in
+        return new_indices
+
+    def spawn(self, ptype, count, shape="disc", distribution="poisson", center=(0.0, 0.0), radius=None, end=None, rng=None):
+        """
+        Bulk placement: up to count particles for one brush stroke, generated in one vectorised call and added as one batch.
+        Grid/Poisson spacing follows the type's size and keeps clear of particles already there, so nothing spawns overlapping.
+        radius=None sizes the shape to fit count. Returns the new indices (fewer than count when the shape is full).
+        """
+        spacing = 2.0 * self.particle_definitions[ptype].get("size", DEFAULT_PARTICLE_SIZE) * SPAWN_SPACING_FACTOR
+        if radius is None: radius = fit_radius(count, spacing, shape)
+        if shape == "line" and end is not None: middle = ((center[0] + end[0]) / 2, (center[1] + end[1]) / 2); reach = math.hypot(end[0] - center[0], end[1] - center[1]) / 2
+        else: middle = center; reach = radius * math.sqrt(2.0) if shape == "rect" else radius
+        existing = self.particles.pos[self.query.within_radius(middle, reach + spacing)]
+        positions = spawn_positions(count, shape, distribution, center, radius, spacing, end, existing, rng)
+        return self.add_particles(positions, ptype) if len(positions) else np.zeros(0, dtype=np.int64)
+
+    def add_wall_segment(self, world_start, world_end):
+        """ Adds a static wall from world_start to world_end. Returns its id, or None if it is too short. """
+        length = math.hypot(world_end[0] - world_start[0], world_end[1] - world_start[1])
+        if length < 1.0: return None
+        along = np.linspace(0.0, 1.0, int(length // CHUNK_SIZE) + 2)[:, None] # Wake the chunks the wall passes through
+        self.sleep.wake_chunks(np.floor_divide(np.add(world_start, np.subtract(world_end, world_start) * along), CHUNK_SIZE))
+        return self.walls.add_segment((world_start[0], world_start[1]), (world_end[0], world_end[1]))
+
+    def remove_particles(self, indices):
+        """ Removes particles in O(k) (swap-remove; other indices may change). """
+        self.chunks.remove_many(indices)
+
+    def clear(self):
+        self.particles.clear(); self.chunks.clear(); self.walls.clear(); self.sleep.clear()
+
+    def set_locked(self, ptype, locked):
+        """ Locked types are protected from the eraser and from annihilation. """
+        self.particle_lock_states[ptype] = locked
+
+    # --- Tools ---
+    def erase_within(self, point, radius):
+        """ Removes unlocked particles closer than radius to point, and the walls it touches unless walls are locked. Returns (particles, walls) removed. """
+        self.sleep.wake_around(point, radius)
+        near = self.query.within_radius(point, radius)
+        locked = np.array([self.particle_lock_states.get(name, False) for name in self.particles.type_names], dtype=np.bool_)
+        hit = near[~locked[self.particles.type_id[near]]]
+        if len(hit): self.remove_particles(hit)
+        walls_removed = self.walls.remove_within(point, radius) if not self.particle_lock_states.get("wall", False) else 0
+        return len(hit), walls_removed
+
+    def apply_radial_force(self, point, radius, strength):
+        """ Pulls enabled movable particles within radius towards point (pushes for negative strength), fading to zero at the edge. """
+        self.sleep.wake_around(point, radius)
+        near, dist_sq = self.query.within_radius(point, radius, return_distance_sq=True)
+        enabled = np.array([self.particle_enable_states.get(name, True) for name in self.particles.type_names], dtype=np.bool_)
+        keep = enabled[self.particles.type_id[near]] & self.particles.movable[near] & (dist_sq > 1e-12); near = near[keep]
+        direction = np.asarray(point, dtype=np.float64) - self.particles.pos[near]; dist = np.sqrt(dist_sq[keep])
+        self.particles.acc[near] += direction * (strength * ((radius - dist) / radius) ** 2 / dist)[:, None]
+
+    # --- Pipeline ---
+    def compute_forces(self):
+        """ Calculates forces based on additive pairwise rules with symmetry. """
+        interactions = self.interactions.get(self.particles.type_names, self.particle_definitions, self.particle_enable_states)
+        self.sleep.watch_rules(interactions.version) # New rules unsettle everything
+        active = self.particles.awake[:len(self.particles)] if len(self.sleep) else None # Sleeping particles still act as sources
+
+        # --- Apply Green Center Attraction First ---
+        green_id = self.particles.type_ids.get("green")
+        if green_id is not None and self.particle_enable_states.get("green", True):
+            greens = np.flatnonzero((self.particles.type_ids_array == green_id) & self.particles.movable[:len(self.particles)] & self.particles.awake[:len(self.particles)])
+            to_origin = -self.particles.pos[greens]; dist = np.sqrt(np.einsum("ij,ij->i", to_origin, to_origin))
+            force_mag = np.where(dist > 1e-3, decayed_force(GREEN_CENTER_ATTRACT_FORCE, dist / CHUNK_SIZE), 0.0)
+            apply = force_mag * force_mag > MIN_FORCE_THRESHOLD_SQ
+            self.particles.acc[greens[apply]] += to_origin[apply] * (force_mag[apply] / dist[apply])[:, None]
+
+        # --- Pairwise Interactions (only pairs within the decay cutoff) ---
+        self.force_engine.accumulate(self.particles, interactions, active)
+        self.sleep.record_forces(); self.profiler.add("pairs", self.force_engine.last_pair_count) # Summed over every force pass in the frame
+
+    def resolve_collisions(self):
+        """ Detects and resolves collisions: overlap push, elastic exchange, wall bounce, annihilation. Returns how many particles were annihilated. """
+        members = self.sleep.collision_members() # Awake particles plus the sleeping ones they could reach
+        locked_types = np.array([self.particle_lock_states.get(name, False) for name in self.particles.type_names], dtype=np.bool_)
+        particles_to_remove = self.collision_solver.solve(self.particles, members, locked_types)
+        self.profiler.add("candidates", self.collision_solver.last_candidate_count); self.profiler.add("contacts", self.collision_solver.last_collision_count)
+        self.sleep.wake_touched() # Before removal, while indices still match
+        if len(particles_to_remove): self.remove_particles(particles_to_remove) # Swap-remove: O(k), chunk index follows the moved rows
+        return len(particles_to_remove)
+
+    def resolve_wall_collisions(self):
+        """ Keeps particles out of the static walls (swept from the start of the step, so fast particles cannot tunnel); unlocked anti particles annihilate on them. Returns how many were annihilated. """
+        if len(self.walls) == 0: return 0
+        n = len(self.particles)
+        locked_types = np.array([self.particle_lock_states.get(name, False) for name in self.particles.type_names], dtype=np.bool_)
+        particles_to_remove = self.walls.collide(self.particles, np.flatnonzero(self.particles.awake[:n]), self.particles.anti[:n] & ~locked_types[self.particles.type_id[:n]])
+        if len(particles_to_remove): self.remove_particles(particles_to_remove)
+        return len(particles_to_remove)
+
+    def step(self, dt):
+        """ Advances the simulation by dt. """
+        if dt <= 0: return
+        profiler = self.profiler
+        self.last_removed_count = self.integrator.step(self, dt)
+        with profiler.stage("integrate"): self.sleep.update()
+        self.step_count += 1; self.time += dt
+        if profiler.active:
+            profiler.count("particles", len(self.particles)) # Gauges: the latest step's value; pairs, candidates and contacts are summed as they happen
+            profiler.count("sleeping", len(self.particles) - int(np.count_nonzero(self.particles.awake[:len(self.particles)])))
+
+    def close(self):
+        """ Releases engine resources (worker processes, shared memory). """
+        if hasattr(self.force_engine, 'close'): self.force_engine.close()
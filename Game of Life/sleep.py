@@ -0,0 +1,139 @@
+# sleep.py
+# Description: Puts settled chunks to sleep (no forces received, no integration, no collisions) and wakes them when disturbed.
+
+import numpy as np
+from constants import CHUNK_SIZE, SLEEP_SPEED, SLEEP_FORCE_TOLERANCE, SLEEP_STEPS, SLEEP_WAKE_SPEED
+from cell_grid import cell_keys, cell_coords
+
+_NEIGHBOURHOOD = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+def _lookup(sorted_keys, values, wanted, default):
+    """ values[i] where sorted_keys[i] == wanted, else default (vectorised). """
+    if len(sorted_keys) == 0: return np.full(len(wanted), default, dtype=values.dtype)
+    loc = np.minimum(np.searchsorted(sorted_keys, wanted), len(sorted_keys) - 1)
+    return np.where(sorted_keys[loc] == wanted, values[loc], default)
+
+class SleepManager:
+    """
+    Tracks, per chunk, how many steps in a row every particle in it has been slower than SLEEP_SPEED with a
+    steady net force (mean force magnitude within SLEEP_FORCE_TOLERANCE of the previous step). After SLEEP_STEPS
+    such steps the chunk sleeps: its particles are frozen (store.awake = False) but still act as force sources
+    and collision obstacles. A sleeping chunk wakes when a particle in or next to it moves faster than
+    SLEEP_WAKE_SPEED, when it is touched in a collision, or when wake_chunks/wake_all is called (tools, placement).
+    """
+    def __init__(self, store, enabled=True):
+        self.store = store
+        self.enabled = enabled
+        self.sleeping = np.zeros(0, dtype=np.int64) # Sorted chunk keys
+        self.version = 0 # Bumped whenever the sleeping set changes, so callers (the chunk grid overlay) can notice
+        self._calm_keys = np.zeros(0, dtype=np.int64); self._calm_steps = np.zeros(0, dtype=np.int64)
+        self._force_keys = np.zeros(0, dtype=np.int64); self._force_now = np.zeros(0); self._force_before = (np.zeros(0, dtype=np.int64), np.zeros(0))
+        self._rules_version = None
+
+    def __len__(self): return len(self.sleeping)
+
+    def _particle_keys(self):
+        chunk = self.store.chunk[:self.store.count]
+        return cell_keys(chunk[:, 0], chunk[:, 1])
+
+    def _apply(self):
+        """ Refreshes store.awake from the sleeping chunk set. """
+        n = self.store.count
+        awake = ~np.isin(self._particle_keys(), self.sleeping) if len(self.sleeping) else np.ones(n, dtype=np.bool_)
+        self.store.set_awake(awake)
+
+    def sleeping_coords(self):
+        """ (k, 2) chunk coords of every sleeping chunk. """
+        return cell_coords(self.sleeping)
+
+    # --- Waking ---
+    def wake_keys(self, keys):
+        if len(self.sleeping) == 0 or len(keys) == 0: return
+        woken = np.isin(self.sleeping, keys)
+        if np.any(woken):
+            self.sleeping = self.sleeping[~woken]; self.version += 1
+            self._calm_steps[np.isin(self._calm_keys, keys)] = 0
+            self._apply()
+
+    def wake_chunks(self, coords, radius=1):
+        """ Wakes the chunks at `coords` ((k, 2) chunk coords) and the `radius` ring around them. """
+        coords = np.asarray(coords, dtype=np.int64).reshape(-1, 2)
+        if len(self.sleeping) == 0 or len(coords) == 0: return
+        offsets = [(dx, dy) for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)]
+        self.wake_keys(np.concatenate([cell_keys(coords[:, 0] + dx, coords[:, 1] + dy) for dx, dy in offsets]))
+
+    def wake_around(self, point, radius):
+        """ Wakes every chunk overlapping the circle (world units), e.g. under a tool. """
+        lo = np.floor_divide(np.subtract(point, radius), CHUNK_SIZE).astype(np.int64); hi = np.floor_divide(np.add(point, radius), CHUNK_SIZE).astype(np.int64)
+        xs, ys = np.meshgrid(np.arange(lo[0], hi[0] + 1), np.arange(lo[1], hi[1] + 1))
+        self.wake_chunks(np.column_stack((xs.ravel(), ys.ravel())), radius=0)
+
+    def wake_all(self):
+        if len(self.sleeping): self.sleeping = np.zeros(0, dtype=np.int64); self.version += 1; self._apply()
+        self._calm_steps[:] = 0
+
+    def watch_rules(self, version):
+        """ Wakes everything when the interaction rules changed (InteractionMatrix.version). """
+        if version != self._rules_version: self._rules_version = version; self.wake_all()
+
+    def clear(self):
+        self.sleeping = np.zeros(0, dtype=np.int64); self._calm_keys = np.zeros(0, dtype=np.int64); self._calm_steps = np.zeros(0, dtype=np.int64); self.version += 1
+        self._force_keys = np.zeros(0, dtype=np.int64); self._force_now = np.zeros(0); self._force_before = (np.zeros(0, dtype=np.int64), np.zeros(0))
+
+    # --- Per step ---
+    def collision_members(self):
+        """ Store indices to resolve collisions for: awake particles plus sleeping ones in chunks next to awake ones. """
+        n = self.store.count
+        if len(self.sleeping) == 0: return np.arange(n)
+        awake = self.store.awake[:n]
+        reached = np.unique(self.store.chunk[:n][awake], axis=0)
+        near = np.concatenate([cell_keys(reached[:, 0] + dx, reached[:, 1] + dy) for dx, dy in _NEIGHBOURHOOD])
+        return np.flatnonzero(awake | np.isin(self._particle_keys(), near))
+
+    def record_forces(self):
+        """ Call right after forces are computed: remembers each awake chunk's mean force magnitude. """
+        if not self.enabled: return
+        n = self.store.count; awake = self.store.awake[:n]
+        self._force_before = (self._force_keys, self._force_now)
+        keys = self._particle_keys()[awake]; acc = self.store.acc[:n][awake]
+        self._force_keys, inverse = np.unique(keys, return_inverse=True)
+        self._force_now = np.bincount(inverse, weights=np.sqrt(np.einsum("ij,ij->i", acc, acc)), minlength=len(self._force_keys)) / np.maximum(np.bincount(inverse, minlength=len(self._force_keys)), 1)
+
+    def wake_touched(self):
+        """ Call after collisions: wakes sleeping chunks whose particles were pushed or hit (moved off last_pos, or got a velocity). """
+        if len(self.sleeping) == 0: return
+        n = self.store.count; asleep = ~self.store.awake[:n]
+        moved = asleep & (np.any(self.store.pos[:n] != self.store.last_pos[:n], axis=1) | np.any(self.store.vel[:n] != 0.0, axis=1))
+        if np.any(moved): self.wake_keys(np.unique(self._particle_keys()[moved]))
+
+    def update(self):
+        """ Call at the end of a step: wakes disturbed chunks, advances calm counters and puts settled chunks to sleep. """
+        if not self.enabled: return
+        n = self.store.count
+        if n == 0: self.clear(); return
+        keys = self._particle_keys(); awake = self.store.awake[:n]; vel = self.store.vel[:n]
+        speed_sq = np.einsum("ij,ij->i", vel, vel)
+
+        # --- Wake: fast particles disturb their own chunk and the 8 around it; awake particles entering a sleeping chunk wake it ---
+        if len(self.sleeping):
+            fast = self.store.chunk[:n][awake & (speed_sq > SLEEP_WAKE_SPEED * SLEEP_WAKE_SPEED)]
+            disturbed = [cell_keys(fast[:, 0] + dx, fast[:, 1] + dy) for dx, dy in _NEIGHBOURHOOD] + [keys[awake]]
+            self.wake_keys(np.concatenate(disturbed)); awake = self.store.awake[:n]
+
+        # --- Calm counters for awake chunks ---
+        chunk_keys, inverse = np.unique(keys[awake], return_inverse=True)
+        max_speed_sq = np.zeros(len(chunk_keys)); np.maximum.at(max_speed_sq, inverse, speed_sq[awake])
+        force_now = _lookup(self._force_keys, self._force_now, chunk_keys, np.nan)
+        force_before = _lookup(self._force_before[0], self._force_before[1], chunk_keys, np.nan)
+        steady = np.abs(force_now - force_before) <= SLEEP_FORCE_TOLERANCE * np.maximum(force_before, 1.0) # NaN (no record) -> not steady
+        calm = (max_speed_sq < SLEEP_SPEED * SLEEP_SPEED) & steady
+        steps = np.where(calm, _lookup(self._calm_keys, self._calm_steps, chunk_keys, 0) + 1, 0)
+        self._calm_keys = chunk_keys; self._calm_steps = steps
+
+        # --- Sleep ---
+        settled = chunk_keys[steps >= SLEEP_STEPS]
+        if len(settled):
+            merged = np.union1d(self.sleeping, settled)
+            if len(merged) != len(self.sleeping): self.sleeping = merged; self.version += 1 # Only grows, so a new length means new chunks
+            frozen = np.isin(keys, settled); self.store.vel[:n][frozen] = 0.0; self.store.acc[:n][frozen] = 0.0
+            self._apply()
@@ -0,0 +1,100 @@
+# snapshot.py
+# Description: Saves and loads the full simulation state in a compact, versioned binary file that loads by memory mapping.
+
+import json
+import os
+import struct
+import numpy as np
+from constants import SNAPSHOT_ALIGNMENT
+from cell_grid import cell_keys
+
+SNAPSHOT_MAGIC = b"GOLSNAP\0"
+SNAPSHOT_VERSION = 1
+_PREAMBLE = struct.Struct("<8sII") # Magic, format version, JSON header length
+
+# Saved particle columns (ParticleStore row arrays); the rest (prev_pos, last_pos, acc, awake) are derived on load
+_PARTICLE_ARRAYS = ("pos", "vel", "size", "mass", "type_id", "movable", "anti", "chunk")
+
+def _aligned(offset): return -(-offset // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+
+def definition_to_json(particle_def):
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in particle_def.items()}
+
+def definition_from_json(particle_def):
+    particle_def = dict(particle_def)
+    if "color" in particle_def: particle_def["color"] = tuple(particle_def["color"])
+    return particle_def
+
+def save_snapshot(sim, path, view=None):
+    """
+    Writes sim's particles (reordered by chunk; indices are not preserved), walls, type definitions and enable/lock states to `path` (atomically, via a temp file).
+    view: optional JSON-able dict (e.g. the camera) stored alongside and handed back by load_snapshot.
+
+    Layout: preamble (magic, version, header length), a JSON header, then each array's raw little-endian bytes
+    at SNAPSHOT_ALIGNMENT-aligned offsets listed in the header, so a loader can map them without copying.
+    """
+    store = sim.particles; n = store.count
+    if store.mapped_path and os.path.exists(path) and os.path.samefile(store.mapped_path, path): store.unmap() # The file is about to be replaced
+    chunk = store.chunk[:n]; order = np.argsort(cell_keys(chunk[:, 0], chunk[:, 1]), kind="stable") # Rows in chunk order, so the load-time sort is already done
+    arrays = {name: getattr(store, name)[:n][order] for name in _PARTICLE_ARRAYS}
+    arrays["wall_starts"] = sim.walls.starts; arrays["wall_ends"] = sim.walls.ends
+    header = {
+        "count": n, "step_count": sim.step_count, "time": sim.time, "type_names": list(store.type_names),
+        "particle_definitions": {name: definition_to_json(pdef) for name, pdef in sim.particle_definitions.items()},
+        "particle_enable_states": sim.particle_enable_states, "particle_lock_states": sim.particle_lock_states,
+        "view": view, "arrays": {},
+    }
+    # Offsets depend on the header length, so lay out against a generous estimate of the header size
+    data = {name: np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")) for name, array in arrays.items()}
+    header_room = _aligned(_PREAMBLE.size + len(json.dumps(header)) + 128 * (len(data) + 1))
+    offset = header_room
+    for name, array in data.items():
+        header["arrays"][name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8")
+    if _PREAMBLE.size + len(header_bytes) > header_room: raise ValueError("Snapshot header does not fit its reserved space")
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header_bytes))); f.write(header_bytes)
+        for name, array in data.items():
+            f.seek(header["arrays"][name]["offset"]); array.tofile(f)
+        f.truncate(offset)
+    os.replace(temp_path, path)
+    return n
+
+def read_header(path):
+    """ Returns the JSON header of a snapshot file (raises ValueError if it is not a readable snapshot). """
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size: raise ValueError(f"{path}: not a snapshot (too short)")
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != SNAPSHOT_MAGIC: raise ValueError(f"{path}: not a snapshot (bad magic)")
+        if version > SNAPSHOT_VERSION: raise ValueError(f"{path}: snapshot version {version} is newer than supported ({SNAPSHOT_VERSION})")
+        return json.loads(f.read(header_length).decode("utf-8"))
+
+def load_snapshot(sim, path):
+    """
+    Replaces sim's state with the snapshot at `path`. Particle arrays are memory-mapped copy-on-write (mode 'c'):
+    nothing is read until touched and edits never reach the file. The chunk index is rebuilt from the saved chunk
+    coords in one vectorised pass. Returns the saved view dict (or None).
+    """
+    header = read_header(path)
+    mapped = np.memmap(path, dtype=np.uint8, mode="c")
+    def array(name):
+        spec = header["arrays"][name]; dtype = np.dtype(spec["dtype"]); shape = tuple(spec["shape"])
+        return np.ndarray(shape, dtype=dtype, buffer=mapped, offset=spec["offset"]) # Plain ndarray view of the mapping
+
+    # Dicts are updated in place: viewers (Game) hold references to them
+    sim.particle_definitions.clear(); sim.particle_definitions.update({name: definition_from_json(pdef) for name, pdef in header["particle_definitions"].items()})
+    sim.particle_enable_states.clear(); sim.particle_enable_states.update(header["particle_enable_states"])
+    sim.particle_lock_states.clear(); sim.particle_lock_states.update(header["particle_lock_states"])
+    type_names = header["type_names"]
+    sim.particles.adopt(header["count"], {name: array(name) for name in _PARTICLE_ARRAYS},
+                        type_names, [sim.particle_definitions.get(name, {}) for name in type_names], mapped_path=path)
+    for name, pdef in sim.particle_definitions.items(): sim.particles.register_type(name, pdef) # Types not in use yet
+    sim.chunks.rebuild(); sim.sleep.clear(); sim.interactions.invalidate()
+    sim.walls.clear(); sim.walls.add_segments(array("wall_starts"), array("wall_ends"))
+    sim.integrator = type(sim.integrator)() # Fresh integrator state (Verlet re-primes its accelerations)
+    sim.step_count = header.get("step_count", 0); sim.time = header.get("time", 0.0)
+    return header.get("view")
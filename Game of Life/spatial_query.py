@@ -0,0 +1,65 @@
+# spatial_query.py
+# Description: Radius, rectangle and k-nearest particle queries over the chunk index, with vectorised distance filtering.
+
+import itertools
+import numpy as np
+from constants import CHUNK_SIZE, SPATIAL_SCAN_FRACTION
+
+class SpatialQuery:
+    """
+    Particle queries that return ParticleStore index arrays (radius, rectangle, k-nearest), for tools and selections.
+    Candidates come from the occupied chunks overlapping the query (walking the chunk range or the occupied chunks,
+    whichever is shorter); once those hold more than scan_fraction of all particles, one vectorised pass over every
+    position is cheaper than gathering their lists, so large radii in dense areas stay cheap.
+    Without a chunk index (chunks=None, e.g. over a published frame) every query is such a scan.
+    """
+    def __init__(self, store, chunks=None, scan_fraction=SPATIAL_SCAN_FRACTION):
+        self.store = store
+        self.chunks = chunks
+        self.scan_fraction = scan_fraction
+
+    def candidates(self, x0, y0, x1, y1):
+        """ Indices of the particles filed in chunks overlapping the world rect (a superset of the particles inside it). """
+        count = self.store.count
+        if self.chunks is None or count == 0: return np.arange(count)
+        cx0 = int(x0 // CHUNK_SIZE); cy0 = int(y0 // CHUNK_SIZE); cx1 = int(x1 // CHUNK_SIZE); cy1 = int(y1 // CHUNK_SIZE)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(self.chunks):
+            lists = [self.chunks[(cx, cy)] for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+        else: lists = [members for (cx, cy), members in self.chunks.items() if cx0 <= cx <= cx1 and cy0 <= cy <= cy1]
+        total = sum(map(len, lists))
+        if total > self.scan_fraction * count: return np.arange(count) # Cheaper to test every position than to gather the lists
+        return np.fromiter(itertools.chain.from_iterable(lists), dtype=np.int64, count=total)
+
+    def within_radius(self, point, radius, return_distance_sq=False):
+        """ Particles closer than radius to point (and their squared distances if asked). """
+        x, y = point; near = self.candidates(x - radius, y - radius, x + radius, y + radius)
+        delta = self.store.pos[near] - (x, y); dist_sq = np.einsum("ij,ij->i", delta, delta)
+        inside = dist_sq < radius * radius
+        return (near[inside], dist_sq[inside]) if return_distance_sq else near[inside]
+
+    def within_rect(self, x0, y0, x1, y1):
+        """ Particles with x0 <= x < x1 and y0 <= y < y1 (half-open, like chunk filing). """
+        near = self.candidates(x0, y0, x1, y1); pos = self.store.pos[near]
+        return near[(pos[:, 0] >= x0) & (pos[:, 0] < x1) & (pos[:, 1] >= y0) & (pos[:, 1] < y1)]
+
+    def nearest(self, point, k=1, max_radius=None):
+        """
+        The k particles nearest to point, closest first: returns (indices, distances), fewer than k if there are not
+        enough (within max_radius, if given). Searches a radius doubling from one chunk until it holds k particles;
+        anything outside that radius is farther than everything inside it, so the k closest found are exact.
+        """
+        k = min(k, self.store.count); radius = float(CHUNK_SIZE)
+        if k <= 0: return np.zeros(0, dtype=np.int64), np.zeros(0)
+        while True:
+            limit = radius if max_radius is None else min(radius, max_radius)
+            found, dist_sq = self.within_radius(point, limit, return_distance_sq=True)
+            if len(found) >= k or len(found) == self.store.count or limit == max_radius: break
+            radius *= 2.0
+        order = np.argsort(dist_sq, kind="stable")[:k]
+        return found[order], np.sqrt(dist_sq[order])
+
+    def chunk_count(self, coord):
+        """ Particles in one chunk: the index's O(1) count, or a rectangle query without an index. """
+        if self.chunks is not None: return self.chunks.count(coord)
+        cx, cy = coord
+        return len(self.within_rect(cx * CHUNK_SIZE, cy * CHUNK_SIZE, (cx + 1) * CHUNK_SIZE, (cy + 1) * CHUNK_SIZE))
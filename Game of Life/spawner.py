@@ -0,0 +1,107 @@
+# spawner.py
+# Description: Vectorised bulk spawning: positions for a brush shape (disc, rect, ring, line) under a distribution (uniform, jittered grid, Poisson-disc).
+
+import math
+import numpy as np
+from constants import SPAWN_RING_INNER, SPAWN_POISSON_ROUNDS, SPAWN_FIT_AREA
+from cell_grid import CellGrid, iter_gather_pairs
+
+SPAWN_SHAPES = ("disc", "rect", "ring", "line")
+SPAWN_DISTRIBUTIONS = ("uniform", "grid", "poisson")
+_NEIGHBOR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)] # Cells of size `spacing` around a point
+
+def _segment(center, radius, end):
+    """ Line shape end points: center -> end, or a horizontal segment of length 2 * radius through center. """
+    if end is None or math.hypot(end[0] - center[0], end[1] - center[1]) < 1e-9: return np.array([center[0] - radius, center[1]]), np.array([center[0] + radius, center[1]])
+    return np.asarray(center, dtype=np.float64), np.asarray(end, dtype=np.float64)
+
+def shape_area(shape, radius, spacing=1.0, end=None, center=(0.0, 0.0)):
+    """ Area of a shape (a line counts as a strip one spacing wide). """
+    if shape == "disc": return math.pi * radius * radius
+    if shape == "rect": return 4.0 * radius * radius
+    if shape == "ring": return math.pi * radius * radius * (1.0 - SPAWN_RING_INNER ** 2)
+    if shape == "line": start, stop = _segment(center, radius, end); return float(np.hypot(*(stop - start))) * spacing
+    raise ValueError(f"Unknown spawn shape: {shape} (choose from {', '.join(SPAWN_SHAPES)})")
+
+def fit_radius(count, spacing, shape="disc"):
+    """ Radius at which `count` particles spaced `spacing` apart fill the shape comfortably (SPAWN_FIT_AREA per particle). """
+    if shape == "line": return 0.5 * max(count - 1, 0) * spacing * SPAWN_FIT_AREA
+    return math.sqrt(count * spacing * spacing * SPAWN_FIT_AREA / shape_area(shape, 1.0))
+
+def _uniform(shape, n, center, radius, end, rng):
+    """ n points uniformly distributed over the shape. """
+    if shape == "line":
+        start, stop = _segment(center, radius, end); return start + (stop - start) * rng.uniform(0.0, 1.0, (n, 1))
+    if shape == "rect": return np.asarray(center, dtype=np.float64) + rng.uniform(-radius, radius, (n, 2))
+    inner = SPAWN_RING_INNER * radius if shape == "ring" else 0.0
+    r = np.sqrt(rng.uniform(inner * inner, radius * radius, n)); angle = rng.uniform(0.0, 2.0 * math.pi, n) # sqrt: uniform per area
+    return np.asarray(center, dtype=np.float64) + np.column_stack((r * np.cos(angle), r * np.sin(angle)))
+
+def _contains(shape, points, center, radius):
+    """ Which points lie inside a 2D shape (disc, rect, ring). """
+    offset = points - np.asarray(center, dtype=np.float64)
+    if shape == "rect": return np.all(np.abs(offset) <= radius, axis=1)
+    dist_sq = np.einsum("ij,ij->i", offset, offset)
+    inside = dist_sq <= radius * radius
+    return inside & (dist_sq >= (SPAWN_RING_INNER * radius) ** 2) if shape == "ring" else inside
+
+def _jittered_grid(shape, count, center, radius, end, spacing, rng):
+    """ A randomly offset lattice over the shape, each point jittered within its cell so no two are closer than spacing. """
+    pitch = max(spacing, math.sqrt(shape_area(shape, radius, spacing, end, center) / max(count, 1)))
+    jitter = 0.5 * (pitch - spacing)
+    if shape == "line":
+        start, stop = _segment(center, radius, end); length = float(np.hypot(*(stop - start)))
+        steps = (rng.uniform(0.0, 1.0) + np.arange(int(length // pitch) + 1)) * pitch
+        steps = steps[steps <= length]; steps = steps + rng.uniform(-jitter, jitter, len(steps))
+        return start + (stop - start) * (np.clip(steps, 0.0, length) / max(length, 1e-9))[:, None]
+    ticks = np.arange(-radius, radius + pitch, pitch)
+    grid_x, grid_y = np.meshgrid(ticks, ticks)
+    points = np.column_stack((grid_x.ravel(), grid_y.ravel())) + np.asarray(center, dtype=np.float64) + rng.uniform(-0.5, 0.5, 2) * pitch
+    points = points + rng.uniform(-jitter, jitter, points.shape)
+    return points[_contains(shape, points, center, radius)]
+
+def _conflicts(candidates, accepted, spacing):
+    """ True for each candidate within spacing of an accepted point or of an earlier candidate (so the survivors keep their distance). """
+    points = np.concatenate((accepted, candidates)); num_accepted = len(accepted)
+    conflict = np.zeros(len(candidates), dtype=np.bool_)
+    for it, ib in iter_gather_pairs(CellGrid(candidates, spacing), CellGrid(points, spacing), _NEIGHBOR_OFFSETS):
+        delta = points[ib] - candidates[it]
+        close = np.einsum("ij,ij->i", delta, delta) < spacing * spacing
+        earlier = ib - num_accepted < it # Accepted points have negative candidate ranks; excludes the candidate itself
+        conflict[it[close & earlier]] = True
+    return conflict
+
+def _poisson_disc(shape, count, center, radius, end, spacing, existing, rng):
+    """
+    Dart throwing in vectorised rounds: each round draws a batch of uniform candidates and keeps those at least
+    spacing away from everything accepted so far (existing particles included) and from earlier candidates.
+    Stops at count points or after SPAWN_POISSON_ROUNDS rounds (the shape is then close to full).
+    """
+    accepted = existing; first = len(existing)
+    room = int(shape_area(shape, radius, spacing, end, center) / (spacing * spacing)) # Rough upper bound on what fits; caps wasted candidates
+    for _ in range(SPAWN_POISSON_ROUNDS):
+        missing = count - (len(accepted) - first)
+        if missing <= 0: break
+        candidates = _uniform(shape, 2 * min(missing, room) + 16, center, radius, end, rng)
+        accepted = np.concatenate((accepted, candidates[~_conflicts(candidates, accepted, spacing)][:missing]))
+    return accepted[first:]
+
+def spawn_positions(count, shape="disc", distribution="poisson", center=(0.0, 0.0), radius=50.0, spacing=0.0, end=None, existing=None, rng=None):
+    """
+    Returns up to `count` world positions (k, 2) filling `shape` around center:
+      disc/rect/ring: radius is the disc radius / rect half side / ring outer radius (inner = SPAWN_RING_INNER * radius);
+      line: from center to end (default: horizontal, 2 * radius long).
+    "uniform" ignores spacing and `existing`; "grid" and "poisson" keep points at least `spacing` apart from each other
+    and from the `existing` positions, returning fewer than count when the shape is full.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if count <= 0: return np.zeros((0, 2), dtype=np.float64)
+    if shape not in SPAWN_SHAPES: raise ValueError(f"Unknown spawn shape: {shape} (choose from {', '.join(SPAWN_SHAPES)})")
+    if distribution == "uniform" or spacing <= 0: return _uniform(shape, count, center, radius, end, rng)
+    if distribution == "grid":
+        points = _jittered_grid(shape, count, center, radius, end, spacing, rng)
+        if existing is not None and len(existing): points = points[~_conflicts(points, np.asarray(existing, dtype=np.float64).reshape(-1, 2), spacing)]
+        return points[rng.permutation(len(points))[:count]] if len(points) > count else points
+    if distribution == "poisson":
+        return _poisson_disc(shape, count, center, radius, end, spacing, np.zeros((0, 2)) if existing is None else np.asarray(existing, dtype=np.float64).reshape(-1, 2), rng)
+    raise ValueError(f"Unknown spawn distribution: {distribution} (choose from {', '.join(SPAWN_DISTRIBUTIONS)})")
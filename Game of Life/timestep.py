@@ -0,0 +1,37 @@
+# timestep.py
+# Description: Fixed-timestep scheduler: accumulates frame time and hands out fixed physics steps (with substeps) under a per-frame budget.
+
+from constants import PHYSICS_STEP_DT, PHYSICS_SUBSTEPS, PHYSICS_MAX_STEPS_PER_FRAME
+
+class FixedTimestep:
+    """
+    Turns variable frame times into a whole number of fixed physics steps.
+    Each step of step_dt is integrated as `substeps` simulation steps of substep_dt, so speeding the game up
+    costs more steps rather than a larger dt. At most max_steps run per frame; time beyond that is dropped
+    (the simulation slows down instead of spiralling). alpha is how far the leftover time reaches into the
+    next step, for interpolating what is drawn.
+    """
+    def __init__(self, step_dt=PHYSICS_STEP_DT, substeps=PHYSICS_SUBSTEPS, max_steps=PHYSICS_MAX_STEPS_PER_FRAME):
+        self.step_dt = step_dt
+        self.substeps = max(1, int(substeps))
+        self.max_steps = max(1, int(max_steps))
+        self.accumulator = 0.0
+        self.dropped_time = 0.0 # Total simulated time skipped because the step budget ran out
+
+    @property
+    def substep_dt(self): return self.step_dt / self.substeps
+
+    @property
+    def alpha(self): return min(1.0, self.accumulator / self.step_dt)
+
+    def advance(self, frame_dt):
+        """ Adds frame_dt of simulated time and returns how many fixed steps to run now. """
+        self.accumulator += max(0.0, frame_dt)
+        steps = int(self.accumulator // self.step_dt)
+        if steps > self.max_steps: # Over budget: keep the fractional part, drop the whole steps we cannot afford
+            dropped = (steps - self.max_steps) * self.step_dt; self.dropped_time += dropped; self.accumulator -= dropped; steps = self.max_steps
+        self.accumulator -= steps * self.step_dt
+        return steps
+
+    def reset(self):
+        self.accumulator = 0.0
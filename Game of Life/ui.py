@@ -1,7 +1,25 @@
 # ui.py
 import pygame
+from collections import OrderedDict
 from constants import *
 
+class TextCache:
+    """ LRU cache of rendered text surfaces keyed by (font, text, color); labels are rendered once, not every frame. """
+    def __init__(self, max_entries=UI_TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._surfaces = OrderedDict()
+
+    def render(self, font, text, color):
+        key = (font, text, tuple(color))
+        surf = self._surfaces.get(key)
+        if surf is None:
+            surf = self._surfaces[key] = font.render(text, True, color)
+            if len(self._surfaces) > self.max_entries: self._surfaces.popitem(last=False) # Evict the least recently used
+        else: self._surfaces.move_to_end(key)
+        return surf
+
+    def clear(self): self._surfaces.clear()
+
 class UI:
     def __init__(self, screen_width, screen_height):
         self.screen_width = screen_width
@@ -20,6 +38,10 @@ class UI:
             self.small_font = pygame.font.SysFont(None, 18)
             self.coord_font = pygame.font.SysFont("monospace", 16)
         except pygame.error as e: print(f"Font Error: {e}"); self.font = self.small_font = self.coord_font = None
+        self.text = TextCache()
+
+        # --- Baked chrome: borders + panels drawn once into an off-screen surface, each panel redrawn only when its inputs change ---
+        self._chrome = None; self._chrome_rects = []; self._panel_keys = {}; self._popup_shown = False
 
         # --- UI State ---
         self.state = UI_STATE_NORMAL
@@ -31,7 +53,7 @@ class UI:
         self.tool_editor_particle_type = None
 
         # --- Define tools including Wall ---
-        tool_names = ["Place", "Wall", "Erase", "Attract", "Repel", "Reset"] # Added Wall
+        tool_names = ["Place", "Wall", "Erase", "Attract", "Repel", "Brush", "Reset"] # Added Wall, Brush
         self.tools = [{"name": name, "rect": None} for name in tool_names]
 
         self.particle_buttons = []
@@ -75,23 +97,61 @@ class UI:
              tool_info["rect"] = rect
 
     def draw(self, surface, game_state):
-        if not self.font: return # Cannot draw without fonts
+        """ Draws the UI over the play area and returns the screen rects it changed (for dirty-rect display updates). """
+        if not self.font: return [] # Cannot draw without fonts
         # ... (Unpack game_state variables as before) ...
         camera_zoom = game_state.get('camera_zoom', 1.0); eraser_radius = game_state.get('eraser_radius', ERASER_START_RADIUS)
-        tool_strength = game_state.get('tool_strength', DEFAULT_TOOL_STRENGTH); cursor_chunk_coord = game_state.get('cursor_chunk_coord', None)
+        tool_strength = game_state.get('tool_strength', DEFAULT_TOOL_STRENGTH); brush = game_state.get('brush'); cursor_chunk_coord = game_state.get('cursor_chunk_coord', None)
         particle_definitions = game_state.get('particle_definitions', {})
         particle_enable_states = game_state.get('particle_enable_states', {}); particle_lock_states = game_state.get('particle_lock_states', {})
         is_paused = game_state.get('is_paused', False); game_speed = game_state.get('game_speed', 1.0)
 
-        self._draw_borders(surface)
-        self._draw_panels_background(surface)
-        self._draw_top_bar_content(surface, camera_zoom, is_paused, game_speed)
-        self._draw_bottom_bar_content(surface, cursor_chunk_coord)
-        self._draw_left_panel_content(surface, eraser_radius, tool_strength, particle_definitions, particle_enable_states, particle_lock_states)
-
-        if self.state == UI_STATE_SHOW_TOOL_EDITOR:
-             self._draw_tool_editor(surface, particle_definitions, particle_enable_states, particle_lock_states)
-
+        dirty = []
+        if self._chrome is None or self._chrome.get_size() != surface.get_size(): self._bake_chrome(surface.get_size()); dirty = list(self._chrome_rects)
+        chrome = self._chrome
+        profiler_text = game_state.get('profiler_text'); cursor_chunk_count = game_state.get('cursor_chunk_count', 0)
+        top_key = (self.state, self.cell_multiplier, self.multiplier_input_text, f"{camera_zoom:.2f}", f"{game_speed:.1f}", is_paused, profiler_text)
+        if self._panel_changed("top", top_key):
+            if self.top_bar_rect: pygame.draw.rect(chrome, DARK_GREY, self.top_bar_rect)
+            self._draw_top_bar_content(chrome, camera_zoom, is_paused, game_speed, profiler_text); dirty.append(self.top_bar_rect)
+        if self._panel_changed("bottom", (cursor_chunk_coord, cursor_chunk_count)):
+            if self.bottom_bar_rect: pygame.draw.rect(chrome, DARK_GREY, self.bottom_bar_rect)
+            self._draw_bottom_bar_content(chrome, cursor_chunk_coord, cursor_chunk_count); dirty.append(self.bottom_bar_rect)
+        left_key = (self.state, self.selected_tool, self.selected_particle_type, eraser_radius, tool_strength, brush,
+                    tuple((name, tuple(pdef.get("color", WHITE))) for name, pdef in particle_definitions.items()),
+                    tuple(particle_enable_states.items()), tuple(particle_lock_states.items()))
+        if self._panel_changed("left", left_key):
+            if self.left_panel_rect: pygame.draw.rect(chrome, DARK_GREY, self.left_panel_rect)
+            self._draw_left_panel_content(chrome, eraser_radius, tool_strength, brush, particle_definitions, particle_enable_states, particle_lock_states); dirty.append(self.left_panel_rect)
+
+        popup = self.state == UI_STATE_SHOW_TOOL_EDITOR
+        if popup or self._popup_shown: dirty = list(self._chrome_rects) # The popup overlaps the panels: repaint under it every frame, and once after it closes
+        for rect in dirty: surface.blit(chrome, rect, rect) # Only the chrome that changed (everything outside the play area on a bake)
+        if popup:
+             self._draw_tool_editor(surface, particle_definitions, particle_enable_states, particle_lock_states); dirty = [surface.get_rect()]
+        self._popup_shown = popup
+        return dirty
+
+    def view_rect(self):
+        """ The part of play_area_rect that is not covered by the outer border (where the scene shows through). """
+        if not self.play_area_rect: return None
+        return self.play_area_rect.clip(pygame.Rect(BORDER_WIDTH * 2, BORDER_WIDTH * 2, self.screen_width - BORDER_WIDTH * 4, self.screen_height - BORDER_WIDTH * 4))
+
+
+    def _bake_chrome(self, size):
+        """ (Re)creates the chrome surface at the screen size: borders and panel backgrounds now, panel contents on their next change. """
+        self._chrome = pygame.Surface(size); self._chrome.fill(BLACK); self._panel_keys = {}
+        self._draw_borders(self._chrome); self._draw_panels_background(self._chrome)
+        width, height = size
+        play = self.view_rect() # The outer border overlaps the play area
+        if not play or play.width <= 0 or play.height <= 0: self._chrome_rects = [pygame.Rect(0, 0, width, height)]; return
+        self._chrome_rects = [pygame.Rect(0, 0, width, play.top), pygame.Rect(0, play.bottom, width, height - play.bottom),
+                              pygame.Rect(0, play.top, play.left, play.height), pygame.Rect(play.right, play.top, width - play.right, play.height)]
+
+    def _panel_changed(self, panel, key):
+        """ True (and remembers key) if the panel's inputs differ from when it was last drawn. """
+        if self._panel_keys.get(panel) == key: return False
+        self._panel_keys[panel] = key; return True
 
     def _draw_borders(self, surface):
         # ... (Draw borders as before) ...
@@ -109,38 +169,42 @@ class UI:
         if self.bottom_bar_rect: pygame.draw.rect(surface, DARK_GREY, self.bottom_bar_rect)
 
 
-    def _draw_top_bar_content(self, surface, camera_zoom, is_paused, game_speed):
+    def _draw_top_bar_content(self, surface, camera_zoom, is_paused, game_speed, profiler_text=None):
         # ... (Draw top bar content as before) ...
         if not self.top_bar_rect or not self.font: return
         display_text = f"Place x{self.cell_multiplier}"; text_color = WHITE
         if self.state == UI_STATE_EDITING_MULTIPLIER: display_text = f"Enter: {self.multiplier_input_text}_"; text_color = YELLOW
-        multiplier_text_surf = self.font.render(display_text, True, text_color)
+        multiplier_text_surf = self.text.render(self.font, display_text, text_color)
         self.multiplier_display_rect = multiplier_text_surf.get_rect(left = self.top_bar_rect.left + 10, centery = self.top_bar_rect.centery)
         self.multiplier_click_rect = self.multiplier_display_rect.inflate(10, 5)
         if self.state == UI_STATE_EDITING_MULTIPLIER: pygame.draw.rect(surface, LIGHT_GREY, self.multiplier_click_rect, border_radius=3)
         surface.blit(multiplier_text_surf, self.multiplier_display_rect); last_element_right = self.multiplier_click_rect.right
-        zoom_text = self.font.render(f"Zoom: {camera_zoom:.2f}x", True, WHITE); zoom_rect = zoom_text.get_rect(left=last_element_right + 20, centery=self.top_bar_rect.centery)
+        zoom_text = self.text.render(self.font, f"Zoom: {camera_zoom:.2f}x", WHITE); zoom_rect = zoom_text.get_rect(left=last_element_right + 20, centery=self.top_bar_rect.centery)
         surface.blit(zoom_text, zoom_rect); last_element_right = zoom_rect.right
         time_status_text = f"Speed: {game_speed:.1f}x"; time_color = WHITE
         if is_paused: time_status_text += " (Paused)"; time_color = YELLOW
-        time_text_surf = self.font.render(time_status_text, True, time_color); time_rect = time_text_surf.get_rect(left=last_element_right + 20, centery=self.top_bar_rect.centery)
-        surface.blit(time_text_surf, time_rect)
+        time_text_surf = self.text.render(self.font, time_status_text, time_color); time_rect = time_text_surf.get_rect(left=last_element_right + 20, centery=self.top_bar_rect.centery)
+        surface.blit(time_text_surf, time_rect); last_element_right = time_rect.right
+        if profiler_text and self.small_font: # Profiler overlay (F3), clipped before the settings button
+            profiler_surf = self.small_font.render(profiler_text, True, COORD_TEXT_COLOR); profiler_rect = profiler_surf.get_rect(left=last_element_right + 20, centery=self.top_bar_rect.centery) # Changes every frame: not cached
+            right_limit = self.settings_button_rect.left - 10 if self.settings_button_rect else self.top_bar_rect.right
+            if profiler_rect.left < right_limit: surface.blit(profiler_surf, profiler_rect, pygame.Rect(0, 0, right_limit - profiler_rect.left, profiler_rect.height))
         if self.settings_button_rect:
-            pygame.draw.rect(surface, LIGHT_GREY, self.settings_button_rect); settings_text = self.font.render("Settings", True, BLACK)
+            pygame.draw.rect(surface, LIGHT_GREY, self.settings_button_rect); settings_text = self.text.render(self.font, "Settings", BLACK)
             surface.blit(settings_text, settings_text.get_rect(center=self.settings_button_rect.center))
 
 
-    def _draw_bottom_bar_content(self, surface, cursor_chunk_coord):
+    def _draw_bottom_bar_content(self, surface, cursor_chunk_coord, cursor_chunk_count=0):
         # ... (Draw bottom bar content as before) ...
         if not self.bottom_bar_rect or not self.coord_font: return
-        coord_text = f"Chunk: ({cursor_chunk_coord[0]}, {cursor_chunk_coord[1]})" if cursor_chunk_coord else "Chunk: (N/A)"
-        text_surf = self.coord_font.render(coord_text, True, COORD_TEXT_COLOR)
+        coord_text = f"Chunk: ({cursor_chunk_coord[0]}, {cursor_chunk_coord[1]}) [{cursor_chunk_count}]" if cursor_chunk_coord else "Chunk: (N/A)"
+        text_surf = self.text.render(self.coord_font, coord_text, COORD_TEXT_COLOR)
         text_rect = text_surf.get_rect(right=self.bottom_bar_rect.right - 10, centery=self.bottom_bar_rect.centery)
         if text_rect.left < self.bottom_bar_rect.left: text_rect.left = self.bottom_bar_rect.left
         surface.blit(text_surf, text_rect)
 
 
-    def _draw_left_panel_content(self, surface, eraser_radius, tool_strength, particle_definitions, particle_enable_states, particle_lock_states):
+    def _draw_left_panel_content(self, surface, eraser_radius, tool_strength, brush, particle_definitions, particle_enable_states, particle_lock_states):
         if not hasattr(self, 'left_panel_rect') or not self.left_panel_rect or not self.font or not self.small_font:
             print("Warning: UI drawing skipped, panel/fonts not ready.")
             return
@@ -155,14 +219,15 @@ class UI:
                                  (tool_name != "Wall" and self.selected_tool == tool_name.lower())
             button_color = WHITE if is_visually_selected else LIGHT_GREY; text_color = BLACK
             pygame.draw.rect(surface, button_color, rect)
-            text_surf = self.font.render(tool_name, True, text_color)
+            text_surf = self.text.render(self.font, tool_name, text_color)
             surface.blit(text_surf, text_surf.get_rect(center=rect.center))
             display_value = None
             if self.state != UI_STATE_DRAWING_WALL:
                 if tool_name == "Erase" and is_visually_selected: display_value = f"R:{eraser_radius}"
                 elif tool_name in ["Attract", "Repel"] and is_visually_selected: display_value = f"S:{tool_strength}"
+                elif tool_name == "Brush" and is_visually_selected and brush: display_value = f"{brush[0]} {brush[1]} R:{brush[2]}" # shape, distribution, radius
             if display_value:
-                value_text = self.small_font.render(display_value, True, BLACK if is_visually_selected else WHITE)
+                value_text = self.text.render(self.small_font, display_value, BLACK if is_visually_selected else WHITE)
                 value_rect = value_text.get_rect(centerx=rect.centerx, bottom=rect.top - 2)
                 surface.blit(value_text, value_rect)
         num_tool_rows = (len(self.tools) + cols - 1) // cols
@@ -182,7 +247,7 @@ class UI:
         # Toggle All Button
         toggle_all_rect = pygame.Rect(x_start, y_offset, panel_width, 20)
         pygame.draw.rect(surface, LIGHT_GREY, toggle_all_rect)
-        toggle_text = self.small_font.render("Toggle All (TBD)", True, BLACK)
+        toggle_text = self.text.render(self.small_font, "Toggle All (TBD)", BLACK)
         surface.blit(toggle_text, toggle_text.get_rect(center=toggle_all_rect.center))
         y_offset += 25
 
@@ -201,11 +266,11 @@ class UI:
              if self.selected_tool == "place" and self.selected_particle_type == ptype_name: pygame.draw.rect(surface, WHITE, outline_rect, 2)
              draw_color = color if is_enabled else DARK_GREY
              pygame.draw.rect(surface, draw_color, particle_rect)
-             label = self.small_font.render(ptype_name.capitalize(), True, WHITE)
+             label = self.text.render(self.small_font, ptype_name.capitalize(), WHITE)
              label_rect = label.get_rect(centerx=particle_rect.centerx, top=particle_rect.bottom + 2)
              surface.blit(label, label_rect)
              if is_locked:
-                  lock_icon_surf = self.small_font.render("L", True, YELLOW)
+                  lock_icon_surf = self.text.render(self.small_font, "L", YELLOW)
                   lock_rect = lock_icon_surf.get_rect(center=particle_rect.center)
                   surface.blit(lock_icon_surf, lock_rect)
              col_count += 1
@@ -217,7 +282,7 @@ class UI:
         # Add Custom Particle Button
         self.add_particle_button_rect = pygame.Rect(x_start, y_offset, panel_width, 30)
         pygame.draw.rect(surface, LIGHT_GREY, self.add_particle_button_rect)
-        add_text = self.font.render("Add Particle (TBD)", True, BLACK)
+        add_text = self.text.render(self.font, "Add Particle (TBD)", BLACK)
         surface.blit(add_text, add_text.get_rect(center=self.add_particle_button_rect.center))
 
     def _draw_tool_editor(self, surface, particle_definitions, particle_enable_states, particle_lock_states):
@@ -227,10 +292,10 @@ class UI:
         editor_rect = pygame.Rect((self.screen_width - editor_width) // 2, (self.screen_height - editor_height) // 2, editor_width, editor_height)
         bg_surf = pygame.Surface(editor_rect.size, pygame.SRCALPHA); bg_surf.fill((50, 50, 50, 220)); surface.blit(bg_surf, editor_rect.topleft)
         pygame.draw.rect(surface, LIGHT_GREY, editor_rect, 2)
-        title = f"Edit {self.tool_editor_particle_type.capitalize()} Targets (TBD)"; title_surf = self.font.render(title, True, WHITE)
+        title = f"Edit {self.tool_editor_particle_type.capitalize()} Targets (TBD)"; title_surf = self.text.render(self.font, title, WHITE)
         title_rect = title_surf.get_rect(centerx=editor_rect.centerx, top=editor_rect.top + 10); surface.blit(title_surf, title_rect)
         close_rect = pygame.Rect(editor_rect.right - 35, editor_rect.top + 5, 30, 20)
-        pygame.draw.rect(surface, RED, close_rect); close_text = self.font.render("X", True, WHITE)
+        pygame.draw.rect(surface, RED, close_rect); close_text = self.text.render(self.font, "X", WHITE)
         surface.blit(close_text, close_text.get_rect(center=close_rect.center))
 
     def handle_event(self, event, current_multiplier_value):
@@ -284,6 +349,7 @@ class UI:
                            # ... (Right click logic for Attract/Repel/Erase remains same) ...
                            if tool_name in ["Attract", "Repel"]: self.state = UI_STATE_SHOW_TOOL_EDITOR; self.tool_editor_particle_type = tool_name.lower(); action_to_signal = 'show_tool_editor'
                            elif tool_name == "Erase": print(f"RClick Erase. Use [ ] keys."); action_to_signal = 'adjust_eraser'
+                           elif tool_name == "Brush": action_to_signal = 'cycle_brush_shape' # B / N cycle shape / distribution, [ ] resize
                            return True, action_to_signal
 
             # ... (Check Particle Buttons logic remains same) ...
@@ -312,4 +378,5 @@ class UI:
     def update_dimensions(self, screen_width, screen_height):
         # ... (update_dimensions logic remains the same) ...
         self.screen_width = screen_width; self.screen_height = screen_height
-        self._calculate_rects(); self._calculate_tool_button_rects()
\ No newline at end of file
+        self._calculate_rects(); self._calculate_tool_button_rects()
+        self._chrome = None # Re-baked at the new layout on the next draw
\ No newline at end of file
@@ -0,0 +1,177 @@
+# video_export.py
+# Description: Offline renderer that steps a simulation at a fixed dt and writes every frame to a PNG sequence or a video encoder pipe.
+
+import argparse
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+import time
+import zlib
+import numpy as np
+import pygame
+from constants import (FPS, BLACK, WALL_COLOR, FORCE_MODE, BARNES_HUT_THETA, PARALLEL_WORKERS, INTEGRATOR, VIDEO_WIDTH, VIDEO_HEIGHT,
+                       VIDEO_FPS, VIDEO_QUEUE_FRAMES, VIDEO_PNG_COMPRESSION, VIDEO_FFMPEG)
+from camera import Camera
+from renderer import ParticleRenderer
+from simulation import Simulation, FORCE_MODES
+from scenarios import SCENARIOS, build_scenario
+from integrators import INTEGRATORS
+from snapshot import load_snapshot
+from recorder import ReplayPlayer
+
+def encode_png(width, height, rgb, level=VIDEO_PNG_COMPRESSION):
+    """ Encodes packed RGB24 bytes as a PNG file (no filtering; zlib does the work and releases the GIL while it does). """
+    rows = np.frombuffer(rgb, dtype=np.uint8).reshape(height, width * 3)
+    raw = np.hstack((np.zeros((height, 1), dtype=np.uint8), rows)).tobytes() # Filter type 0 before every row
+    def chunk(tag, data): return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    return b"".join((b"\x89PNG\r\n\x1a\n", chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+                     chunk(b"IDAT", zlib.compress(raw, level)), chunk(b"IEND", b"")))
+
+class _FrameSink:
+    """
+    Writes frames (packed RGB24 bytes) on a background thread, so encoding the previous frame overlaps with
+    simulating and drawing the next one. write() only blocks when VIDEO_QUEUE_FRAMES frames are already waiting.
+    """
+    def __init__(self, width, height):
+        self.width = width; self.height = height; self.frame_count = 0; self._error = None
+        self._queue = queue.Queue(maxsize=VIDEO_QUEUE_FRAMES)
+        self._thread = threading.Thread(target=self._loop, name="frame-writer", daemon=True); self._thread.start()
+
+    def write(self, rgb):
+        if self._error: raise self._error
+        self._queue.put((self.frame_count, rgb)); self.frame_count += 1
+
+    def close(self):
+        """ Waits for the queued frames to be written. """
+        self._queue.put(None); self._thread.join(); self._finish()
+        if self._error: raise self._error
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None: return
+            if self._error: continue # Keep draining so write() never deadlocks
+            try: self._write(*item)
+            except (OSError, ValueError) as e: self._error = e
+
+    def _write(self, index, rgb): raise NotImplementedError
+    def _finish(self): pass
+
+class PngSequenceSink(_FrameSink):
+    """ frame_000000.png, frame_000001.png, ... in a directory. """
+    def __init__(self, directory, width, height):
+        os.makedirs(directory, exist_ok=True); self.directory = directory
+        super().__init__(width, height)
+
+    def _write(self, index, rgb):
+        with open(os.path.join(self.directory, f"frame_{index:06d}.png"), "wb") as f: f.write(encode_png(self.width, self.height, rgb))
+
+class EncoderPipeSink(_FrameSink):
+    """ Pipes raw RGB24 frames into a local encoder (ffmpeg by default), which writes the video file. """
+    def __init__(self, path, width, height, fps, ffmpeg=VIDEO_FFMPEG):
+        executable = shutil.which(ffmpeg)
+        if executable is None: raise OSError(f"Encoder not found: {ffmpeg} (install ffmpeg or write a PNG sequence instead)")
+        command = [executable, "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                   "-c:v", "libx264", "-pix_fmt", "yuv420p", path]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        super().__init__(width, height)
+
+    def _write(self, index, rgb): self.process.stdin.write(rgb)
+
+    def _finish(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0 and self._error is None: self._error = OSError(f"Encoder exited with status {self.process.returncode}")
+
+def make_sink(out, width, height, fps, ffmpeg=VIDEO_FFMPEG):
+    """ A PNG sequence for a directory path (no extension), otherwise a video file through the encoder. """
+    if os.path.splitext(out)[1] == "": return PngSequenceSink(out, width, height)
+    return EncoderPipeSink(out, width, height, fps, ffmpeg)
+
+def fit_camera(camera, positions, wall_starts, wall_ends, margin=0.05):
+    """ Centres and zooms the camera so every point fits on its surface (with a margin). """
+    points = np.concatenate((positions, wall_starts, wall_ends)) if len(wall_starts) else positions
+    if len(points) == 0: camera.camera_offset = pygame.math.Vector2(-camera.screen_width / 2, -camera.screen_height / 2); return
+    lo = points.min(axis=0); hi = points.max(axis=0); extent = np.maximum(hi - lo, 1.0) * (1 + 2 * margin)
+    camera.zoom = float(min(camera.screen_width / extent[0], camera.screen_height / extent[1]))
+    centre = (lo + hi) / 2
+    camera.camera_offset = pygame.math.Vector2(centre[0] - camera.screen_width / 2 / camera.zoom, centre[1] - camera.screen_height / 2 / camera.zoom)
+
+class FrameRenderer:
+    """ Draws a particle store and its walls into an off-screen Surface of any size through a Camera. """
+    def __init__(self, width, height):
+        self.surface = pygame.Surface((width, height), depth=32)
+        self.camera = Camera(width, height); self.renderer = ParticleRenderer()
+
+    def render(self, store, walls, enable_states, wall_color=WALL_COLOR):
+        """ Renders one frame and returns it as packed RGB24 bytes. """
+        self.surface.fill(BLACK)
+        if enable_states.get("wall", True): self.renderer.draw_walls(self.surface, self.camera, walls, wall_color)
+        self.renderer.draw(self.surface, self.camera, store, [enable_states.get(name, True) for name in store.type_names])
+        return pygame.image.tobytes(self.surface, "RGB")
+
+def parse_size(text):
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Particle Sim (offline frame/video export)")
+    parser.add_argument("scenario", nargs="?", choices=sorted(SCENARIOS), default="mixed", help="Starting scene (ignored with --load/--replay)")
+    parser.add_argument("--out", required=True, help="Directory for a PNG sequence, or a video file (e.g. run.mp4) encoded by --ffmpeg")
+    parser.add_argument("--frames", type=int, default=600, help="Frames to export")
+    parser.add_argument("--fps", type=int, default=VIDEO_FPS, help="Output frame rate")
+    parser.add_argument("--steps-per-frame", type=int, default=max(1, round(FPS / VIDEO_FPS)), help="Simulation steps between frames (each of --dt)")
+    parser.add_argument("--dt", type=float, default=1.0 / FPS, help="Fixed simulation timestep (seconds)")
+    parser.add_argument("--size", type=parse_size, default=(VIDEO_WIDTH, VIDEO_HEIGHT), help="Frame size, WIDTHxHEIGHT")
+    parser.add_argument("--zoom", type=float, help="Camera zoom (default: fit the starting scene)")
+    parser.add_argument("--center", type=lambda text: tuple(float(v) for v in text.split(",")), help="Camera centre in world units, X,Y")
+    parser.add_argument("--count", type=int, default=5000, help="Approximate number of particles in the scenario")
+    parser.add_argument("--seed", type=int, default=0, help="Scenario random seed")
+    parser.add_argument("--load", help="Start from a snapshot file")
+    parser.add_argument("--replay", help="Render a recording (at --fps of its simulated time) instead of simulating")
+    parser.add_argument("--ffmpeg", default=VIDEO_FFMPEG, help="Encoder executable for video outputs")
+    parser.add_argument("--integrator", choices=list(INTEGRATORS), default=INTEGRATOR, help="Time integrator")
+    parser.add_argument("--force-mode", choices=FORCE_MODES, default=FORCE_MODE, help="Pairwise force engine")
+    parser.add_argument("--theta", type=float, default=BARNES_HUT_THETA, help="Barnes-Hut opening angle")
+    parser.add_argument("--workers", type=int, default=PARALLEL_WORKERS, help="Worker processes for --force-mode parallel")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv); width, height = args.size
+    frames = FrameRenderer(width, height)
+    sim = Simulation(force_mode=args.force_mode, theta=args.theta, workers=args.workers, integrator=args.integrator); replay = None
+    try:
+        if args.replay: replay = ReplayPlayer(args.replay); replay.seek(0); store, walls, definitions = replay.store, replay.walls, replay.particle_definitions
+        else:
+            if args.load: load_snapshot(sim, args.load)
+            else: build_scenario(sim, args.scenario, args.count, args.seed)
+            store, walls, definitions = sim.particles, sim.walls, sim.particle_definitions
+        camera = frames.camera; fit_camera(camera, store.positions, walls.starts, walls.ends)
+        centre = args.center or (camera.camera_offset.x + width / 2 / camera.zoom, camera.camera_offset.y + height / 2 / camera.zoom)
+        if args.zoom: camera.zoom = args.zoom
+        camera.camera_offset = pygame.math.Vector2(centre[0] - width / 2 / camera.zoom, centre[1] - height / 2 / camera.zoom)
+        wall_color = definitions.get("wall", {}).get("color", WALL_COLOR)
+        sink = make_sink(args.out, width, height, args.fps, args.ffmpeg)
+        print(f"Exporting {args.frames} frames at {width}x{height} to {args.out}")
+        start = time.perf_counter()
+        try:
+            for frame in range(args.frames):
+                if replay:
+                    if frame: replay.seek(int(np.searchsorted(replay.times, replay.times[0] + frame / args.fps, side="right")) - 1)
+                elif frame:
+                    for _ in range(args.steps_per_frame): sim.step(args.dt)
+                sink.write(frames.render(store, walls, sim.particle_enable_states, wall_color)) # Encoded on the writer thread while the next frame simulates
+        finally: sink.close()
+        elapsed = time.perf_counter() - start
+        print(f"Done: {sink.frame_count} frames in {elapsed:.2f}s ({sink.frame_count / elapsed if elapsed > 0 else float('inf'):.1f} frames/sec)")
+    except (OSError, ValueError) as e: print(f"Export error: {e}"); return 1
+    finally:
+        sim.close()
+        if replay: replay.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# walls.py
+# Description: Static wall segments kept apart from the particle store, with a baked grid for particle-vs-wall collision queries.
+
+import itertools
+import math
+import numpy as np
+from constants import CHUNK_SIZE, MAX_PARTICLE_SIZE, WALL_BOUNCE_FACTOR, COLLISION_ITERATIONS
+from cell_grid import cell_keys
+
+_VERSIONS = itertools.count(1) # Shared by every WallSet, so a version never repeats (the live and replay walls share one cached layer)
+
+def closest_points(points, starts, ends):
+    """ Closest point on each segment (starts[i] -> ends[i]) to points[i]. """
+    direction = ends - starts
+    length_sq = np.maximum(np.einsum("ij,ij->i", direction, direction), 1e-12)
+    t = np.clip(np.einsum("ij,ij->i", points - starts, direction) / length_sq, 0.0, 1.0)
+    return starts + direction * t[:, None]
+
+class WallSet:
+    """
+    Line-segment walls with a half thickness. They never move, so a grid (cell -> segment ids) is baked
+    whenever segments are added or removed; each segment is filed under every cell whose particles could
+    touch it, so a particle only has to look up its own cell.
+    """
+    def __init__(self, half_thickness, cell_size=CHUNK_SIZE, max_particle_size=MAX_PARTICLE_SIZE):
+        self.half_thickness = half_thickness
+        self.cell_size = cell_size
+        self.max_particle_size = max_particle_size
+        self.starts = np.zeros((0, 2), dtype=np.float64); self.ends = np.zeros((0, 2), dtype=np.float64)
+        self.version = 0 # New on every edit, so callers (cached wall layers) can notice changes
+        self._build()
+
+    def __len__(self): return len(self.starts)
+
+    # --- Editing ---
+    def add_segment(self, start, end):
+        """ Adds one wall from start to end (world coords). Returns its id (ids shift when walls are removed). """
+        self.starts = np.vstack((self.starts, np.asarray(start, dtype=np.float64).reshape(1, 2)))
+        self.ends = np.vstack((self.ends, np.asarray(end, dtype=np.float64).reshape(1, 2)))
+        self._build()
+        return len(self.starts) - 1
+
+    def add_segments(self, starts, ends):
+        self.starts = np.vstack((self.starts, np.asarray(starts, dtype=np.float64).reshape(-1, 2)))
+        self.ends = np.vstack((self.ends, np.asarray(ends, dtype=np.float64).reshape(-1, 2)))
+        self._build()
+
+    def remove_within(self, point, radius):
+        """ Removes every wall passing within radius of point. Returns how many were removed. """
+        if len(self.starts) == 0: return 0
+        points = np.broadcast_to(np.asarray(point, dtype=np.float64), self.starts.shape)
+        offset = points - closest_points(points, self.starts, self.ends)
+        hit = np.einsum("ij,ij->i", offset, offset) < (radius + self.half_thickness) ** 2
+        if np.any(hit): self.starts = self.starts[~hit]; self.ends = self.ends[~hit]; self._build()
+        return int(hit.sum())
+
+    def clear(self):
+        self.starts = np.zeros((0, 2), dtype=np.float64); self.ends = np.zeros((0, 2), dtype=np.float64)
+        self._build()
+
+    # --- Grid ---
+    def _build(self):
+        """ Files every segment under the cells whose centre is within reach of it (reach covers any particle in the cell). """
+        self.version = next(_VERSIONS) # Every edit ends here
+        cs = self.cell_size
+        reach = cs * math.sqrt(0.5) + self.half_thickness + self.max_particle_size
+        seg_ids = []; keys = []
+        for i, (start, end) in enumerate(zip(self.starts, self.ends)):
+            lo = np.floor((np.minimum(start, end) - reach) / cs).astype(np.int64); hi = np.floor((np.maximum(start, end) + reach) / cs).astype(np.int64)
+            cx, cy = np.meshgrid(np.arange(lo[0], hi[0] + 1), np.arange(lo[1], hi[1] + 1), indexing="ij"); cx = cx.ravel(); cy = cy.ravel()
+            centers = (np.column_stack((cx, cy)) + 0.5) * cs
+            offset = centers - closest_points(centers, np.broadcast_to(start, centers.shape), np.broadcast_to(end, centers.shape))
+            near = np.einsum("ij,ij->i", offset, offset) <= reach * reach
+            keys.append(cell_keys(cx[near], cy[near])); seg_ids.append(np.full(int(near.sum()), i, dtype=np.int64))
+        keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+        seg_ids = np.concatenate(seg_ids) if seg_ids else np.zeros(0, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self._cell_segments = seg_ids[order]
+        self._keys, self._start, self._count = np.unique(keys[order], return_index=True, return_counts=True)
+
+    def query(self, positions):
+        """ Candidate (point index, segment id) pairs: every segment filed under each point's cell. """
+        if len(self._keys) == 0 or len(positions) == 0: return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        cells = np.floor_divide(positions, self.cell_size).astype(np.int64)
+        wanted = cell_keys(cells[:, 0], cells[:, 1])
+        loc = np.minimum(np.searchsorted(self._keys, wanted), len(self._keys) - 1)
+        found = self._keys[loc] == wanted
+        points = np.flatnonzero(found); loc = loc[found]
+        counts = self._count[loc]
+        point_ids = np.repeat(points, counts)
+        within = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        return point_ids, self._cell_segments[np.repeat(self._start[loc], counts) + within]
+
+    # --- Collisions ---
+    def collide(self, store, members, annihilate, iterations=COLLISION_ITERATIONS):
+        """
+        Pushes movable `members` (store indices) out of the walls and reflects their velocity (times WALL_BOUNCE_FACTOR)
+        when moving into a wall. A particle whose motion this step (store.last_pos -> store.pos) crossed a wall is put back
+        on the side it came from. Members flagged in `annihilate` (bool per store row) are destroyed on contact instead.
+        Returns the indices of destroyed particles.
+        """
+        members = members[store.movable[members]]
+        removed = np.zeros(0, dtype=np.int64)
+        if len(members) == 0 or len(self.starts) == 0: return removed
+        pos = store.pos; vel = store.vel
+        local, candidate_segments = self.query(pos[members])
+        candidates = members[local]
+        for _ in range(iterations):
+            alive = ~np.isin(candidates, removed); idx = candidates[alive]; segments = candidate_segments[alive]
+            if len(idx) == 0: break
+            starts = self.starts[segments]; direction = self.ends[segments] - starts
+            contact = closest_points(pos[idx], starts, self.ends[segments])
+            offset = pos[idx] - contact; dist_sq = np.einsum("ij,ij->i", offset, offset)
+            min_dist = store.size[idx] + self.half_thickness
+
+            # --- Crossings: the drift went from one side of the wall line to the other, within the segment ---
+            line_normal = np.column_stack((-direction[:, 1], direction[:, 0])) / np.maximum(np.sqrt(np.einsum("ij,ij->i", direction, direction)), 1e-12)[:, None]
+            side_before = np.einsum("ij,ij->i", store.last_pos[idx] - starts, line_normal); side_now = np.einsum("ij,ij->i", pos[idx] - starts, line_normal)
+            crossed = side_before * side_now < 0
+            if np.any(crossed):
+                travel = pos[idx] - store.last_pos[idx]; hit = store.last_pos[idx] + travel * (side_before / np.where(crossed, side_before - side_now, 1.0))[:, None]
+                along = np.einsum("ij,ij->i", hit - starts, direction) / np.maximum(np.einsum("ij,ij->i", direction, direction), 1e-12)
+                crossed &= (along >= 0.0) & (along <= 1.0)
+
+            touching = crossed | (dist_sq < min_dist * min_dist)
+            if not np.any(touching): break
+            idx = idx[touching]; offset = offset[touching]; dist_sq = dist_sq[touching]; min_dist = min_dist[touching]; contact = contact[touching]
+            crossed = crossed[touching]; line_normal = line_normal[touching]; side_before = side_before[touching]
+
+            # --- Anti particles annihilate on walls (the wall itself is static and stays) ---
+            doomed = annihilate[idx]
+            if np.any(doomed):
+                removed = np.union1d(removed, idx[doomed])
+                keep = ~doomed; idx = idx[keep]; offset = offset[keep]; dist_sq = dist_sq[keep]; min_dist = min_dist[keep]; contact = contact[keep]
+                crossed = crossed[keep]; line_normal = line_normal[keep]; side_before = side_before[keep]
+                if len(idx) == 0: break
+
+            # --- Push out along the contact normal (crossings first, then the deepest contact; one per particle per pass) ---
+            dist = np.sqrt(dist_sq)
+            normal = np.where(dist[:, None] > 1e-9, offset / np.maximum(dist, 1e-9)[:, None], line_normal)
+            normal[crossed] = line_normal[crossed] * np.sign(side_before[crossed])[:, None] # Back to the side it came from
+            order = np.lexsort((dist, ~crossed)); first = order[np.unique(idx[order], return_index=True)[1]]
+            p = idx[first]; n = normal[first]
+            pos[p] = contact[first] + n * min_dist[first][:, None]
+            v = vel[p]; vn = np.einsum("ij,ij->i", v, n)
+            into = vn < 0 # Moving into the wall: reflect
+            v[into] = (v[into] - 2 * vn[into][:, None] * n[into]) * WALL_BOUNCE_FACTOR
+            vel[p] = v
+        return removed